@@ -0,0 +1,69 @@
+"""
+Compare the throughput of evolution-only runs in headless mode with the default mode.
+
+The default mode prints every generation, draws tqdm bars and logs every step into world.log.
+Headless mode drops the bars and output, and logs every step, the end of every generation or nothing.
+Output is sent to /dev/null so the terminal isn't timed.
+
+    python -m benchmarks.bench_fast_mode
+"""
+
+import contextlib
+import os
+import time
+
+from evosim.constants import GENOME_CONNECTIONS, INITIAL_POPULATION, MAX_STEPS, WORLD_LEN
+from evosim.kill_fn import outside_circle_kill_fn
+from evosim.reproduce_fn import mutate_reproduce
+from evosim.world import LOG_ALL, LOG_END, LOG_NONE, World
+
+GENERATIONS = 5
+REPEATS = 3  # the fastest run of each mode is kept
+MODES = {
+    "default": {},
+    "headless, log all": {"headless": True, "log_every": LOG_ALL},
+    "headless, log every 10": {"headless": True, "log_every": 10},
+    "headless, log end": {"headless": True, "log_every": LOG_END},
+    "headless, log none": {"headless": True, "log_every": LOG_NONE},
+}
+
+
+def run(engine: str, options: dict) -> tuple[float, int]:
+    """Seconds and agent steps of a run"""
+
+    world = World(
+        len=WORLD_LEN,
+        initial_population=INITIAL_POPULATION,
+        genome_connections=GENOME_CONNECTIONS,
+        kill_fn=outside_circle_kill_fn,
+        reproduction_fn=mutate_reproduce,
+        engine=engine,
+        seed=0,
+        **options,
+    )
+
+    agent_steps = 0
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+        start = time.perf_counter()
+        for gen in range(GENERATIONS):
+            agent_steps += len(world.agents) * MAX_STEPS
+            world.simulate_generation(gen)
+        return time.perf_counter() - start, agent_steps
+
+
+def main():
+    print(f"World {WORLD_LEN}x{WORLD_LEN}, {INITIAL_POPULATION} agents, {GENERATIONS} generations")
+    print(f"{'engine':>6} {'mode':>24} {'generations/s':>14} {'agent steps/s':>14} {'speedup':>8}")
+    for engine in ("object", "numpy"):
+        default = None
+        for mode, options in MODES.items():
+            seconds, agent_steps = min(run(engine, options) for _ in range(REPEATS))
+            default = default or seconds
+            print(
+                f"{engine:>6} {mode:>24} {GENERATIONS / seconds:>14.2f} {agent_steps / seconds:>14,.0f} "
+                f"{default / seconds:>7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
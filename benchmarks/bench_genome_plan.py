@@ -0,0 +1,62 @@
+"""
+Compare Agent.act running the compiled genome plan against the old path,
+which topologically sorted the genome on every step.
+
+    python -m benchmarks.bench_genome_plan
+"""
+
+import time
+from collections import defaultdict
+
+from evosim.agent import Agent
+from evosim.constants import GENOME_CONNECTIONS
+from evosim.reproduce_fn import mutate_reproduce
+from evosim.world import World
+
+WORLD_LEN = 64
+POPULATION = 100
+STEPS = 50
+
+
+def legacy_act(agent: Agent):
+    """Agent.act before genomes were compiled"""
+
+    sorted_neurons = Agent.topological_sort(agent.genome)
+
+    pending_inputs = defaultdict(list)
+
+    for neuron, genes in sorted_neurons:
+        value = neuron.execute(agent, pending_inputs[neuron], agent.activation_threshold)
+        for gene in genes:
+            pending_inputs[gene.target].append((value, gene.scale_weight()))
+
+
+def steps_per_sec(genome_connections: int, act) -> float:
+    world = World(
+        len=WORLD_LEN,
+        initial_population=POPULATION,
+        genome_connections=genome_connections,
+        kill_fn=lambda world_len, coord: False,
+        reproduction_fn=mutate_reproduce,
+        seed=0,
+    )
+
+    start = time.perf_counter()
+    for step in range(STEPS):
+        world.step = step
+        for agent in world.agents:
+            act(agent)
+    return STEPS / (time.perf_counter() - start)
+
+
+def main():
+    print(f"World {WORLD_LEN}x{WORLD_LEN}, {POPULATION} agents")
+    print(f"{'genes':>6} {'legacy steps/s':>15} {'plan steps/s':>13} {'speedup':>8}")
+    for genome_connections in (GENOME_CONNECTIONS, 32):
+        legacy = steps_per_sec(genome_connections, legacy_act)
+        compiled = steps_per_sec(genome_connections, Agent.act)
+        print(f"{genome_connections:>6} {legacy:>15.1f} {compiled:>13.1f} {compiled / legacy:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Compare the cached ring search behind MoveToClosestAgentCommand with the linear scan it replaced.
+Every agent asks for its closest agent up to six times (the move retries) and then moves,
+which is the worst case of a step where every agent fires CLOSE.
+
+The linear scan is quadratic, so it is timed on a sample of agents and extrapolated to a full step.
+
+    python -m benchmarks.bench_nearest
+"""
+
+import math
+import time
+
+from evosim.neuron.actions import MoveToClosestAgentCommand
+from evosim.reproduce_fn import mutate_reproduce
+from evosim.types import Direction
+from evosim.world import World
+
+POPULATIONS = (1_000, 10_000, 50_000)
+DENSITY = 0.25  # agents per cell
+QUERIES = 6  # BaseMoveCommand.execute tries up to six times
+LINEAR_SAMPLE = 50
+
+
+def linear_closest(agent):
+    """MoveToClosestAgentCommand.find_closest_agent before the cache"""
+
+    min_distance = float("inf")
+    closest_agent = None
+
+    for other_agent in agent.world.agents:
+        if other_agent is agent:
+            continue
+        distance = MoveToClosestAgentCommand.calculate_distance(agent.coord, other_agent.coord)
+        if distance < min_distance:
+            min_distance = distance
+            closest_agent = other_agent
+
+    return closest_agent
+
+
+def make_world(population: int) -> World:
+    return World(
+        len=math.ceil(math.sqrt(population / DENSITY)),
+        initial_population=population,
+        genome_connections=1,
+        kill_fn=lambda world_len, coord: False,
+        reproduction_fn=mutate_reproduce,
+        seed=0,
+    )
+
+
+def time_cached(world: World) -> float:
+    command = MoveToClosestAgentCommand()
+    start = time.perf_counter()
+    for agent in world.agents:
+        for _ in range(QUERIES):
+            command.find_closest_agent(agent)
+        agent.move(Direction.random(world.rng))
+    return time.perf_counter() - start
+
+
+def time_linear(world: World) -> float:
+    sample = world.rng.sample(world.agents, LINEAR_SAMPLE)
+    start = time.perf_counter()
+    for agent in sample:
+        for _ in range(QUERIES):
+            linear_closest(agent)
+        agent.move(Direction.random(world.rng))
+    return (time.perf_counter() - start) / LINEAR_SAMPLE * len(world.agents)
+
+
+def main():
+    print(f"Density {DENSITY} agents per cell, {QUERIES} queries and a move per agent")
+    print(f"{'population':>10} {'world':>9} {'linear s/step':>14} {'cached s/step':>14} {'speedup':>9}")
+    for population in POPULATIONS:
+        world = make_world(population)
+        linear = time_linear(world)
+        cached = time_cached(world)
+        print(
+            f"{population:>10} {f'{world.len}x{world.len}':>9} {linear:>14.2f} {cached:>14.3f} {linear / cached:>8.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
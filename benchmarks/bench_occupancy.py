@@ -0,0 +1,48 @@
+"""
+Time the movement phase of a simulation step for growing populations.
+
+With the occupancy grid, every free-cell check is O(1), so the time per agent should stay flat
+and the step time should grow linearly with the population.
+
+    python -m benchmarks.bench_occupancy
+"""
+
+import time
+
+from evosim.constants import GENOME_CONNECTIONS
+from evosim.reproduce_fn import mutate_reproduce
+from evosim.types import Direction
+from evosim.world import World
+
+WORLD_LEN = 256
+POPULATIONS = (1_000, 2_000, 4_000, 8_000, 16_000)
+STEPS = 5
+
+
+def time_step(population: int) -> float:
+    world = World(
+        len=WORLD_LEN,
+        initial_population=population,
+        genome_connections=GENOME_CONNECTIONS,
+        kill_fn=lambda world_len, coord: False,
+        reproduction_fn=mutate_reproduce,
+        seed=0,
+    )
+
+    start = time.perf_counter()
+    for _ in range(STEPS):
+        for agent in world.agents:
+            agent.move(Direction.random(world.rng))
+    return (time.perf_counter() - start) / STEPS
+
+
+def main():
+    print(f"World {WORLD_LEN}x{WORLD_LEN}, {GENOME_CONNECTIONS} genes per agent")
+    print(f"{'population':>10} {'ms/step':>10} {'us/agent':>10}")
+    for population in POPULATIONS:
+        seconds = time_step(population)
+        print(f"{population:>10} {seconds * 1e3:>10.1f} {seconds / population * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
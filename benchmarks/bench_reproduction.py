@@ -0,0 +1,80 @@
+"""
+Time reproduction while the simulation log grows.
+
+The old reproduction functions deep-copied the agents, and through Agent.world the whole world
+and its log, so their cost grew with the log. Offspring now share genomes and only get new
+agent records, so the time should stay flat.
+
+    python -m benchmarks.bench_reproduction
+"""
+
+import copy
+import time
+
+from evosim.agent import Agent
+from evosim.constants import GENOME_CONNECTIONS, INITIAL_POPULATION, WORLD_LEN
+from evosim.reproduce_fn import mutate_reproduce
+from evosim.types import AgentVisInfo, Coord, Log
+from evosim.world import World
+
+LOG_LENGTHS = (0, 100, 500, 1_000)
+REPEATS = 5
+
+
+def deepcopy_mutate_reproduce(agents: list[Agent]) -> list[Agent]:
+    """mutate_reproduce before the deep copies were removed"""
+
+    old_agents = copy.deepcopy(agents)
+
+    copied_agents = copy.deepcopy(agents)
+    new_agents = []
+    for parent in copied_agents:
+        new_genome = parent.genome.to_mutated(parent.world.rng)
+
+        new_agent = Agent.from_parent(parent, new_genome)
+        new_agents.append(new_agent)
+
+    return [*old_agents, *new_agents]
+
+
+def time_reproduction(world: World, reproduce) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        reproduce(world.agents)
+    return (time.perf_counter() - start) / REPEATS
+
+
+def main():
+    world = World(
+        len=WORLD_LEN,
+        initial_population=INITIAL_POPULATION,
+        genome_connections=GENOME_CONNECTIONS,
+        kill_fn=lambda world_len, coord: False,
+        reproduction_fn=mutate_reproduce,
+        seed=0,
+    )
+    world.log = []
+
+    print(f"{INITIAL_POPULATION} agents, log entries of {INITIAL_POPULATION} agents each")
+    print(f"{'log length':>10} {'deepcopy ms':>12} {'shared ms':>10}")
+    for log_length in LOG_LENGTHS:
+        while len(world.log) < log_length:
+            world.log.append(
+                Log(
+                    world_len=world.len,
+                    generation=0,
+                    step=len(world.log),
+                    agents=[
+                        AgentVisInfo(coord=Coord(agent.coord.x, agent.coord.y), color="#000000ff")
+                        for agent in world.agents
+                    ],
+                )
+            )
+
+        deepcopied = time_reproduction(world, deepcopy_mutate_reproduce)
+        shared = time_reproduction(world, mutate_reproduce)
+        print(f"{log_length:>10} {deepcopied * 1e3:>12.1f} {shared * 1e3:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
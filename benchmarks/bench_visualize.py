@@ -0,0 +1,58 @@
+"""
+Compare the frames per second of the visualize backends on the same logs.
+Frames are written to a temporary directory.
+
+    python -m benchmarks.bench_visualize
+"""
+
+import os
+import tempfile
+
+from evosim.constants import GENOME_CONNECTIONS, INITIAL_POPULATION, WORLD_LEN
+from evosim.kill_fn import outside_circle_kill_fn
+from evosim.reproduce_fn import mutate_reproduce
+from evosim.visualize import BACKENDS, visualize
+from evosim.world import World
+
+GENERATIONS = 2
+
+
+def make_logs():
+    world = World(
+        len=WORLD_LEN,
+        initial_population=INITIAL_POPULATION,
+        genome_connections=GENOME_CONNECTIONS,
+        kill_fn=outside_circle_kill_fn,
+        reproduction_fn=mutate_reproduce,
+        seed=0,
+    )
+    for generation in range(GENERATIONS):
+        world.simulate_generation(generation)
+
+    logs_by_gen = [[] for _ in range(GENERATIONS)]
+    for log_state in world.log:
+        logs_by_gen[log_state.generation].append(log_state)
+    return logs_by_gen
+
+
+def main():
+    logs_by_gen = make_logs()
+
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as output:
+        os.chdir(output)
+        try:
+            for backend in BACKENDS:
+                print(f"{backend}:")
+                results[backend] = visualize(logs_by_gen, outside_circle_kill_fn, backend=backend)
+        finally:
+            os.chdir(cwd)
+
+    print(f"{os.cpu_count()} cores")
+    for backend, fps in results.items():
+        print(f"{backend:>8} {fps:>8.1f} frames/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+"""
+Time the simulation hot paths over a sweep of population, world length and genome length,
+record the results as JSON and compare them with a stored baseline.
+
+    python -m benchmarks.suite                       # full sweep, compared with benchmarks/baseline.json
+    python -m benchmarks.suite --quick --out bench.json
+    python -m benchmarks.suite --save-baseline       # record the baseline of this machine
+    python -m benchmarks.suite --memory              # peak and retained memory too, with tracemalloc
+
+Every benchmark is timed on fresh state, the setup isn't timed, and the fastest of the repeats is kept.
+With --memory every case is run once more under tracemalloc, apart from the timed runs.
+Exits with 1 when a benchmark is slower, or uses more memory, than its baseline by more than the threshold.
+Runs headless, figures are drawn with the Agg backend into a temporary directory.
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Optional
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import numpy as np
+from matplotlib import pyplot as plt
+
+from evosim.genome import Genome
+from evosim.kill_fn import outside_circle_kill_fn, visualize_kill_zone
+from evosim.log_store import StepFrame
+from evosim.memory import measure_memory
+from evosim.reproduce_fn import mutate_reproduce
+from evosim.rng import RNG
+from evosim.visualize import visualize_log
+from evosim.world import World
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+SWEEPS = {
+    "full": {"population": (100, 1_000), "world_len": (64, 256), "genome_len": (6, 32)},
+    "quick": {"population": (100,), "world_len": (64,), "genome_len": (6, 32)},
+}
+GENOMES = 1_000  # genomes per run of the genome benchmarks
+
+Run = Callable[[], None]
+
+
+@dataclass
+class Benchmark:
+    name: str
+    axes: tuple[str, ...]  # sweep parameters the benchmark depends on
+    setup: Callable[..., tuple[Run, int]]  # fresh state for a run, and the number of operations it performs
+    unit: str  # what an operation is
+
+
+@dataclass
+class Result:
+    benchmark: str
+    params: dict[str, int]
+    unit: str
+    ops: int
+    best: float  # seconds per operation of the fastest repeat
+    median: float
+    peak_memory: Optional[int] = None  # bytes allocated at the peak of a run, with --memory
+    retained_memory: Optional[int] = None  # bytes still allocated after it
+
+    @property
+    def key(self) -> str:
+        params = ",".join(f"{name}={value}" for name, value in self.params.items())
+        return f"{self.benchmark}[{params}]"
+
+
+def make_world(population: int, world_len: int, genome_len: int) -> World:
+    return World(
+        len=world_len,
+        initial_population=population,
+        genome_connections=genome_len,
+        kill_fn=outside_circle_kill_fn,
+        reproduction_fn=mutate_reproduce,
+        seed=0,
+    )
+
+
+def frame(world: World) -> StepFrame:
+    return StepFrame(
+        world_len=world.len,
+        generation=0,
+        step=0,
+        xs=np.array([agent.coord.x for agent in world.agents], dtype=np.int16),
+        ys=np.array([agent.coord.y for agent in world.agents], dtype=np.int16),
+        color_ids=np.array([agent.get_color_id() for agent in world.agents], dtype=np.uint32),
+        palette=world.palette,
+    )
+
+
+def setup_agent_act(population: int, world_len: int, genome_len: int) -> tuple[Run, int]:
+    world = make_world(population, world_len, genome_len)
+    for agent in world.agents:
+        agent.genome.plan  # compiled outside the timing
+
+    def run():
+        for agent in world.agents:
+            agent.act()
+
+    return run, len(world.agents)
+
+
+def setup_simulate_generation(population: int, world_len: int, genome_len: int) -> tuple[Run, int]:
+    world = make_world(population, world_len, genome_len)
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            world.simulate_generation(0)
+
+    return run, 1
+
+
+def setup_genome_random(genome_len: int) -> tuple[Run, int]:
+    rng = RNG(0)
+
+    def run():
+        for _ in range(GENOMES):
+            Genome.random(genome_len, rng)
+
+    return run, GENOMES
+
+
+def setup_genome_to_mutated(genome_len: int) -> tuple[Run, int]:
+    rng = RNG(0)
+    genomes = [Genome.random(genome_len, rng) for _ in range(GENOMES)]
+
+    def run():
+        for genome in genomes:
+            genome.to_mutated(rng)
+
+    return run, GENOMES
+
+
+def setup_genome_to_hex(genome_len: int) -> tuple[Run, int]:
+    rng = RNG(0)
+    # New genomes, the color is computed once per genome and the first time is what gets timed
+    genomes = [Genome.random(genome_len, rng) for _ in range(GENOMES)]
+
+    def run():
+        for genome in genomes:
+            genome.to_hex()
+
+    return run, GENOMES
+
+
+def setup_mutate_reproduce(population: int, genome_len: int) -> tuple[Run, int]:
+    world = make_world(population, 256, genome_len)
+
+    def run():
+        mutate_reproduce(world.agents)
+
+    return run, len(world.agents)
+
+
+def setup_visualize_log(population: int, world_len: int) -> tuple[Run, int]:
+    step = frame(make_world(population, world_len, 6))
+
+    def run():
+        visualize_log(step, outside_circle_kill_fn, end_of_gen=True)
+        plt.close("all")
+
+    return run, 1
+
+
+def setup_visualize_kill_zone(world_len: int) -> tuple[Run, int]:
+    def run():
+        visualize_kill_zone(world_len, outside_circle_kill_fn, "kill-zone.png")
+        plt.close("all")
+
+    return run, 1
+
+
+BENCHMARKS = [
+    Benchmark("agent_act", ("population", "world_len", "genome_len"), setup_agent_act, "agent step"),
+    Benchmark(
+        "simulate_generation", ("population", "world_len", "genome_len"), setup_simulate_generation, "generation"
+    ),
+    Benchmark("genome_random", ("genome_len",), setup_genome_random, "genome"),
+    Benchmark("genome_to_mutated", ("genome_len",), setup_genome_to_mutated, "genome"),
+    Benchmark("genome_to_hex", ("genome_len",), setup_genome_to_hex, "genome"),
+    Benchmark("mutate_reproduce", ("population", "genome_len"), setup_mutate_reproduce, "agent"),
+    Benchmark("visualize_log", ("population", "world_len"), setup_visualize_log, "frame"),
+    Benchmark("visualize_kill_zone", ("world_len",), setup_visualize_kill_zone, "figure"),
+]
+
+
+def cases(sweep: dict[str, tuple[int, ...]]) -> list[tuple[Benchmark, dict[str, int]]]:
+    """Every benchmark with every combination of the sweep parameters it depends on"""
+
+    return [
+        (benchmark, dict(zip(benchmark.axes, values)))
+        for benchmark in BENCHMARKS
+        for values in itertools.product(*(sweep[axis] for axis in benchmark.axes))
+    ]
+
+
+def measure(benchmark: Benchmark, params: dict[str, int], repeat: int, memory: bool = False) -> Result:
+    times = []
+    for _ in range(repeat):
+        run, ops = benchmark.setup(**params)
+        start = time.perf_counter()
+        run()
+        times.append((time.perf_counter() - start) / ops)
+
+    result = Result(benchmark.name, params, benchmark.unit, ops, min(times), statistics.median(times))
+    if memory:
+        # Tracing slows everything down, so it's kept out of the timed runs
+        run, _ = benchmark.setup(**params)
+        result.peak_memory, result.retained_memory = measure_memory(run)
+    return result
+
+
+def machine() -> dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "matplotlib": matplotlib.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": str(os.cpu_count()),
+    }
+
+
+def run_suite(
+    sweep: str = "full", repeat: int = 3, only: Optional[list[str]] = None, memory: bool = False
+) -> list[Result]:
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        # visualize_log writes into ./steps/
+        os.chdir(scratch)
+        try:
+            for benchmark, params in cases(SWEEPS[sweep]):
+                if only and benchmark.name not in only:
+                    continue
+                result = measure(benchmark, params, repeat, memory)
+                line = f"{result.key:<70} {format_time(result.best):>10}/{result.unit}"
+                if memory:
+                    peak, kept = format_bytes(result.peak_memory), format_bytes(result.retained_memory)
+                    line += f" {peak:>10} peak {kept:>10} kept"
+                print(line)
+                results.append(result)
+        finally:
+            os.chdir(cwd)
+    return results
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.0f}ns"
+
+
+def format_bytes(size: int) -> str:
+    for unit, scale in (("MB", 2**20), ("KB", 2**10)):
+        if abs(size) >= scale:
+            return f"{size / scale:.1f}{unit}"
+    return f"{size}B"
+
+
+def write_json(results: list[Result], path: str, sweep: str):
+    with open(path, "w") as f:
+        data = {"machine": machine(), "sweep": sweep, "results": [asdict(result) for result in results]}
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+def read_json(path: str) -> dict[str, Result]:
+    with open(path) as f:
+        data = json.load(f)
+    results = [Result(**result) for result in data["results"]]
+    return {result.key: result for result in results}
+
+
+def compare(results: list[Result], baseline: dict[str, Result], threshold: float) -> list[tuple[Result, float]]:
+    """Print every result next to its baseline, returns the results slower or bigger by more than the threshold"""
+
+    regressions = []
+    print(f"{'benchmark':<70} {'baseline':>10} {'now':>10} {'change':>8} {'peak memory':>12}")
+    for result in results:
+        base = baseline.get(result.key)
+        if base is None:
+            print(f"{result.key:<70} {'-':>10} {format_time(result.best):>10} {'new':>8}")
+            continue
+
+        ratio = result.best / base.best
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append((result, ratio))
+            flag = "  REGRESSION"
+
+        memory = ""
+        if result.peak_memory is not None and base.peak_memory:
+            memory_ratio = result.peak_memory / base.peak_memory
+            memory = f"{memory_ratio - 1:>+12.0%}"
+            if memory_ratio > 1 + threshold:
+                regressions.append((result, memory_ratio))
+                flag = "  REGRESSION"
+        print(
+            f"{result.key:<70} {format_time(base.best):>10} {format_time(result.best):>10} {ratio - 1:>+8.0%}"
+            f"{memory}{flag}"
+        )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="small sweep, for a check before committing")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, the fastest is kept")
+    parser.add_argument("--only", nargs="+", choices=[benchmark.name for benchmark in BENCHMARKS])
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=BASELINE, help="results to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="growth flagged as a regression, 0.2 is 20%%")
+    parser.add_argument("--memory", action="store_true", help="also record peak and retained memory")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to --baseline")
+    args = parser.parse_args(argv)
+
+    sweep = "quick" if args.quick else "full"
+    results = run_suite(sweep, args.repeat, args.only, args.memory)
+
+    if args.out:
+        write_json(results, args.out, sweep)
+        print(f"Wrote {len(results)} results to {args.out}")
+    if args.save_baseline:
+        write_json(results, args.baseline, sweep)
+        print(f"Wrote the baseline to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save-baseline to record one")
+        return 0
+
+    print()
+    regressions = compare(results, read_json(args.baseline), args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regressions above {args.threshold:.0%}")
+        return 1
+    print(f"No regressions above {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
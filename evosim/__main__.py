@@ -1,10 +1,23 @@
+import argparse
 import random
+import time
 from typing import TYPE_CHECKING
 
 from evosim.agent import Agent
-from evosim.constants import GENOME_CONNECTIONS, INITIAL_POPULATION, MAX_WEIGHT, MIN_WEIGHT, NUM_GENERATIONS, WORLD_LEN
+from evosim.animation import AnimationWriter
+from evosim.checkpoint import CheckpointWriter, load_checkpoint
+from evosim.constants import (
+    GENOME_CONNECTIONS,
+    INITIAL_POPULATION,
+    MAX_STEPS,
+    MAX_WEIGHT,
+    MIN_WEIGHT,
+    NUM_GENERATIONS,
+    WORLD_LEN,
+)
 from evosim.genome import Gene, Genome
 from evosim.kill_fn import center_circle_kill_fn, middle_kill_fn, outside_circle_kill_fn, visualize_kill_zone
+from evosim.memory import MemoryProfiler
 from evosim.neuron.actions import (
     MoveEastWestCommand,
     MoveNorthSouthCommand,
@@ -21,25 +34,90 @@ from evosim.neuron.senses import (
     XWallSensoryCommand,
     YWallSensoryCommand,
 )
+from evosim.profiler import Profiler
+from evosim.progress import print_progress
 from evosim.reproduce_fn import clone_reproduce, mutate_reproduce
-from evosim.types import Log
-from evosim.visualize import visualize
-from evosim.world import World
+from evosim.visualize import BACKENDS, visualize
+from evosim.world import LOG_ALL, LOG_END, LOG_NONE, World
 
 kill_fn = outside_circle_kill_fn
 reproduce_fn = mutate_reproduce
 
 
-def main():
+def log_every(value: str) -> int:
+    """all, end, none or a number of steps"""
+
+    named = {"all": LOG_ALL, "end": LOG_END, "none": LOG_NONE}
+    if value in named:
+        return named[value]
+    if value.isdigit() and int(value) > 0:
+        return int(value)
+    raise argparse.ArgumentTypeError(f"{value} is not all, end, none or a positive number of steps")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m evosim", description="Run an evolutionary simulation")
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument(
+        "--show", action="store_true", help="render every step into ./steps/<generation>/ (the default)"
+    )
+    output.add_argument(
+        "--save", metavar="PATH", help="stream the run into an animation, .gif or anything ffmpeg writes"
+    )
+    output.add_argument(
+        "--headless", action="store_true", help="evolve without rendering, tqdm bars or printing every genome"
+    )
+    parser.add_argument(
+        "--log", type=log_every, default=LOG_ALL, help="steps rendered or saved: all, end, none or every k steps"
+    )
+    parser.add_argument("--fps", type=int, default=10, help="frames per second of a saved animation")
+    parser.add_argument("--backend", choices=BACKENDS, default="process", help="renderer for --show")
+    parser.add_argument("--checkpoint", metavar="PATH", help="write a checkpoint to PATH after every generation")
+    parser.add_argument("--resume", action="store_true", help="continue from the last checkpoint in --checkpoint")
+    parser.add_argument("--seed", type=int, help="seed of the run, drawn and printed when not given")
+    parser.add_argument("--fsync-every", type=int, default=1, help="checkpoints between fsyncs, 0 never syncs")
+    parser.add_argument(
+        "--profile", metavar="PATH", help="write phase timings of every generation to PATH, as CSV for .csv"
+    )
+    parser.add_argument("--memory", metavar="PATH", help="write the memory of every generation to PATH, much slower")
+    args = parser.parse_args(argv)
+    if args.resume and not args.checkpoint:
+        parser.error("--resume needs --checkpoint")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    checkpoint = load_checkpoint(args.checkpoint) if args.resume else None
+    # A new run starts the file over, a resumed one carries on after the checkpoint it resumed from
+    checkpoints = CheckpointWriter(args.checkpoint, args.fsync_every, append=args.resume) if args.checkpoint else None
+    profile = open(args.profile, "w", newline="") if args.profile else None
+    profiler = Profiler(profile, "csv" if args.profile.endswith(".csv") else "json") if profile else None
+    memory_log = open(args.memory, "w") if args.memory else None
+    memory = MemoryProfiler(memory_log) if memory_log else None
+
     world = World(
         len=WORLD_LEN,
         initial_population=INITIAL_POPULATION,
         genome_connections=GENOME_CONNECTIONS,
         kill_fn=kill_fn,
         reproduction_fn=reproduce_fn,
+        checkpoints=checkpoints,
+        seed=args.seed,
+        profiler=profiler,
+        memory=memory,
+        log_every=args.log,
+        headless=args.headless,
+        progress=print_progress if args.headless else None,
     )
+    print(f"Seed {world.rng.seed}")
+
+    if not args.headless:
+        visualize_kill_zone(WORLD_LEN, kill_fn, "./current-kill-zone.png")
 
-    visualize_kill_zone(WORLD_LEN, kill_fn, "./current-kill-zone.png")
+    # Made up front so a .gif path that can't be written, or a missing ffmpeg, fails before the simulation
+    writer = AnimationWriter(args.save, kill_fn, fps=args.fps) if args.save else None
 
     # Gene pool:
     # init_agents = []
@@ -68,18 +146,41 @@ def main():
     #     init_agents.append(agent)
     # world.provide_agents(init_agents)
 
-    log = world.simulate()
-
-    print("Creating visualizations ...")
-
-    logs_by_gen: list[list["Log"]] = [[] for _ in range(NUM_GENERATIONS)]
+    if checkpoint is not None:
+        checkpoint.restore(world)
+        print(f"Resuming at generation {world.generation}")
 
-    for log_state in log:
-        logs_by_gen[log_state.generation].append(log_state)
+    # The steps are streamed out of the simulation into the renderers as they are taken,
+    # rendering overlaps with simulating and the run is never held in memory
+    if args.headless:
+        start = time.perf_counter()
+        for _ in world.iter_steps():
+            ...
+        elapsed = time.perf_counter() - start
+        generations = NUM_GENERATIONS - (checkpoint.generation if checkpoint is not None else 0)
+        print(f"Simulated {generations} generations in {elapsed:.1f}s")
+    elif writer is not None:
+        start = time.perf_counter()
+        with writer:
+            for frame in world.iter_steps():
+                writer.put(frame)
+                if frame.step == MAX_STEPS - 1:
+                    writer.put(frame, end_of_gen=True)
+        elapsed = time.perf_counter() - start
+        print(f"Simulated and saved {writer.frames} frames to {args.save} in {elapsed:.1f}s")
+    else:
+        visualize(world.iter_generations(), kill_fn, backend=args.backend)
 
-    visualize(logs_by_gen, kill_fn)
+    if checkpoints is not None:
+        checkpoints.close()
+    if profile is not None:
+        profile.close()
+    if memory is not None:
+        # iter_steps stopped the tracing
+        memory_log.close()
 
-    print("Visualizations complete")
+    if not args.headless:
+        print("Visualizations complete")
 
 
 if __name__ == "__main__":
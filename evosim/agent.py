@@ -1,7 +1,7 @@
-from collections import defaultdict, deque
 from typing import TYPE_CHECKING, Optional, Union
 
 from evosim.activation import execute_action, get_sensory_value
+from evosim.compiler import topological_sort
 from evosim.constants import ACTION_TYPE
 
 # from evosim.activation import execute_action, get_value
@@ -17,7 +17,8 @@ if TYPE_CHECKING:
 
 
 class Agent:
-    coord: Coord
+    id: int  # index in world.agents and value in world.occupancy, -1 until the world places the agent
+    _coord: Coord
     world: "World"
     genome: Genome
     activation_threshold: float  # how much the input gene has to return for the gene to activate
@@ -29,31 +30,52 @@ class Agent:
         genome_connections: int,
         activation_threshold=0.25,
         coord: Optional[Coord] = None,
+        genome: Optional[Genome] = None,
     ):
         self.world = world
+        self.id = -1
         if coord is not None:
             self.coord = coord
         else:
-            self.coord = random_position(world.len)
+            self.coord = random_position(world.len, world.rng)
 
-        self.genome = Genome.random(genome_connections)
+        self.genome = genome if genome is not None else Genome.random(genome_connections, world.rng)
         self.activation_threshold = activation_threshold
 
         self.age = 0
 
+    @property
+    def coord(self) -> Coord:
+        return self._coord
+
+    @coord.setter
+    def coord(self, coord: Coord):
+        if self.id >= 0:
+            self.world.place_agent(self, coord)
+        else:
+            self._coord = coord
+
     def set_genome(self, genome: Genome):
         self.genome = genome
 
     @classmethod
     def from_parent(cls, parent: "Agent", new_genome: Genome):
-        new_agent = Agent(
+        """A newborn agent, placed on the parent's cell until the world scatters the agents"""
+
+        return cls(
             world=parent.world,
             genome_connections=0,
             activation_threshold=parent.activation_threshold,
+            coord=Coord(parent.coord.x, parent.coord.y),
+            genome=new_genome,
         )
-        new_agent.genome = new_genome
-        new_agent.age = 0
-        return new_agent
+
+    def clone(self) -> "Agent":
+        """An identical agent sharing the genome"""
+
+        clone = self.from_parent(self, self.genome)
+        clone.age = self.age
+        return clone
 
     def can_move_in_direction(self, direction: Direction):
         if not self.world.is_coord_free(next_coord(self.coord, direction)):
@@ -71,61 +93,21 @@ class Agent:
 
     def move(self, direction: Direction):
         if self.can_move_in_direction(direction):
-            if direction == Direction.N:
-                self.coord.y -= 1
-            elif direction == Direction.S:
-                self.coord.y += 1
-            elif direction == Direction.E:
-                self.coord.x += 1
-            elif direction == Direction.W:
-                self.coord.x -= 1
+            self.coord = next_coord(self.coord, direction)
 
     @staticmethod
     def topological_sort(genome: Genome) -> list[tuple[Union[SensoryCommand, InternalCommand, ActionCommand], "Gene"]]:
-        # Create a dictionary to store in-degree of each vertex
-        in_degree = defaultdict(int)
-        graph = defaultdict(list)
-
-        # Create the graph and calculate in-degree of each node
-        for gene in genome:
-            graph[gene.source].append(gene)
-            in_degree[gene.target] += 1
-            in_degree[gene.source] += 0  # Ensure every vertex is in in_degree
-
-        # Queue for vertices with in-degree 0
-        queue = deque([v for v in in_degree if in_degree[v] == 0])
-
-        top_order = []
-
-        while queue:
-            vertex = queue.popleft()
-            top_order.append((vertex, graph[vertex]))  # this is the next node to be processed
-
-            # Decrease the in-degree of neighbors
-            for gene in graph[vertex]:
-                in_degree[gene.target] -= 1
-                if in_degree[gene.target] == 0:
-                    queue.append(gene.target)
-
-        # Check if topological sorting is possible or not
-        if len(top_order) != len(in_degree):
-            return "Cycle detected! Topological sorting not possible."
-
-        return top_order
+        return topological_sort(genome)
 
     def act(self):
-        """Process each connection in the genome to determine outputs"""
+        """Run the genome's compiled plan to determine outputs"""
 
-        # TODO: this currently assumes only sensor->action
+        plan = self.genome.plan
+        values = [0.0] * len(plan)
 
-        sorted_neurons = self.topological_sort(self.genome)
-
-        pending_inputs = defaultdict(list)
-
-        for neuron, genes in sorted_neurons:
-            value = neuron.execute(self, pending_inputs[neuron], self.activation_threshold)
-            for gene in genes:
-                pending_inputs[gene.target].append((value, gene.scale_weight()))
+        for slot, neuron in enumerate(plan.neurons):
+            inputs = [(values[source], weight) for source, weight in plan.inputs[slot]]
+            values[slot] = neuron.execute(self, inputs, self.activation_threshold)
 
     def celebrate_birthday(self):
         self.age += 1
@@ -134,3 +116,8 @@ class Agent:
         """Get the color depending on the genome"""
 
         return self.genome.to_hex()
+
+    def get_color_id(self) -> int:
+        """Id of the color in the world's palette"""
+
+        return self.world.palette.id_of(self.genome.to_hex())
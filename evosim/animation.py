@@ -0,0 +1,156 @@
+import os
+import shutil
+import subprocess
+from typing import Optional, Union
+
+from PIL import GifImagePlugin, Image
+
+from evosim.log_store import StepFrame
+from evosim.raster import RasterRenderer
+from evosim.streaming import BackgroundConsumer
+from evosim.types import KillFn, Log
+
+Frame = Union[Log, StepFrame]
+
+
+class GifStream:
+    """Appends frames to an animated GIF as they arrive, each frame gets its own palette"""
+
+    def __init__(self, path: str, fps: int):
+        self.path = path
+        self.file = open(path, "wb")
+        self.duration = round(1000 / fps)
+        self.started = False
+
+    def write(self, image: Image.Image):
+        frame = image.quantize(256, method=Image.Quantize.FASTOCTREE)
+        if not self.started:
+            header, _ = GifImagePlugin.getheader(frame, info={"loop": 0, "duration": self.duration})
+            self.file.write(b"".join(header))
+            self.started = True
+        self.file.write(b"".join(GifImagePlugin.getdata(frame, duration=self.duration, include_color_table=True)))
+
+    def close(self):
+        if not self.started:
+            # No frame arrived, leave no file rather than a broken GIF
+            self.file.close()
+            os.remove(self.path)
+            return
+        self.file.write(b";")  # trailer
+        self.file.close()
+
+
+class FFmpegStream:
+    """Pipes raw RGB frames into an ffmpeg process, for video containers such as .mp4"""
+
+    def __init__(self, path: str, size: tuple[int, int], fps: int):
+        ffmpeg = find_ffmpeg(path)
+        width, height = size
+        self.process = subprocess.Popen(
+            [
+                ffmpeg,
+                "-loglevel",
+                "error",
+                "-y",
+                "-f",
+                "rawvideo",
+                "-pix_fmt",
+                "rgb24",
+                "-s",
+                f"{width}x{height}",
+                "-r",
+                str(fps),
+                "-i",
+                "-",
+                "-pix_fmt",
+                "yuv420p",
+                path,
+            ],
+            stdin=subprocess.PIPE,
+        )
+
+    def write(self, image: Image.Image):
+        self.process.stdin.write(image.tobytes())
+
+    def close(self):
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise Exception(f"ffmpeg exited with {self.process.returncode}")
+
+
+def is_gif(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() == ".gif"
+
+
+def find_ffmpeg(path: str) -> str:
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise ValueError(f"Saving {path} needs ffmpeg on the PATH, save a .gif instead")
+    return ffmpeg
+
+
+class AnimationWriter(BackgroundConsumer[tuple["Frame", bool]]):
+    """
+    Streams frames into an animation file without writing them to disk one by one.
+    A background thread renders and encodes the queued frames, see BackgroundConsumer.
+    """
+
+    path: str
+    fps: int
+    frames: int  # number of frames encoded
+
+    def __init__(self, path: str, kill_fn: KillFn, fps: int = 10, max_queued: int = 64):
+        self.path = path
+        self.kill_fn = kill_fn
+        self.fps = fps
+        self.frames = 0
+
+        self.renderer: Optional[RasterRenderer] = None
+        self.stream: Optional[Union[GifStream, FFmpegStream]] = None
+        # Fail before anything is simulated: a GIF is opened now, ffmpeg needs the frame size
+        # and is only looked up, it is started with the first frame
+        if is_gif(path):
+            self.stream = GifStream(path, fps)
+        else:
+            find_ffmpeg(path)
+
+        super().__init__(self.write, max_queued)
+
+    def put(self, log: "Frame", end_of_gen: bool = False):
+        """Queue a frame, blocks while the queue is full"""
+
+        super().put((log, end_of_gen))
+
+    def put_generation(self, generation: list["Frame"]):
+        """Queue every step of a generation and its end"""
+
+        for log_state in generation:
+            self.put(log_state)
+        if generation:
+            self.put(generation[-1], end_of_gen=True)
+
+    def write(self, item: tuple["Frame", bool]):
+        log, end_of_gen = item
+        if self.renderer is None:
+            # The animation has a fixed size, frames of other world sizes are refused
+            self.renderer = RasterRenderer(log.world_len, self.kill_fn)
+            if self.stream is None:
+                self.stream = FFmpegStream(self.path, self.renderer.size, self.fps)
+        elif log.world_len != self.renderer.world_len:
+            raise ValueError(f"Frame of a {log.world_len} world in a {self.renderer.world_len} animation")
+
+        self.stream.write(self.renderer.draw(log, end_of_gen))
+        self.frames += 1
+
+    def close(self) -> int:
+        """Wait for the queued frames to be encoded and finish the file, returns the number of frames"""
+
+        try:
+            super().close()
+        finally:
+            if self.stream is not None:
+                self.stream.close()
+        return self.frames
+
+    def __enter__(self) -> "AnimationWriter":
+        return self
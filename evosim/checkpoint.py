@@ -0,0 +1,253 @@
+import json
+import os
+import struct
+import zlib
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterator, Optional
+
+import numpy as np
+
+from evosim.agent import Agent
+from evosim.genome import Genome, pack_genomes, unpack_genomes
+from evosim.types import Coord
+
+if TYPE_CHECKING:
+    from evosim.world import World
+
+MAGIC = b"EVOCKPT1"
+
+# Fixed part of a record, followed by the agent columns, the packed genomes and the RNG state
+HEADER_DTYPE = np.dtype(
+    [
+        ("generation", "<i4"),
+        ("world_len", "<i4"),
+        ("count", "<i4"),
+        ("genome_bytes", "<i8"),
+        ("rng_bytes", "<i4"),
+    ]
+)
+
+LENGTH = struct.Struct("<Q")  # before every record
+CRC = struct.Struct("<I")  # after every record, a torn write at the end of the file fails it
+
+
+@dataclass
+class Checkpoint:
+    """The state of a world between two generations, enough to carry on as if it had never stopped"""
+
+    generation: int  # next generation to simulate
+    world_len: int
+    xs: np.ndarray
+    ys: np.ndarray
+    ages: np.ndarray
+    thresholds: np.ndarray
+    genomes: list[Genome]
+    rng_state: tuple[dict, list[float], list[int]]  # world.rng.getstate()
+
+    @classmethod
+    def from_world(cls, world: "World") -> "Checkpoint":
+        agents = world.agents
+        return cls(
+            generation=world.generation,
+            world_len=world.len,
+            xs=np.array([agent.coord.x for agent in agents], dtype="<i2"),
+            ys=np.array([agent.coord.y for agent in agents], dtype="<i2"),
+            ages=np.array([agent.age for agent in agents], dtype="<i4"),
+            thresholds=np.array([agent.activation_threshold for agent in agents], dtype="<f8"),
+            genomes=[agent.genome for agent in agents],
+            rng_state=world.rng.getstate(),
+        )
+
+    def restore(self, world: "World"):
+        """
+        Put the agents, generation counter and RNG state into a world built with the same settings
+        (kill and reproduction functions, engine, mutation rate) as the one that was checkpointed.
+        """
+
+        if world.len != self.world_len:
+            raise ValueError(f"Checkpoint of a {self.world_len} world can't be restored in a {world.len} world")
+
+        agents = []
+        for x, y, age, threshold, genome in zip(
+            self.xs.tolist(), self.ys.tolist(), self.ages.tolist(), self.thresholds.tolist(), self.genomes
+        ):
+            agent = Agent(world, len(genome.genes), activation_threshold=threshold, coord=Coord(x, y), genome=genome)
+            agent.age = age
+            agents.append(agent)
+
+        # Not provide_agents, the agents keep their positions and no randomness is drawn
+        world.agents = agents
+        world.index_agents()
+        world.generation = self.generation
+        world.step = 0
+
+        world.rng.setstate(self.rng_state)
+
+    def to_bytes(self) -> bytes:
+        genomes = pack_genomes(self.genomes)
+        rng = pack_rng(self.rng_state)
+        header = np.array([(self.generation, self.world_len, len(self.xs), len(genomes), len(rng))], dtype=HEADER_DTYPE)
+        return b"".join(
+            [
+                header.tobytes(),
+                self.xs.astype("<i2").tobytes(),
+                self.ys.astype("<i2").tobytes(),
+                self.ages.astype("<i4").tobytes(),
+                self.thresholds.astype("<f8").tobytes(),
+                genomes,
+                rng,
+            ]
+        )
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "Checkpoint":
+        header = np.frombuffer(payload, dtype=HEADER_DTYPE, count=1)[0]
+        count = int(header["count"])
+        offset = HEADER_DTYPE.itemsize
+
+        def column(dtype: str) -> np.ndarray:
+            nonlocal offset
+            values = np.frombuffer(payload, dtype=dtype, count=count, offset=offset)
+            offset += values.nbytes
+            return values
+
+        xs, ys, ages, thresholds = column("<i2"), column("<i2"), column("<i4"), column("<f8")
+        genome_end = offset + int(header["genome_bytes"])
+        genomes = unpack_genomes(payload[offset:genome_end])
+        rng_state = unpack_rng(payload[genome_end : genome_end + int(header["rng_bytes"])])
+
+        return cls(
+            generation=int(header["generation"]),
+            world_len=int(header["world_len"]),
+            xs=xs,
+            ys=ys,
+            ages=ages,
+            thresholds=thresholds,
+            genomes=genomes,
+            rng_state=rng_state,
+        )
+
+
+RNG_HEADER = struct.Struct("<III")  # sizes of the generator state, the pre-drawn floats and words
+
+
+def pack_rng(state: tuple[dict, list[float], list[int]]) -> bytes:
+    """The generator state as JSON, followed by the values it has drawn but not handed out yet"""
+
+    generator_state, floats, words = state
+    generator = json.dumps(generator_state).encode()
+    return b"".join(
+        [
+            RNG_HEADER.pack(len(generator), len(floats), len(words)),
+            generator,
+            np.array(floats, dtype="<f8").tobytes(),
+            np.array(words, dtype="<u4").tobytes(),
+        ]
+    )
+
+
+def unpack_rng(buffer: bytes) -> tuple[dict, list[float], list[int]]:
+    generator_bytes, float_count, word_count = RNG_HEADER.unpack_from(buffer)
+    offset = RNG_HEADER.size
+    generator_state = json.loads(buffer[offset : offset + generator_bytes])
+    offset += generator_bytes
+    floats = np.frombuffer(buffer, dtype="<f8", count=float_count, offset=offset).tolist()
+    offset += 8 * float_count
+    words = np.frombuffer(buffer, dtype="<u4", count=word_count, offset=offset).tolist()
+    return generator_state, floats, words
+
+
+class CheckpointWriter:
+    """
+    Appends a checkpoint to a file at every generation boundary.
+    Writes are flushed every time and fsynced every fsync_every checkpoints, 0 leaves syncing to the OS.
+    An existing file is overwritten unless append is set, to carry on a run resumed from it.
+    """
+
+    path: str
+    fsync_every: int
+    written: int
+
+    def __init__(self, path: str, fsync_every: int = 1, append: bool = False):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.written = 0
+
+        # Appends go after the last complete record, a record torn by a crash is dropped
+        end = valid_end(path) if append and os.path.exists(path) else 0
+        self.file = open(path, "r+b" if end else "wb")
+        self.file.truncate(end)
+        self.file.seek(end)
+        if end == 0:
+            self.file.write(MAGIC)
+
+    def write(self, world: "World"):
+        payload = Checkpoint.from_world(world).to_bytes()
+        self.file.write(LENGTH.pack(len(payload)) + payload + CRC.pack(zlib.crc32(payload)))
+        self.file.flush()
+
+        self.written += 1
+        if self.fsync_every and self.written % self.fsync_every == 0:
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+
+    def __enter__(self) -> "CheckpointWriter":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def records(f) -> Iterator[tuple[int, bytes]]:
+    """The end offset and payload of every complete record, stopping at a torn or corrupt one"""
+
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"{f.name} is not a checkpoint file")
+
+    while True:
+        length = f.read(LENGTH.size)
+        if len(length) < LENGTH.size:
+            return
+        (size,) = LENGTH.unpack(length)
+        payload = f.read(size)
+        crc = f.read(CRC.size)
+        if len(payload) < size or len(crc) < CRC.size or CRC.unpack(crc)[0] != zlib.crc32(payload):
+            return
+        yield f.tell(), payload
+
+
+def valid_end(path: str) -> int:
+    """Size of the file up to its last complete record, 0 for an empty file"""
+
+    with open(path, "rb") as f:
+        if not f.read(1):
+            return 0
+        f.seek(0)
+        end = len(MAGIC)
+        for end, _ in records(f):
+            ...
+        return end
+
+
+def read_checkpoints(path: str) -> Iterator[Checkpoint]:
+    """The complete checkpoints of a file in order"""
+
+    with open(path, "rb") as f:
+        for _, payload in records(f):
+            yield Checkpoint.from_bytes(payload)
+
+
+def load_checkpoint(path: str, generation: Optional[int] = None) -> Checkpoint:
+    """The last checkpoint of a file, or the one taken before the given generation"""
+
+    found = None
+    for checkpoint in read_checkpoints(path):
+        if generation is None or checkpoint.generation == generation:
+            found = checkpoint
+    if found is None:
+        raise ValueError(f"No checkpoint{'' if generation is None else f' of generation {generation}'} in {path}")
+    return found
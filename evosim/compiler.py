@@ -0,0 +1,78 @@
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Union
+
+from evosim.neuron.actions import ActionCommand
+from evosim.neuron.internal import InternalCommand
+from evosim.neuron.senses import SensoryCommand
+
+if TYPE_CHECKING:
+    from evosim.genome import Gene, Genome
+
+Neuron = Union[SensoryCommand, InternalCommand, ActionCommand]
+
+
+@dataclass(frozen=True)
+class ExecutionPlan:
+    """
+    A genome flattened into the order its neurons are evaluated in.
+    Slot i holds neurons[i], which reads (source slot, scaled weight) pairs from inputs[i].
+    """
+
+    neurons: tuple[Neuron, ...]
+    inputs: tuple[tuple[tuple[int, float], ...], ...]
+
+    def __len__(self) -> int:
+        return len(self.neurons)
+
+
+def topological_sort(genome: "Genome") -> list[tuple[Neuron, list["Gene"]]]:
+    """Order the neurons of the genome so every neuron comes after all of its inputs"""
+
+    # Create a dictionary to store in-degree of each vertex
+    in_degree = defaultdict(int)
+    graph = defaultdict(list)
+
+    # Create the graph and calculate in-degree of each node
+    for gene in genome:
+        graph[gene.source].append(gene)
+        in_degree[gene.target] += 1
+        in_degree[gene.source] += 0  # Ensure every vertex is in in_degree
+
+    # Queue for vertices with in-degree 0
+    queue = deque([v for v in in_degree if in_degree[v] == 0])
+
+    top_order = []
+
+    while queue:
+        vertex = queue.popleft()
+        top_order.append((vertex, graph[vertex]))  # this is the next node to be processed
+
+        # Decrease the in-degree of neighbors
+        for gene in graph[vertex]:
+            in_degree[gene.target] -= 1
+            if in_degree[gene.target] == 0:
+                queue.append(gene.target)
+
+    # Check if topological sorting is possible or not
+    if len(top_order) != len(in_degree):
+        raise ValueError(f"Cycle detected in {genome}, topological sorting not possible")
+
+    return top_order
+
+
+def compile_genome(genome: "Genome") -> ExecutionPlan:
+    """Resolve the evaluation order and the weighted inputs of every neuron once"""
+
+    sorted_neurons = topological_sort(genome)
+    slots = {neuron: slot for slot, (neuron, _) in enumerate(sorted_neurons)}
+
+    inputs: list[list[tuple[int, float]]] = [[] for _ in sorted_neurons]
+    for slot, (_, genes) in enumerate(sorted_neurons):
+        for gene in genes:
+            inputs[slots[gene.target]].append((slot, gene.scale_weight()))
+
+    return ExecutionPlan(
+        neurons=tuple(neuron for neuron, _ in sorted_neurons),
+        inputs=tuple(tuple(neuron_inputs) for neuron_inputs in inputs),
+    )
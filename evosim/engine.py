@@ -0,0 +1,374 @@
+import math
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from evosim.constants import (
+    ACTION_TYPE,
+    CROWD_DISTANCE,
+    INTERNAL_TYPE,
+    MAX_STEPS,
+    NUM_INTERNAL_NEURONS,
+    SIGMOID_THRESHOLD,
+    WORLD_LEN,
+)
+from evosim.neuron.actions import (
+    MoveEastWestCommand,
+    MoveNorthSouthCommand,
+    MoveRandomCommand,
+    MoveToCenterCommand,
+    MoveToClosestAgentCommand,
+    action_outputs,
+)
+from evosim.neuron.senses import (
+    AgeSensoryCommand,
+    CrowdSensoryCommand,
+    NearestWallSensoryCommand,
+    PredictorSensoryCommand,
+    RandomSensoryCommand,
+    XWallSensoryCommand,
+    YWallSensoryCommand,
+    sensory_commands,
+)
+from evosim.log_store import StepFrame
+from evosim.types import Coord
+
+if TYPE_CHECKING:
+    from evosim.world import World
+
+NUM_SENSES = len(sensory_commands)
+NUM_ACTIONS = len(action_outputs)
+
+# Direction codes used by the engine, in the order N, E, S, W
+DIRECTION_DX = np.array([0, 1, 0, -1])
+DIRECTION_DY = np.array([-1, 0, 1, 0])
+NORTH, EAST, SOUTH, WEST = range(4)
+
+MOVE_RETRIES = 6  # attempts BaseMoveCommand.execute makes before giving up
+SCAN_PAIRS = 1 << 16  # searching agents times population below which CLOSE compares with every agent at once
+
+
+class VectorizedEngine:
+    """
+    Runs the steps of a generation on structure-of-arrays agent state.
+
+    Positions, ages and the genome weights of the whole population live in NumPy arrays and
+    every step evaluates the senses, internal neurons and actions of all agents at once.
+    The Agent objects remain the source of truth between generations: the state is loaded from
+    them when a generation starts and the positions are written back when it ends.
+
+    As in the object model, each neuron is evaluated once per agent per step, so genes that
+    share a sensor see the same value and genes that share an action add up their inputs, and
+    the actions of an agent run in the order of its plan. They are applied in rounds: the first
+    action that fires for every agent, then the second, and within a round one action type at a time.
+
+    A single agent moves exactly as in the object model as long as it doesn't draw random numbers.
+    With several agents, the engines differ in three ways:
+    - Every agent senses the others where they were at the start of the step, and CLOSE finds
+      them where they were before its batch. The object model runs the agents one after another,
+      so an agent senses the moves of the agents before it in the same step.
+    - Moves of a batch are resolved together against the positions before it. An agent can't
+      step into a cell another agent leaves in the same batch, and when several agents want the
+      same cell the one with the lowest index gets it.
+    - RAND, PRED and the random move draw arrays from the generator, so a run with them follows
+      other random numbers than the object model.
+    """
+
+    world: "World"
+    rng: np.random.Generator  # the generator behind world.rng, arrays are drawn from it directly
+
+    def __init__(self, world: "World"):
+        self.world = world
+        self.rng = world.rng.generator
+
+        # Offsets covered by the crowd sense, excluding the agent's own cell
+        offsets = np.arange(-CROWD_DISTANCE, CROWD_DISTANCE + 1)
+        ox, oy = np.meshgrid(offsets, offsets)
+        in_radius = (ox**2 + oy**2 <= CROWD_DISTANCE**2) & ((ox != 0) | (oy != 0))
+        self.crowd_offsets = list(zip(ox[in_radius], oy[in_radius]))
+
+    def load(self):
+        """Copy the state of the world's agents into arrays"""
+
+        agents = self.world.agents
+        n = len(agents)
+
+        self.xs = np.array([agent.coord.x for agent in agents], dtype=np.int64)
+        self.ys = np.array([agent.coord.y for agent in agents], dtype=np.int64)
+        self.ages = np.array([agent.age for agent in agents], dtype=np.int64)
+        self.thresholds = np.array([agent.activation_threshold for agent in agents])
+        self.colors = [agent.get_color() for agent in agents]
+        self.color_ids = np.array([self.world.palette.id_of(color) for color in self.colors], dtype=np.uint32)
+
+        self.occupancy = np.full((self.world.len, self.world.len), -1, dtype=np.int64)
+        self.occupancy[self.ys, self.xs] = np.arange(n)
+
+        self.sense_internal = np.zeros((n, NUM_SENSES, NUM_INTERNAL_NEURONS))
+        self.sense_action = np.zeros((n, NUM_SENSES, NUM_ACTIONS))
+        self.internal_internal = np.zeros((n, NUM_INTERNAL_NEURONS, NUM_INTERNAL_NEURONS))
+        self.internal_action = np.zeros((n, NUM_INTERNAL_NEURONS, NUM_ACTIONS))
+        internal_inputs = np.zeros((n, NUM_INTERNAL_NEURONS))
+        self.has_action = np.zeros((n, NUM_ACTIONS), dtype=bool)
+        # Position of each action among the actions of the agent's plan, NUM_ACTIONS when it has none
+        self.action_rank = np.full((n, NUM_ACTIONS), NUM_ACTIONS)
+        ranks: dict[int, list[int]] = {}
+        self.uses_sense = np.zeros((n, NUM_SENSES), dtype=bool)
+
+        # Gather (agent, source, target, weight) per kind of connection and scatter them in one go
+        connections = {
+            (False, False): [],  # sense -> action
+            (False, True): [],  # sense -> internal
+            (True, False): [],  # internal -> action
+            (True, True): [],  # internal -> internal
+        }
+        for i, agent in enumerate(agents):
+            plan = agent.genome.plan
+            if id(plan) not in ranks:
+                ranks[id(plan)] = [neuron.id for neuron in plan.neurons if neuron.type == ACTION_TYPE]
+            self.action_rank[i, ranks[id(plan)]] = np.arange(len(ranks[id(plan)]))
+            for gene in agent.genome:
+                from_internal = gene.source.type == INTERNAL_TYPE
+                to_internal = gene.target.type == INTERNAL_TYPE
+                connections[from_internal, to_internal].append((i, gene.source.id, gene.target.id, gene.scale_weight()))
+
+        for (from_internal, to_internal), rows in connections.items():
+            if not rows:
+                continue
+            index, source, target, weight = (np.array(column) for column in zip(*rows))
+            if from_internal:
+                matrix = self.internal_internal if to_internal else self.internal_action
+            else:
+                matrix = self.sense_internal if to_internal else self.sense_action
+                self.uses_sense[index, source] = True
+            np.add.at(matrix, (index, source, target), weight)
+            if to_internal:
+                np.add.at(internal_inputs, (index, target), 1)
+            else:
+                self.has_action[index, target] = True
+
+        # InternalCommand.apply_scalar divides by 4 per input
+        self.internal_scale = np.where(internal_inputs > 0, internal_inputs * 4, 1)
+
+    def store(self):
+        """Write the positions back to the agents and rebuild the world's occupancy grid"""
+
+        for agent, x, y in zip(self.world.agents, self.xs.tolist(), self.ys.tolist()):
+            agent._coord = Coord(x, y)
+        self.world.index_agents()
+
+    def sense(self) -> np.ndarray:
+        """Values of every sense for every agent, shape (agents, senses)"""
+
+        world_len = self.world.len
+        n = len(self.xs)
+        values = np.zeros((n, NUM_SENSES))
+
+        values[:, AgeSensoryCommand.id] = self.world.step / MAX_STEPS
+        values[:, RandomSensoryCommand.id] = self.rng.random(n)
+
+        x_wall = np.maximum(self.xs, world_len - self.xs) / world_len
+        y_wall = np.maximum(self.ys, world_len - self.ys) / world_len
+        values[:, XWallSensoryCommand.id] = x_wall
+        values[:, YWallSensoryCommand.id] = y_wall
+        values[:, NearestWallSensoryCommand.id] = np.maximum(x_wall, y_wall)
+
+        crowded = np.flatnonzero(self.uses_sense[:, CrowdSensoryCommand.id])
+        if len(crowded):
+            values[crowded, CrowdSensoryCommand.id] = self.crowd(crowded)
+
+        prediction = self.rng.random(n) < 0.1
+        is_kill_zone = self.world.kill_fn.select(self.xs, self.ys)
+        values[:, PredictorSensoryCommand.id] = prediction == is_kill_zone
+
+        return values
+
+    def crowd(self, agents: np.ndarray) -> np.ndarray:
+        """CrowdSensoryCommand for the given agents, counting neighbours through the occupancy grid"""
+
+        world_len = self.world.len
+        xs, ys = self.xs[agents], self.ys[agents]
+        count = np.zeros(len(agents))
+
+        for ox, oy in self.crowd_offsets:
+            x, y = xs + ox, ys + oy
+            inside = (0 <= x) & (x < world_len) & (0 <= y) & (y < world_len)
+            count[inside] += self.occupancy[y[inside], x[inside]] != -1
+
+        max_possible_agents_in_radius = int(np.pi * CROWD_DISTANCE**2)
+        return np.minimum(count / max_possible_agents_in_radius, 1)
+
+    def closest_agents(self, agents: np.ndarray) -> np.ndarray:
+        """
+        Index of the closest other agent for each of the given agents, -1 if there is none.
+        Searches square rings of growing radius in the occupancy grid, up to about the spacing of the
+        agents were they spread evenly or until few agents are still searching. Those left are compared
+        against every other agent at once. Ties go to the lowest index like the linear scan in
+        MoveToClosestAgentCommand.
+        """
+
+        world_len = self.world.len
+        population = len(self.xs)
+        n = len(agents)
+        best_distance = np.full(n, np.iinfo(np.int64).max)
+        best_agent = np.full(n, -1)
+        if population < 2:
+            return best_agent
+        active = np.arange(n)
+
+        max_radius = min(math.ceil(math.sqrt(world_len**2 / population)), world_len - 1)
+        for radius in range(1, max_radius + 1):
+            if len(active) * population <= SCAN_PAIRS:
+                break
+            xs, ys = self.xs[agents[active]], self.ys[agents[active]]
+
+            ring = range(-radius, radius + 1)
+            offsets = [(ox, oy) for ox in ring for oy in ring if max(abs(ox), abs(oy)) == radius]
+            for ox, oy in offsets:
+                x, y = xs + ox, ys + oy
+                inside = (0 <= x) & (x < world_len) & (0 <= y) & (y < world_len)
+                other = np.full(len(active), -1)
+                other[inside] = self.occupancy[y[inside], x[inside]]
+
+                distance = ox * ox + oy * oy
+                current_distance = best_distance[active]
+                closer = (other != -1) & (
+                    (distance < current_distance) | ((distance == current_distance) & (other < best_agent[active]))
+                )
+                best_distance[active[closer]] = distance
+                best_agent[active[closer]] = other[closer]
+
+            # Cells in the next ring are at least radius + 1 away
+            active = active[best_distance[active] >= (radius + 1) ** 2]
+
+        if len(active):
+            # Far from the others, argmin picks the lowest index among the closest
+            searching = agents[active]
+            distance = (self.xs[searching, None] - self.xs) ** 2 + (self.ys[searching, None] - self.ys) ** 2
+            distance[np.arange(len(active)), searching] = np.iinfo(np.int64).max
+            best_agent[active] = distance.argmin(axis=1)
+
+        return best_agent
+
+    def think(self, senses: np.ndarray) -> np.ndarray:
+        """Sigmoid of every action for every agent, shape (agents, actions)"""
+
+        internal_inputs = np.einsum("ns,nsi->ni", senses, self.sense_internal)
+        internal = np.zeros_like(internal_inputs)
+        # The internal connections form a DAG, so its longest path is shorter than the number of neurons
+        for _ in range(NUM_INTERNAL_NEURONS):
+            internal = (
+                internal_inputs + np.einsum("nk,nki->ni", internal, self.internal_internal)
+            ) / self.internal_scale
+
+        action_inputs = np.einsum("ns,nsa->na", senses, self.sense_action)
+        action_inputs += np.einsum("ni,nia->na", internal, self.internal_action)
+        return 1 / (1 + np.exp(-action_inputs))
+
+    def move(self, agents: np.ndarray, directions: np.ndarray) -> np.ndarray:
+        """
+        Move each agent one cell in its direction if the cell is inside the world and free.
+        When several agents want the same cell the one with the lowest index gets it.
+        Returns which agents moved.
+        """
+
+        world_len = self.world.len
+        x = self.xs[agents] + DIRECTION_DX[directions]
+        y = self.ys[agents] + DIRECTION_DY[directions]
+
+        moved = (0 <= x) & (x < world_len) & (0 <= y) & (y < world_len)
+        moved[moved] = self.occupancy[y[moved], x[moved]] == -1
+
+        candidates = np.flatnonzero(moved)
+        _, first = np.unique(y[candidates] * world_len + x[candidates], return_index=True)
+        moved[:] = False
+        moved[candidates[first]] = True
+
+        movers = agents[moved]
+        self.occupancy[self.ys[movers], self.xs[movers]] = -1
+        self.xs[movers] = x[moved]
+        self.ys[movers] = y[moved]
+        self.occupancy[self.ys[movers], self.xs[movers]] = movers
+
+        return moved
+
+    def act(self, sigmoids: np.ndarray):
+        """Apply the actions that fire, every agent's in the order of its plan"""
+
+        fires = self.has_action & (
+            (sigmoids >= SIGMOID_THRESHOLD + self.thresholds[:, None])
+            | (sigmoids <= SIGMOID_THRESHOLD - self.thresholds[:, None])
+        )
+
+        # Position of each fired action among the actions that fire for the agent, in plan order
+        earlier = self.action_rank[:, None, :] < self.action_rank[:, :, None]
+        fired_rank = (earlier & fires[:, None, :]).sum(axis=2)
+
+        for rank in range(NUM_ACTIONS):
+            in_round = fires & (fired_rank == rank)
+            if not in_round.any():
+                break
+            for action in action_outputs:
+                agents = np.flatnonzero(in_round[:, action.id])
+                if len(agents):
+                    self.apply(action, agents, sigmoids[agents, action.id])
+
+    def apply(self, action: type, agents: np.ndarray, sigmoid: np.ndarray):
+        """Move the agents an action fired for, sigmoid holds its output for each of them"""
+
+        if self.world.profiler is not None:
+            self.world.profiler.fires[action.__name__] += len(agents)
+
+        if action is MoveRandomCommand:
+            for attempt in range(MOVE_RETRIES):
+                moved = self.move(agents, self.rng.integers(0, 4, len(agents)))
+                agents = agents[~moved]
+                if not len(agents):
+                    break
+                if self.world.profiler is not None and attempt < MOVE_RETRIES - 1:
+                    self.world.profiler.move_retries += len(agents)
+            return
+
+        if action is MoveEastWestCommand:
+            directions = np.where(sigmoid < SIGMOID_THRESHOLD, EAST, WEST)
+        elif action is MoveNorthSouthCommand:
+            directions = np.where(sigmoid < SIGMOID_THRESHOLD, NORTH, SOUTH)
+        elif action is MoveToCenterCommand:
+            delta_x = WORLD_LEN // 2 - self.xs[agents]
+            delta_y = WORLD_LEN // 2 - self.ys[agents]
+            towards = np.where(
+                np.abs(delta_x) > np.abs(delta_y),
+                np.where(delta_x > 0, EAST, WEST),
+                np.where(delta_y > 0, SOUTH, NORTH),
+            )
+            directions = np.where(sigmoid > SIGMOID_THRESHOLD, towards, (towards + 2) % 4)
+        elif action is MoveToClosestAgentCommand:
+            closest = self.closest_agents(agents)
+            agents, closest = agents[closest != -1], closest[closest != -1]
+            delta_x = self.xs[closest] - self.xs[agents]
+            delta_y = self.ys[closest] - self.ys[agents]
+            directions = np.where(
+                np.abs(delta_x) > np.abs(delta_y),
+                np.where(delta_x > 0, EAST, WEST),
+                np.where(delta_y > 0, NORTH, SOUTH),
+            )
+        else:
+            raise ValueError(f"Action {action.label} is not supported by the vectorized engine")
+
+        # Retrying a deterministic direction cannot succeed, other agents don't move in between
+        self.move(agents, directions)
+
+    def step(self):
+        self.act(self.think(self.sense()))
+
+    def snapshot(self, generation: int, step: int) -> StepFrame:
+        """Copy of the positions, the color ids don't change within a generation and are shared"""
+
+        return StepFrame(
+            world_len=self.world.len,
+            generation=generation,
+            step=step,
+            xs=self.xs.copy(),
+            ys=self.ys.copy(),
+            color_ids=self.color_ids,
+            palette=self.world.palette,
+        )
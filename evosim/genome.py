@@ -1,8 +1,10 @@
 import copy
-import random
+from collections import Counter
+from array import array
 from math import log2
-from typing import Union
+from typing import TYPE_CHECKING, Iterable, Optional, Union
 
+from evosim.compiler import ExecutionPlan, compile_genome
 from evosim.constants import (
     INTERNAL_TYPE,
     MAX_WEIGHT,
@@ -16,16 +18,37 @@ from evosim.neuron.internal import InternalCommand, internal_commands
 from evosim.neuron.senses import SensoryCommand, sensory_commands
 from evosim.utils import average_hex
 
+if TYPE_CHECKING:
+    from evosim.rng import RNG
+
+
+# Bit layout of a gene, from the most significant bit:
+# source type (1 = internal) | source id | target type (1 = action) | target id | weight (two's complement)
+WEIGHT_BIT_LENGTH = int(log2(MAX_WEIGHT + 1) + 1)
+GENE_BIT_LENGTH = 2 * (NEURON_ID_BIT_LENGTH + 1) + WEIGHT_BIT_LENGTH
+
+TARGET_ID_SHIFT = WEIGHT_BIT_LENGTH
+TARGET_TYPE_SHIFT = TARGET_ID_SHIFT + NEURON_ID_BIT_LENGTH
+SOURCE_ID_SHIFT = TARGET_TYPE_SHIFT + 1
+SOURCE_TYPE_SHIFT = SOURCE_ID_SHIFT + NEURON_ID_BIT_LENGTH
+
+NEURON_ID_MASK = (1 << NEURON_ID_BIT_LENGTH) - 1
+WEIGHT_MASK = (1 << WEIGHT_BIT_LENGTH) - 1
+
+# A gene connects two internal neurons when, of these two bits, only the source type is set
+TYPES_MASK = 1 << SOURCE_TYPE_SHIFT | 1 << TARGET_TYPE_SHIFT
+INTERNAL_TO_INTERNAL = 1 << SOURCE_TYPE_SHIFT
+
 
 class Gene:
     """
-    TODO: update outdated comment
-    A gene has neurons.
+    A weighted connection from a source neuron (sensory or internal) to a target neuron (internal or action).
+    The gene is stored as a single 32-bit integer; source, target and weight are decoded from it.
     """
 
+    bits: int
     source: Union[SensoryCommand, InternalCommand]
     target: Union[ActionCommand, InternalCommand]
-    weight: int
 
     def __init__(
         self,
@@ -42,165 +65,208 @@ class Gene:
 
         self.source = source
         self.target = target
-        self.weight = weight
 
-    def same_gene(self, gene: "Gene"):
-        """Determine if the genes have the same source and target"""
+        source_type = 1 if source.type == INTERNAL_TYPE else 0
+        target_type = 0 if target.type == INTERNAL_TYPE else 1
+        self.bits = (
+            source_type << SOURCE_TYPE_SHIFT
+            | source.id << SOURCE_ID_SHIFT
+            | target_type << TARGET_TYPE_SHIFT
+            | target.id << TARGET_ID_SHIFT
+            | weight & WEIGHT_MASK
+        )
 
-        # need to implement better version of equality inside source and target
-        return self.source == gene.source and self.target == gene.target
+    @property
+    def source_id(self) -> int:
+        return (self.bits >> SOURCE_ID_SHIFT) & NEURON_ID_MASK
 
-    def __repr__(self) -> str:
-        return f"{self.source.label}->{self.target.label} {self.weight}"
+    @property
+    def target_id(self) -> int:
+        return (self.bits >> TARGET_ID_SHIFT) & NEURON_ID_MASK
 
-    def bits_str(self) -> str:
-        # Max bits required to store bits
-        # max_source_bits = (len(list(sensory_commands)) - 1).bit_length()
-        # max_target_bits = (len(list(action_outputs)) - 1).bit_length()
-        num_bits = int(log2(MAX_WEIGHT + 1) + 1)
+    @property
+    def weight(self) -> int:
+        weight = self.bits & WEIGHT_MASK
+        return weight - (1 << WEIGHT_BIT_LENGTH) if weight >> (WEIGHT_BIT_LENGTH - 1) else weight
 
-        source_index = self.source.id
-        target_index = self.target.id
+    @property
+    def connection(self) -> int:
+        """The bits of the gene without the weight, genes with the same source and target share it"""
 
-        # convert num_bits to 2s complement in binary
-        two_comp = lambda n: format(n & ((1 << num_bits) - 1), f"0{num_bits}b")
+        return self.bits >> TARGET_ID_SHIFT
 
-        source_type = 1 if self.source.type == INTERNAL_TYPE else 0
-        target_type = 0 if self.target.type == INTERNAL_TYPE else 1
+    def same_gene(self, gene: "Gene"):
+        """Determine if the genes have the same source and target"""
 
-        return f"{source_type:01b}{source_index:0{NEURON_ID_BIT_LENGTH}b}{target_type:01b}{target_index:0{NEURON_ID_BIT_LENGTH}b}{two_comp(self.weight)}"
+        return self.connection == gene.connection
 
-    @staticmethod
-    def process_binary(binary_str):
-        """
-        Convert binary string to two's complement integer, take the absolute value,
-        and convert it back to binary with specified bit length.
-        """
-        # Convert to integer assuming two's complement representation
-        int_val = int(binary_str, 2)
-        if binary_str[0] == "1":  # if the binary number is negative
-            int_val -= 2 ** len(binary_str)
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Gene) and self.bits == other.bits
 
-        # Convert absolute value back to binary
-        abs_binary = bin(abs(int_val))[2:]
+    def __hash__(self) -> int:
+        return hash(self.bits)
 
-        # Pad with zeros to the specified bit length using zfill, if provided
-        res = abs_binary.zfill(len(binary_str))
+    def __repr__(self) -> str:
+        return f"{self.source.label}->{self.target.label} {self.weight}"
 
-        if res[0] == "1":
-            return "0" + "1" * (len(binary_str) - 1)
-        return res
+    def bits_str(self) -> str:
+        return format(self.bits, f"0{GENE_BIT_LENGTH}b")
 
     def to_hex(self):
-        binary_representation = self.bits_str()
-        source_binary_value = binary_representation[: NEURON_ID_BIT_LENGTH + 1]
-        target_binary_value = binary_representation[NEURON_ID_BIT_LENGTH + 1 : (NEURON_ID_BIT_LENGTH + 1) * 2]
-        weight_binary_value = binary_representation[(NEURON_ID_BIT_LENGTH + 1) * 2 :]
-
         # source red, target green, weight sign blue, weight magnitiude alpha
-        source_hex = hex(int(source_binary_value, 2))[2:].zfill(2)
-        target_hex = hex(int(target_binary_value, 2))[2:].zfill(2)
-
-        # first convert to 2's complement, get integer value, find abs value, convert back to binary,
-        # then convert to hex
-        # weight_sign_hex = hex(int(weight_binary_value[0], 2) * 255)[2:].zfill(2)
-        # Determine the weight sign and convert to hex
-        if weight_binary_value[0] == "1":  # negative sign
-            weight_sign = 255//2  # representing -1 in two's complement
-        else:  # non-negative sign
-            weight_sign = 0
-        weight_sign_hex = hex(weight_sign)[2:].zfill(2)
+        source = self.bits >> SOURCE_ID_SHIFT
+        target = (self.bits >> TARGET_ID_SHIFT) & 0xFF
 
-        weight_mag_hex = hex(int(self.process_binary(weight_binary_value)[1:8], 2))[2:].zfill(2)
+        weight = self.weight
+        weight_sign = 255 // 2 if weight < 0 else 0
+        # The top 7 bits of the absolute weight, -32768 is clamped to 32767
+        weight_mag = min(abs(weight), MAX_WEIGHT) >> (WEIGHT_BIT_LENGTH - 8)
 
-        rgba_color = f"#{source_hex}{target_hex}{weight_sign_hex}{weight_mag_hex}"
-
-        return rgba_color
+        return f"#{source:02x}{target:02x}{weight_sign:02x}{weight_mag:02x}"
 
     def scale_weight(self):
         scale = (MAX_WEIGHT + 1) / 4
         return self.weight / scale
 
     @classmethod
-    def random(cls) -> "Gene":
-        return cls.str_to_gene(f"{random.randint(0, 2**32):032b}")
+    def random(cls, rng: "RNG") -> "Gene":
+        return cls.from_int(rng.getrandbits32())
 
     @classmethod
     def str_to_gene(cls, s: str) -> "Gene":
-        source_type = s[0] if NUM_INTERNAL_NEURONS > 0 else "0"
-        target_type = s[NEURON_ID_BIT_LENGTH + 1] if NUM_INTERNAL_NEURONS > 0 else "1"
-        source_id = int(s[1 : NEURON_ID_BIT_LENGTH + 1], 2)
-        target_id = int(s[NEURON_ID_BIT_LENGTH + 2 : (NEURON_ID_BIT_LENGTH + 1) * 2], 2)
-        if source_type == "0":
-            source = SensoryCommand.get_class(source_id)()
-        else:
-            source = InternalCommand.get_class(source_id)
-        if target_type == "1":
-            target = ActionCommand.get_class(target_id)()
-        else:
-            target = InternalCommand.get_class(target_id)
-
-        # Assuming s is a binary string, and we're looking at a specific slice
-        binary_string = s[(NEURON_ID_BIT_LENGTH + 1) * 2 :]
-
-        # Convert the binary string to an integer
-        binary_int = int(binary_string, 2)
-
-        # Convert the integer to a signed integer using 2 bytes
-        # We use 2 bytes because the maximum length of the binary string is 16 bits
-        weight = int.from_bytes(
-            binary_int.to_bytes(2, byteorder="big", signed=False),
-            byteorder="big",
-            signed=True,
-        )
+        return cls.from_int(int(s, 2))
 
-        return cls(source, target, weight)
+    @classmethod
+    def from_int(cls, bits: int) -> "Gene":
+        """Decode a gene, neuron ids wrap around the number of neurons of their type"""
 
-    def to_mutated(self) -> "Gene":
-        bits = self.bits_str()
-        bit_list = list(bits)
-        random_index = random.randint(0, len(bit_list) - 1)
-        # Switch bit
-        bit_list[random_index] = "1" if bit_list[random_index] == "0" else "0"
-        modified_bits = "".join(bit_list)
+        source_internal = (bits >> SOURCE_TYPE_SHIFT) & 1 if NUM_INTERNAL_NEURONS > 0 else 0
+        target_action = (bits >> TARGET_TYPE_SHIFT) & 1 if NUM_INTERNAL_NEURONS > 0 else 1
+        source_id = (bits >> SOURCE_ID_SHIFT) & NEURON_ID_MASK
+        target_id = (bits >> TARGET_ID_SHIFT) & NEURON_ID_MASK
 
-        return Gene.str_to_gene(modified_bits)
+        source = InternalCommand.get(source_id) if source_internal else SensoryCommand.get(source_id)
+        target = ActionCommand.get(target_id) if target_action else InternalCommand.get(target_id)
+
+        weight = bits & WEIGHT_MASK
+        if weight >> (WEIGHT_BIT_LENGTH - 1):
+            weight -= 1 << WEIGHT_BIT_LENGTH
+
+        return cls(source, target, weight)
 
+    def to_mutated(self, rng: "RNG") -> "Gene":
+        # Flip one bit, index 0 being the most significant one as in bits_str
+        random_index = rng.randint(0, GENE_BIT_LENGTH - 1)
+        return Gene.from_int(self.bits ^ (1 << (GENE_BIT_LENGTH - 1 - random_index)))
 
-def no_cycles(genes: list[Gene], new_gene: Gene) -> bool:
+
+class GenomeGraph:
     """
-    Check if adding new_gene to genes would create a cycle, assuming genes are acyclic.
+    The connections of a genome, kept ready for the checks made while genes are added to it.
+    A duplicate connection is a dict lookup. Only connections between internal neurons can close a cycle,
+    so for every internal neuron the internal neurons it reaches are kept as a bitmask: a cycle check
+    is a bit test, and an insertion updates at most NUM_INTERNAL_NEURONS masks.
     """
-    # Build a graph (as a dictionary) from the list of gene connections
-    graph = {}
-    for gene in genes:
-        if gene.source.id in graph:
-            graph[gene.source.id].add(gene.target.id)
-        else:
-            graph[gene.source.id] = {gene.target.id}
-
-    # Function to check if there's a path from start to target
-    def is_path(start, target, visited):
-        if start == target:
+
+    genes: list[Gene]
+    edges: Counter  # genes per connection, a connection being the bits of a gene without the weight
+    reach: list[int]  # bit j of reach[i] is set when internal neuron j can be reached from internal neuron i
+
+    def __init__(self, genes: Iterable[Gene] = ()):
+        self.genes = list(genes)
+        self.edges = Counter(gene.bits >> TARGET_ID_SHIFT for gene in self.genes)
+        self.reach = [0] * NUM_INTERNAL_NEURONS
+        for gene in self.genes:
+            if gene.bits & TYPES_MASK == INTERNAL_TO_INTERNAL:
+                self.connect(gene.bits)
+
+    def has_connection(self, gene: Gene) -> bool:
+        return gene.bits >> TARGET_ID_SHIFT in self.edges
+
+    def closes_cycle(self, gene: Gene) -> bool:
+        bits = gene.bits
+        if bits & TYPES_MASK != INTERNAL_TO_INTERNAL:
+            return False
+        source = (bits >> SOURCE_ID_SHIFT) & NEURON_ID_MASK
+        target = (bits >> TARGET_ID_SHIFT) & NEURON_ID_MASK
+        return source == target or bool(self.reach[target] >> source & 1)
+
+    def can_add(self, gene: Gene) -> bool:
+        return not self.has_connection(gene) and not self.closes_cycle(gene)
+
+    def can_replace(self, old: Gene, new: Gene) -> bool:
+        """Whether new can take the place of old, one of the genes of the graph, without rebuilding it"""
+
+        connection = new.bits >> TARGET_ID_SHIFT
+        if self.edges[connection] - (connection == old.bits >> TARGET_ID_SHIFT) > 0:
+            return False
+        if not self.closes_cycle(new):
             return True
-        visited.add(start)
+        if old.bits & TYPES_MASK != INTERNAL_TO_INTERNAL:
+            return False
+
+        # The reachability includes old, the cycle may go through it. Rare enough to check from scratch
+        genes = list(self.genes)
+        genes.remove(old)
+        return not GenomeGraph(genes).closes_cycle(new)
+
+    def add(self, gene: Gene):
+        """Add a gene that passed can_add"""
+
+        self.genes.append(gene)
+        self.edges[gene.bits >> TARGET_ID_SHIFT] += 1
+        if gene.bits & TYPES_MASK == INTERNAL_TO_INTERNAL:
+            self.connect(gene.bits)
+
+    def connect(self, bits: int):
+        source = (bits >> SOURCE_ID_SHIFT) & NEURON_ID_MASK
+        target = (bits >> TARGET_ID_SHIFT) & NEURON_ID_MASK
+        # Everything that reaches the source, and the source itself, now reaches the target and beyond
+        reached = self.reach[target] | 1 << target
+        source_bit = 1 << source
+        for neuron, mask in enumerate(self.reach):
+            if neuron == source or mask & source_bit:
+                self.reach[neuron] = mask | reached
+
+
+# Most genes an acyclic genome without duplicate connections can have: every sense and internal neuron
+# can connect to every action, senses to every internal neuron, and internal neurons to the ones after them
+MAX_CONNECTIONS = (
+    len(sensory_commands) * (NUM_INTERNAL_NEURONS + len(action_outputs))
+    + NUM_INTERNAL_NEURONS * len(action_outputs)
+    + NUM_INTERNAL_NEURONS * (NUM_INTERNAL_NEURONS - 1) // 2
+)
 
-        for neighbour in graph.get(start, []):
-            if neighbour not in visited:
-                if is_path(neighbour, target, visited):
-                    return True
 
-        return False
+class Genome:
+    """Genomes are immutable and shared between agents, mutation creates a new genome"""
 
-    # Check if there's a path from new_gene[1] to new_gene[0]
-    return not is_path(new_gene.target.id, new_gene.source.id, set())
+    genes: tuple[Gene, ...]
+    _plan: Optional[ExecutionPlan]
+    _hex: Optional[str]
+    _graph: Optional[GenomeGraph]
 
+    def __init__(self, genes: Iterable[Gene]):
+        self.genes = tuple(genes)
+        self._plan = None
+        self._hex = None
+        self._graph = None
 
-class Genome:
-    genes: list[Gene]
+    @property
+    def plan(self) -> ExecutionPlan:
+        """The compiled execution plan, built on first use"""
 
-    def __init__(self, genes: list[Gene]):
-        self.genes = genes
+        if self._plan is None:
+            self._plan = compile_genome(self)
+        return self._plan
+
+    @property
+    def graph(self) -> GenomeGraph:
+        """The connections of the genes, built on first use"""
+
+        if self._graph is None:
+            self._graph = GenomeGraph(self.genes)
+        return self._graph
 
     def __iter__(self):
         return iter(self.genes)
@@ -208,32 +274,52 @@ class Genome:
     def __repr__(self) -> str:
         return f"[{', '.join(map(str, self.genes))}]"
 
+    def to_array(self) -> array:
+        """The genes packed in a contiguous uint32 buffer, np.frombuffer(..., dtype=np.uint32) views it as is"""
+
+        return array("I", (gene.bits for gene in self.genes))
+
+    @classmethod
+    def from_array(cls, buffer: Iterable[int]) -> "Genome":
+        """Unpack genes from an array('I'), a NumPy uint32 array or any iterable of ints"""
+
+        return cls([Gene.from_int(int(bits)) for bits in buffer])
+
     def to_hex(self):
-        hex_colors = [gene.to_hex() for gene in self.genes]
-        return average_hex(hex_colors)
+        """The average color of the genes, computed once"""
+
+        if self._hex is None:
+            self._hex = average_hex([gene.to_hex() for gene in self.genes])
+        return self._hex
 
     @classmethod
-    def random(cls, num_connections: int) -> "Genome":
-        genes = []
-        while len(genes) < num_connections:
-            new_gene = Gene.random()
-            # Doesn't work because equality is checking instances that are different not the values
-            if not any(new_gene.same_gene(gene) for gene in genes) and no_cycles(genes, new_gene):
-                genes.append(new_gene)
+    def random(cls, num_connections: int, rng: "RNG") -> "Genome":
+        """Random genes, without duplicate connections or cycles"""
 
-        return Genome(genes)
+        if num_connections > MAX_CONNECTIONS:
+            raise ValueError(f"A genome can't have more than {MAX_CONNECTIONS} distinct connections")
+
+        graph = GenomeGraph()
+        while len(graph.genes) < num_connections:
+            new_gene = Gene.random(rng)
+            if graph.can_add(new_gene):
+                graph.add(new_gene)
+
+        genome = Genome(graph.genes)
+        genome._graph = graph
+        return genome
 
-    def to_mutated(self) -> "Genome":
+    def to_mutated(self, rng: "RNG", mutation_rate: float = MUTATION_RATE) -> "Genome":
         """
         Create a new genome based on the mutation rate
-        There is a {MUTATION_RATE} chance of a mutation happening
+        There is a {mutation_rate} chance of a mutation happening
         """
 
-        if random.random() < MUTATION_RATE:
+        if rng.random() < mutation_rate:
             return self
 
-        genes = self.genes.copy()
-        random.shuffle(genes)
+        genes = list(self.genes)
+        rng.shuffle(genes)
 
         random_gene = genes.pop()
 
@@ -242,12 +328,46 @@ class Genome:
             if retries >= 5:
                 break
 
-            mutated_gene = random_gene.to_mutated()
+            mutated_gene = random_gene.to_mutated(rng)
 
-            if no_cycles(genes, mutated_gene):
+            if self.graph.can_replace(random_gene, mutated_gene):
                 genes.append(mutated_gene)
                 break
 
             retries += 1
 
         return Genome(genes)
+
+
+def summarize_genomes(genomes: list[Genome], top: int = 3) -> str:
+    """A few lines on a population's genomes: how many are distinct and the most common ones"""
+
+    counts = Counter(genome.genes for genome in genomes)
+    genes = set().union(*counts)
+    lines = [f"{len(genomes)} genomes, {len(counts)} distinct, {len(genes)} distinct genes"]
+    for genes_of_genome, count in counts.most_common(top):
+        lines.append(f"{count:>6}x {Genome(genes_of_genome)}")
+    return "\n".join(lines)
+
+
+def pack_genomes(genomes: Iterable[Genome]) -> bytes:
+    """Genomes in one compact buffer of uint32, each genome is its gene count followed by its genes"""
+
+    buffer = array("I")
+    for genome in genomes:
+        buffer.append(len(genome.genes))
+        buffer.extend(gene.bits for gene in genome.genes)
+    return buffer.tobytes()
+
+
+def unpack_genomes(buffer: bytes) -> list[Genome]:
+    values = array("I")
+    values.frombytes(buffer)
+
+    genomes = []
+    i = 0
+    while i < len(values):
+        count = values[i]
+        genomes.append(Genome.from_array(values[i + 1 : i + 1 + count]))
+        i += 1 + count
+    return genomes
@@ -0,0 +1,206 @@
+"""
+Island model: worlds evolve in parallel processes and trade survivors every few generations.
+
+    python -m evosim.islands --islands 4 --interval 5 --migration 0.1 --generations 20
+"""
+
+import argparse
+import contextlib
+import io
+import math
+import multiprocessing
+import time
+from dataclasses import dataclass, replace
+from multiprocessing.connection import Connection
+
+from evosim.agent import Agent
+from evosim.constants import GENOME_CONNECTIONS, INITIAL_POPULATION, MAX_STEPS, MUTATION_RATE, WORLD_LEN
+from evosim.genome import Genome, pack_genomes, unpack_genomes
+from evosim.sweep import (
+    KILL_FNS,
+    REPRODUCTION_FNS,
+    GenerationSummary,
+    RunConfig,
+    make_world,
+    simulate_generation,
+    write_csv,
+)
+from evosim.world import World
+
+
+@dataclass
+class IslandReport:
+    island: int
+    generations: int
+    agent_steps: int
+    seconds: float  # time spent simulating
+    emigrants: int
+    immigrants: int
+
+    @property
+    def agent_steps_per_second(self) -> float:
+        return self.agent_steps / self.seconds if self.seconds else 0.0
+
+
+def settle(world: World, genomes: list[Genome]):
+    """
+    Immigrants take the places of random locals, so the population keeps its size: when they outnumber
+    the locals the ones past that number are turned away. An island that died out is resettled by all of them.
+    """
+
+    natives = list(world.agents)
+    world.rng.shuffle(natives)
+    room = len(natives) if natives else world.len * world.len
+    immigrants = [Agent(world, len(genome.genes), genome=genome) for genome in genomes[:room]]
+    world.provide_agents(natives[len(immigrants) :] + immigrants)
+
+
+def emigrate(world: World, migration: float) -> bytes:
+    """Genomes of a share of the survivors of the last generation, packed for the trip"""
+
+    count = math.ceil(migration * len(world.selected))
+    return pack_genomes(agent.genome for agent in world.rng.sample(world.selected, count))
+
+
+def island_worker(conn: Connection, island: int, config: RunConfig, migration: float):
+    """
+    Runs an island in its own process. Every message is the number of generations to run and the packed
+    immigrants to settle first, the reply is the summaries of those generations and the packed emigrants.
+    """
+
+    world = make_world(config)
+    gen = 0
+
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+
+            try:
+                generations, immigrants = message
+                if immigrants:
+                    settle(world, unpack_genomes(immigrants))
+                summaries = [simulate_generation(world, island, config, g) for g in range(gen, gen + generations)]
+                gen += generations
+                conn.send((summaries, emigrate(world, migration)))
+            except BaseException as error:
+                conn.send(error)
+                break
+
+    world.finish()
+
+
+def run_islands(
+    config: RunConfig, islands: int = 4, interval: int = 5, migration: float = 0.1
+) -> tuple[list[GenerationSummary], list[IslandReport]]:
+    """
+    Evolve islands in parallel processes, island i is seeded with config.seed + i.
+    Every interval generations the emigrants of each island settle on the next one, in a ring.
+    """
+
+    start = time.perf_counter()
+    connections = []
+    processes = []
+    for island in range(islands):
+        conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(
+            target=island_worker,
+            args=(child_conn, island, replace(config, seed=config.seed + island), migration),
+            daemon=True,
+        )
+        process.start()
+        connections.append(conn)
+        processes.append(process)
+
+    reports = [IslandReport(island, 0, 0, 0.0, 0, 0) for island in range(islands)]
+    rows: list[list[GenerationSummary]] = [[] for _ in range(islands)]
+    immigrants = [b""] * islands
+    try:
+        done = 0
+        while done < config.generations:
+            generations = min(interval, config.generations - done)
+            for conn, packed in zip(connections, immigrants):
+                conn.send((generations, packed))
+
+            emigrants = []
+            for island, conn in enumerate(connections):
+                reply = conn.recv()
+                if isinstance(reply, BaseException):
+                    raise reply
+                summaries, packed = reply
+                rows[island].extend(summaries)
+                emigrants.append(packed)
+
+                report = reports[island]
+                report.generations += len(summaries)
+                report.agent_steps += sum(summary.population for summary in summaries) * MAX_STEPS
+                report.seconds += sum(summary.seconds for summary in summaries)
+
+            done += generations
+            if done < config.generations:
+                immigrants = [emigrants[island - 1] for island in range(islands)]
+                for island, packed in enumerate(emigrants):
+                    count = len(unpack_genomes(packed))
+                    reports[island].emigrants += count
+                    reports[(island + 1) % islands].immigrants += count
+    finally:
+        for conn in connections:
+            # A worker that failed has already hung up
+            with contextlib.suppress(OSError):
+                conn.send(None)
+        for process in processes:
+            process.join()
+
+    elapsed = time.perf_counter() - start
+    print(f"{'island':>6} {'generations':>11} {'agent steps/s':>14} {'emigrants':>9} {'immigrants':>10}")
+    for report in reports:
+        print(
+            f"{report.island:>6} {report.generations:>11} {report.agent_steps_per_second:>14,.0f} "
+            f"{report.emigrants:>9} {report.immigrants:>10}"
+        )
+    agent_steps = sum(report.agent_steps for report in reports)
+    generations = sum(report.generations for report in reports)
+    print(
+        f"{islands} islands in {elapsed:.1f}s: {generations / elapsed:.1f} generations/s, "
+        f"{agent_steps / elapsed:,.0f} agent steps/s"
+    )
+
+    return [row for island_rows in rows for row in island_rows], reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m evosim.islands", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--islands", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--interval", type=int, default=5, help="generations between migrations")
+    parser.add_argument("--migration", type=float, default=0.1, help="share of the survivors that migrate")
+    parser.add_argument("--generations", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--kill-fn", choices=KILL_FNS, default="outside_circle")
+    parser.add_argument("--reproduction-fn", choices=REPRODUCTION_FNS, default="mutate")
+    parser.add_argument("--mutation-rate", type=float, default=MUTATION_RATE)
+    parser.add_argument("--genome-connections", type=int, default=GENOME_CONNECTIONS)
+    parser.add_argument("--world-len", type=int, default=WORLD_LEN)
+    parser.add_argument("--population", type=int, default=INITIAL_POPULATION)
+    parser.add_argument("--engine", choices=("object", "numpy"), default="object")
+    parser.add_argument("--out", default="islands.csv", help="results table, the run column is the island")
+    args = parser.parse_args(argv)
+
+    config = RunConfig(
+        seed=args.seed,
+        kill_fn=args.kill_fn,
+        reproduction_fn=args.reproduction_fn,
+        mutation_rate=args.mutation_rate,
+        genome_connections=args.genome_connections,
+        world_len=args.world_len,
+        initial_population=args.population,
+        generations=args.generations,
+        engine=args.engine,
+    )
+    rows, _ = run_islands(config, args.islands, args.interval, args.migration)
+    write_csv(rows, args.out)
+    print(f"Wrote {len(rows)} rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
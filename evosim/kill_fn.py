@@ -1,8 +1,99 @@
-from matplotlib import patches, pyplot as plt
+from functools import lru_cache
+
+import numpy as np
+
 from evosim.types import Coord, KillFn
 
+KILL_COLOR = "red"
+LIVE_COLOR = "green"
+
+# Transparency of the kill and live zones drawn on the last frame of a generation
+KILL_ZONE_ALPHA = 0.05
+LIVE_ZONE_ALPHA = 0.1
+
+
+class KillZone:
+    """
+    A kill function evaluated once for every cell of a world.
+    It is a KillFn itself, so it can be used anywhere the original function was.
+    """
+
+    world_len: int
+    kill_fn: KillFn
+    mask: np.ndarray  # mask[y, x] is True when the cell is in the kill zone
+    cells: list[bool]  # the mask flattened row-major, for fast scalar lookups
+    layers: dict[tuple[float, float], np.ndarray]  # RGBA images of the zones by (kill alpha, live alpha)
+
+    def __init__(self, kill_fn: KillFn, world_len: int):
+        self.world_len = world_len
+        self.kill_fn = kill_fn
+        self.cells = [kill_fn(world_len, Coord(x, y)) for y in range(world_len) for x in range(world_len)]
+        self.mask = np.array(self.cells, dtype=bool).reshape(world_len, world_len)
+        self.layers = {}
+
+    def layer(self, kill_alpha: float, live_alpha: float) -> np.ndarray:
+        """The kill and live zones as an RGBA image, built once per pair of alphas"""
+
+        key = (kill_alpha, live_alpha)
+        if key not in self.layers:
+            self.layers[key] = zone_layer(self.mask, kill_alpha, live_alpha)
+        return self.layers[key]
+
+    def __call__(self, world_len: int, coord: Coord) -> bool:
+        if world_len != self.world_len or not (0 <= coord.x < world_len and 0 <= coord.y < world_len):
+            return self.kill_fn(world_len, coord)
+        return self.cells[coord.y * world_len + coord.x]
+
+    def select(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Which of the coordinates are in the kill zone"""
+
+        return self.mask[ys, xs]
+
+
+def zone_layer(mask: np.ndarray, kill_alpha: float, live_alpha: float) -> np.ndarray:
+    """RGBA image with a pixel per cell of the mask, draw it with imshow(origin="lower")"""
+
+    # matplotlib is only imported to draw: every world compiles its kill zone, and headless runs,
+    # sweep workers and islands shouldn't load it and pick a backend
+    from matplotlib.colors import to_rgb
+
+    layer = np.empty((*mask.shape, 4))
+    layer[mask] = (*to_rgb(KILL_COLOR), kill_alpha)
+    layer[~mask] = (*to_rgb(LIVE_COLOR), live_alpha)
+    return layer
+
+
+def show_zone_layer(plot, layer: np.ndarray, world_len: int):
+    """Draw a zone layer under everything else on the plot, keeping the plot's limits"""
+
+    return plot.imshow(
+        layer,
+        extent=(0, world_len, 0, world_len),
+        origin="lower",
+        interpolation="nearest",
+        aspect="auto",
+        zorder=0,
+    )
+
+
+@lru_cache(maxsize=32)
+def _compile_kill_fn(kill_fn: KillFn, world_len: int) -> KillZone:
+    return KillZone(kill_fn, world_len)
+
+
+def compile_kill_fn(kill_fn: KillFn, world_len: int) -> KillZone:
+    """Get the kill zone of kill_fn for a world, evaluating the function only the first time"""
+
+    if isinstance(kill_fn, KillZone):
+        if kill_fn.world_len == world_len:
+            return kill_fn
+        kill_fn = kill_fn.kill_fn
+    return _compile_kill_fn(kill_fn, world_len)
+
 
 def visualize_kill_zone(world_len, kill_fn: KillFn, outputpath: str):
+    from matplotlib import pyplot as plt
+
     fig = plt.figure(figsize=(16, 16))
     plot = fig.add_subplot()
     plt.axis("off")
@@ -10,16 +101,8 @@ def visualize_kill_zone(world_len, kill_fn: KillFn, outputpath: str):
     plot.set_xlim(0, world_len)
     plot.set_ylim(0, world_len)
 
-    all_coords = [Coord(x, y) for x in range(world_len) for y in range(world_len)]
-    for coord in all_coords:
-        if kill_fn(world_len, coord):
-            plot.add_patch(
-                patches.Rectangle((coord.x, coord.y), 1, 1, linewidth=0, edgecolor="r", facecolor="red", alpha=0.15)
-            )
-        else:
-            plot.add_patch(
-                patches.Rectangle((coord.x, coord.y), 1, 1, linewidth=0, edgecolor="r", facecolor="green", alpha=0.25)
-            )
+    kill_zone = compile_kill_fn(kill_fn, world_len)
+    show_zone_layer(plot, kill_zone.layer(kill_alpha=0.15, live_alpha=0.25), world_len)
 
     fig.savefig(outputpath)
 
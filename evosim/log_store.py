@@ -0,0 +1,174 @@
+import json
+import os
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+import numpy as np
+
+from evosim.palette import Palette
+from evosim.types import AgentVisInfo, Coord
+
+# One record per logged step, pointing at its agents in the column files
+STEP_DTYPE = np.dtype(
+    [
+        ("generation", "<i4"),
+        ("step", "<i4"),
+        ("world_len", "<i4"),
+        ("count", "<i4"),
+        ("offset", "<i8"),
+    ]
+)
+
+XS_FILE = "xs.i16"
+YS_FILE = "ys.i16"
+COLORS_FILE = "colors.u32"
+STEPS_FILE = "steps.bin"
+PALETTE_FILE = "palette.json"
+
+
+@dataclass
+class StepFrame:
+    """
+    The agents of a step as columns. Frames yielded by a running World hold copies of the positions,
+    frames read back from a columnar log hold views of the memory-mapped files.
+    """
+
+    world_len: int
+    generation: int
+    step: int
+    xs: np.ndarray
+    ys: np.ndarray
+    color_ids: np.ndarray
+    palette: Palette
+
+    @property
+    def colors(self) -> list[str]:
+        return [self.palette[color_id] for color_id in self.color_ids.tolist()]
+
+    @property
+    def rgba(self) -> np.ndarray:
+        """RGBA rows in [0, 1] for every agent"""
+
+        return self.palette.rgba()[self.color_ids]
+
+    @property
+    def agents(self) -> list[AgentVisInfo]:
+        """The agents as in a Log, this copies"""
+
+        return [
+            AgentVisInfo(coord=Coord(x, y), color=color)
+            for x, y, color in zip(self.xs.tolist(), self.ys.tolist(), self.colors)
+        ]
+
+
+class ColumnarLogWriter:
+    """
+    Streams step snapshots to a directory of append-only column files:
+    int16 x and y coordinates, a uint32 palette id per agent and one STEP_DTYPE record per step.
+    """
+
+    path: str
+    palette: Palette
+    offset: int  # number of agents written so far
+
+    def __init__(self, path: str, palette: Optional[Palette] = None):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+        self.xs_file = open(os.path.join(path, XS_FILE), "wb")
+        self.ys_file = open(os.path.join(path, YS_FILE), "wb")
+        self.colors_file = open(os.path.join(path, COLORS_FILE), "wb")
+        self.steps_file = open(os.path.join(path, STEPS_FILE), "wb")
+
+        self.palette = palette if palette is not None else Palette()
+        self.offset = 0
+
+    def write_step(self, generation: int, step: int, world_len: int, xs, ys, color_ids):
+        """Append a step, xs, ys and color_ids are sequences (or arrays) of equal length"""
+
+        xs = np.asarray(xs, dtype="<i2")
+        ys = np.asarray(ys, dtype="<i2")
+        color_ids = np.asarray(color_ids, dtype="<u4")
+
+        self.xs_file.write(xs.tobytes())
+        self.ys_file.write(ys.tobytes())
+        self.colors_file.write(color_ids.tobytes())
+
+        record = np.array([(generation, step, world_len, len(xs), self.offset)], dtype=STEP_DTYPE)
+        self.steps_file.write(record.tobytes())
+        self.offset += len(xs)
+
+    def write_frame(self, frame: StepFrame):
+        self.write_step(frame.generation, frame.step, frame.world_len, frame.xs, frame.ys, frame.color_ids)
+
+    def write_palette(self):
+        with open(os.path.join(self.path, PALETTE_FILE), "w") as f:
+            json.dump(self.palette.colors, f)
+
+    def flush(self):
+        for f in (self.xs_file, self.ys_file, self.colors_file, self.steps_file):
+            f.flush()
+        self.write_palette()
+
+    def close(self):
+        self.flush()
+        for f in (self.xs_file, self.ys_file, self.colors_file, self.steps_file):
+            f.close()
+
+    def __enter__(self) -> "ColumnarLogWriter":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ColumnarLogReader:
+    """Reads a columnar log back through memory maps, one generation at a time"""
+
+    path: str
+    steps: np.ndarray
+    palette: Palette
+
+    def __init__(self, path: str):
+        self.path = path
+        self.steps = np.fromfile(os.path.join(path, STEPS_FILE), dtype=STEP_DTYPE)
+
+        with open(os.path.join(path, PALETTE_FILE)) as f:
+            self.palette = Palette(json.load(f))
+
+        self.xs = self.map_column(XS_FILE, "<i2")
+        self.ys = self.map_column(YS_FILE, "<i2")
+        self.color_ids = self.map_column(COLORS_FILE, "<u4")
+
+    def map_column(self, name: str, dtype: str) -> np.ndarray:
+        filename = os.path.join(self.path, name)
+        # np.memmap refuses empty files
+        if os.path.getsize(filename) == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(filename, dtype=dtype, mode="r")
+
+    @property
+    def generations(self) -> list[int]:
+        return np.unique(self.steps["generation"]).tolist()
+
+    def frame(self, index: int) -> StepFrame:
+        generation, step, world_len, count, offset = self.steps[index].tolist()
+        return StepFrame(
+            world_len=world_len,
+            generation=generation,
+            step=step,
+            xs=self.xs[offset : offset + count],
+            ys=self.ys[offset : offset + count],
+            color_ids=self.color_ids[offset : offset + count],
+            palette=self.palette,
+        )
+
+    def generation(self, generation: int) -> list[StepFrame]:
+        return [self.frame(index) for index in np.flatnonzero(self.steps["generation"] == generation)]
+
+    def iter_generations(self) -> Iterator[list[StepFrame]]:
+        for generation in self.generations:
+            yield self.generation(generation)
+
+    def __len__(self) -> int:
+        return len(self.steps)
@@ -0,0 +1,137 @@
+import gc
+import json
+import sys
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Callable, Optional, TextIO
+
+from evosim.agent import Agent
+from evosim.genome import Gene, Genome
+from evosim.log_store import StepFrame
+from evosim.types import AgentVisInfo, Coord, Log
+
+TRACKED_TYPES = (Agent, Genome, Gene, Coord, Log, AgentVisInfo, StepFrame)
+
+# Allocations made by the accounting itself
+IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+@dataclass
+class SiteGrowth:
+    site: str  # file:line of the allocation
+    bytes: int  # grown over the generation, negative when freed
+    blocks: int
+
+
+@dataclass
+class GenerationMemory:
+    generation: int
+    peak: int  # most bytes traced at once during the generation
+    retained: int  # bytes still traced at its end
+    growth: int  # retained minus what was retained before the generation
+    sites: list[SiteGrowth]  # the allocation sites that grew the most
+    counts: dict[str, int]  # live instances per tracked type
+    sizes: dict[str, int]  # shallow bytes of those instances, with their __dict__
+
+
+def measure_memory(run: Callable[[], None]) -> tuple[int, int]:
+    """Peak and retained bytes allocated while running a function"""
+
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        gc.collect()
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        run()
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+        return peak - before, current - before
+    finally:
+        if started:
+            tracemalloc.stop()
+
+
+def live_objects() -> tuple[dict[str, int], dict[str, int]]:
+    """Instances of the tracked types the garbage collector knows of, and their sizes"""
+
+    counts = dict.fromkeys((cls.__name__ for cls in TRACKED_TYPES), 0)
+    sizes = dict(counts)
+    for obj in gc.get_objects():
+        cls = type(obj)
+        if cls in TRACKED_TYPES:
+            counts[cls.__name__] += 1
+            sizes[cls.__name__] += sys.getsizeof(obj) + sys.getsizeof(getattr(obj, "__dict__", None))
+    return counts, sizes
+
+
+class MemoryProfiler:
+    """
+    Accounts for the memory of every generation a World simulates with tracemalloc.
+    Tracing slows the simulation down a lot, attach it with World(memory=...) only to look for growth.
+    A record is written to out after every generation as a JSON line.
+    """
+
+    profiles: list[GenerationMemory]
+    top: int  # allocation sites kept per generation
+
+    def __init__(self, out: Optional[TextIO] = None, top: int = 10, frames: int = 1):
+        self.out = out
+        self.top = top
+        self.frames = frames
+        self.profiles = []
+        self._snapshot = None
+        self._retained = 0
+        self._started = False  # whether start() started tracing, tracing started by others is left running
+
+    def start(self, generation: int):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started = True
+        if self._snapshot is None:
+            gc.collect()
+            self._snapshot = tracemalloc.take_snapshot().filter_traces(IGNORED)
+            self._retained = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+
+    def finish(self, generation: int) -> GenerationMemory:
+        # Agents reference their world, dead ones are only freed by the cycle collector
+        gc.collect()
+        retained, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces(IGNORED)
+        sites = [
+            SiteGrowth(f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}", stat.size_diff, stat.count_diff)
+            for stat in snapshot.compare_to(self._snapshot, "lineno")[: self.top]
+        ]
+        counts, sizes = live_objects()
+
+        profile = GenerationMemory(
+            generation=generation,
+            peak=peak,
+            retained=retained,
+            growth=retained - self._retained,
+            sites=sites,
+            counts=counts,
+            sizes=sizes,
+        )
+        self.profiles.append(profile)
+        self._snapshot = snapshot
+        self._retained = retained
+
+        if self.out is not None:
+            self.out.write(json.dumps(asdict(profile)) + "\n")
+            self.out.flush()
+        return profile
+
+    def stop(self):
+        """Stop the tracing start() started, the profiles are kept"""
+
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+        self._snapshot = None
@@ -1,5 +1,4 @@
 import math
-import random
 from typing import TYPE_CHECKING
 
 from evosim.constants import MAX_WEIGHT, ACTION_TYPE, SIGMOID_THRESHOLD, WORLD_LEN
@@ -8,6 +7,7 @@ from evosim.types import Direction, opposite_direction
 if TYPE_CHECKING:
     from evosim.agent import Agent
     from evosim.genome import Gene
+    from evosim.rng import RNG
 
 
 class ActionCommand:
@@ -24,16 +24,25 @@ class ActionCommand:
     ):
         raise NotImplementedError
 
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ActionCommand) and self.id == other.id
+
+    def __hash__(self) -> int:
+        return hash((self.type, self.id))
+
     @classmethod
-    def random(cls):
-        return random.choice(action_outputs)()
+    def random(cls, rng: "RNG"):
+        return rng.choice(action_neurons)
+
+    @classmethod
+    def get(cls, id: int) -> "ActionCommand":
+        """The shared instance of an action, ids wrap around the number of actions"""
+
+        return action_neurons[id % len(action_neurons)]
 
     @classmethod
     def get_class(cls, id: int):
-        for cmd in action_outputs:
-            if cmd.id == id % len(action_outputs):
-                return cmd
-        raise IndexError(f"Class id {id % len(action_outputs)} does not exist")
+        return type(cls.get(id))
 
     @staticmethod
     def sigmoid(x):
@@ -54,6 +63,9 @@ class BaseMoveCommand(ActionCommand):
         sigmoid = self.apply_sigmoid(inputs)
         if sigmoid < SIGMOID_THRESHOLD + activation_threshold and sigmoid > SIGMOID_THRESHOLD - activation_threshold:
             return
+        profiler = agent.world.profiler
+        if profiler is not None:
+            profiler.fires[type(self).__name__] += 1
         retries = 0
 
         while retries <= 5:
@@ -63,6 +75,10 @@ class BaseMoveCommand(ActionCommand):
                 break
             retries += 1
 
+        if retries and profiler is not None:
+            # The last failed attempt isn't retried
+            profiler.move_retries += min(retries, 5)
+
     def get_direction(self, agent: "Agent", sigmoid: float) -> Direction:
         raise NotImplementedError
 
@@ -72,7 +88,7 @@ class MoveRandomCommand(BaseMoveCommand):
     label = "RAND"
 
     def get_direction(self, agent: "Agent", sigmoid: float):
-        return Direction.random()
+        return Direction.random(agent.world.rng)
 
 
 class MoveEastWestCommand(BaseMoveCommand):
@@ -139,20 +155,7 @@ class MoveToClosestAgentCommand(BaseMoveCommand):
             return Direction.N if delta_y > 0 else Direction.S
 
     def find_closest_agent(self, agent: "Agent"):
-        # Assuming there's a method to get all agents in the environment
-        agents = agent.world.agents
-        min_distance = float("inf")
-        closest_agent = None
-
-        for other_agent in agents:
-            if other_agent is agent:
-                continue  # Skip the current agent
-            distance = self.calculate_distance(agent.coord, other_agent.coord)
-            if distance < min_distance:
-                min_distance = distance
-                closest_agent = other_agent
-
-        return closest_agent
+        return agent.world.nearest.closest(agent)
 
     @staticmethod
     def calculate_distance(coord1, coord2):
@@ -166,3 +169,6 @@ action_outputs = (
     MoveToCenterCommand,
     MoveToClosestAgentCommand,
 )
+
+# One instance per action, indexed by id
+action_neurons = tuple(command() for command in action_outputs)
@@ -1,4 +1,3 @@
-import random
 from typing import TYPE_CHECKING
 
 from evosim.constants import MAX_WEIGHT, NUM_INTERNAL_NEURONS, INTERNAL_TYPE
@@ -7,6 +6,7 @@ from evosim.types import Direction
 if TYPE_CHECKING:
     from evosim.agent import Agent
     from evosim.genome import Gene
+    from evosim.rng import RNG
 
 
 class InternalCommand:
@@ -19,6 +19,12 @@ class InternalCommand:
         self.id = id
         self.label = f"INTR{id}"
 
+    def __eq__(self, other) -> bool:
+        return isinstance(other, InternalCommand) and self.id == other.id
+
+    def __hash__(self) -> int:
+        return hash((self.type, self.id))
+
     def execute(
         self,
         agent: "Agent",
@@ -32,15 +38,18 @@ class InternalCommand:
         return [cls(i) for i in range(num_neurons)]
 
     @classmethod
-    def random(cls):
-        return random.choice(internal_commands)
+    def random(cls, rng: "RNG"):
+        return rng.choice(internal_commands)
+
+    @classmethod
+    def get(cls, id: int) -> "InternalCommand":
+        """The shared instance of an internal neuron, ids wrap around the number of them"""
+
+        return internal_commands[id % len(internal_commands)]
 
     @classmethod
     def get_class(cls, id: int):
-        for cmd in internal_commands:
-            if cmd.id == id % len(internal_commands):
-                return cmd
-        raise IndexError(f"Class id {id % len(internal_commands)} does not exist")
+        return cls.get(id)
 
     @staticmethod
     def apply_scalar(inputs: list[tuple[float, float]]):
@@ -1,13 +1,12 @@
 import math
-import random
 from typing import TYPE_CHECKING
 
 from evosim.constants import MAX_STEPS, SENSE_TYPE, CROWD_DISTANCE
 
-
 if TYPE_CHECKING:
     from evosim.agent import Agent
     from evosim.genome import Gene
+    from evosim.rng import RNG
 
 
 class SensoryCommand:
@@ -24,16 +23,25 @@ class SensoryCommand:
     ):
         raise NotImplementedError
 
+    def __eq__(self, other) -> bool:
+        return isinstance(other, SensoryCommand) and self.id == other.id
+
+    def __hash__(self) -> int:
+        return hash((self.type, self.id))
+
+    @classmethod
+    def random(cls, rng: "RNG"):
+        return rng.choice(sensory_neurons)
+
     @classmethod
-    def random(cls):
-        return random.choice(sensory_commands)()
+    def get(cls, id: int) -> "SensoryCommand":
+        """The shared instance of a sense, ids wrap around the number of senses"""
+
+        return sensory_neurons[id % len(sensory_neurons)]
 
     @classmethod
     def get_class(cls, id: int):
-        for cmd in sensory_commands:
-            if cmd.id == id % len(sensory_commands):
-                return cmd
-        raise IndexError(f"Class id {id % len(sensory_commands)} does not exist")
+        return type(cls.get(id))
 
 
 class AgeSensoryCommand(SensoryCommand):
@@ -59,7 +67,7 @@ class RandomSensoryCommand(SensoryCommand):
         inputs: list[tuple[float, float]],
         activation_threshold: float,
     ):
-        return random.random()
+        return agent.world.rng.random()
 
 
 class XWallSensoryCommand(SensoryCommand):
@@ -107,8 +115,8 @@ class NearestWallSensoryCommand(SensoryCommand):
         activation_threshold: float,
     ):
         return max(
-            XWallSensoryCommand().execute(agent, inputs, activation_threshold),
-            YWallSensoryCommand().execute(agent, inputs, activation_threshold),
+            sensory_neurons[XWallSensoryCommand.id].execute(agent, inputs, activation_threshold),
+            sensory_neurons[YWallSensoryCommand.id].execute(agent, inputs, activation_threshold),
         )
 
 
@@ -125,15 +133,7 @@ class CrowdSensoryCommand(SensoryCommand):
         activation_threshold: float,
     ):
         radius = CROWD_DISTANCE
-        count = 0
-
-        for other_agent in agent.world.agents:
-            if other_agent is not agent:
-                distance = (
-                    (other_agent.coord.x - agent.coord.x) ** 2 + (other_agent.coord.y - agent.coord.y) ** 2
-                ) ** 0.5
-                if distance <= radius:
-                    count += 1
+        count = agent.world.crowd_hash.count_within(agent, radius)
 
         # Approximate the max no of agents that can fit in the radius
         max_possible_agents_in_radius = int(math.pi * radius**2)
@@ -155,7 +155,7 @@ class PredictorSensoryCommand(SensoryCommand):
         prediction_accuracy = 0.1
 
         is_kill_zone = agent.world.kill_fn(agent.world.len, agent.coord)
-        prediction = random.random() < prediction_accuracy
+        prediction = agent.world.rng.random() < prediction_accuracy
 
         return 1.0 if prediction == is_kill_zone else 0.0
 
@@ -191,3 +191,6 @@ sensory_commands = (
     CrowdSensoryCommand,
     PredictorSensoryCommand,
 )
+
+# One instance per sense, indexed by id. Senses are stateless, every gene reading a sense shares it
+sensory_neurons = tuple(command() for command in sensory_commands)
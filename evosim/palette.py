@@ -0,0 +1,41 @@
+from typing import Iterable
+
+import numpy as np
+
+from evosim.utils import hex_to_rgba
+
+
+class Palette:
+    """Maps agent colors to small integer ids so logs and renderers can carry ids instead of strings"""
+
+    colors: list[str]
+    ids: dict[str, int]
+
+    def __init__(self, colors: Iterable[str] = ()):
+        self.colors = []
+        self.ids = {}
+        self._rgba = np.zeros((0, 4))
+        for color in colors:
+            self.id_of(color)
+
+    def id_of(self, color: str) -> int:
+        color_id = self.ids.get(color)
+        if color_id is None:
+            color_id = self.ids[color] = len(self.colors)
+            self.colors.append(color)
+        return color_id
+
+    def __getitem__(self, color_id: int) -> str:
+        return self.colors[color_id]
+
+    def __len__(self) -> int:
+        return len(self.colors)
+
+    def rgba(self) -> np.ndarray:
+        """The colors as an array of RGBA rows in [0, 1], index it with color ids"""
+
+        if len(self._rgba) != len(self.colors):
+            new_colors = self.colors[len(self._rgba) :]
+            new_rgba = np.array([hex_to_rgba(color) for color in new_colors], dtype=float).reshape(-1, 4) / 255
+            self._rgba = np.concatenate([self._rgba, new_rgba])
+        return self._rgba
@@ -0,0 +1,135 @@
+import contextlib
+import csv
+import json
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Iterator, Optional, TextIO
+
+from evosim.neuron.actions import action_outputs
+from evosim.neuron.internal import InternalCommand
+from evosim.neuron.senses import sensory_commands
+
+if TYPE_CHECKING:
+    from evosim.agent import Agent
+
+PHASES = (
+    "act",
+    "snapshot",
+    "selectively_kill",
+    "reproduce_agents",
+    "celebrate_birthday",
+    "randomize_agent_coords",
+    "kill_old_age",
+    "checkpoint",
+)
+ACTION_CLASSES = tuple(command.__name__ for command in action_outputs)
+NEURON_CLASSES = (
+    *(command.__name__ for command in sensory_commands),
+    InternalCommand.__name__,
+    *ACTION_CLASSES,
+)
+
+NO_PHASE = contextlib.nullcontext()  # what World.phase hands out when nothing is profiled
+
+
+@dataclass
+class GenerationProfile:
+    generation: int
+    population: int  # agents that lived through the steps
+    wall: dict[str, float] = field(default_factory=lambda: dict.fromkeys(PHASES, 0.0))  # seconds per phase
+    cpu: dict[str, float] = field(default_factory=lambda: dict.fromkeys(PHASES, 0.0))  # process CPU seconds per phase
+    # execute calls per class, every neuron of a plan is executed once a step
+    executions: dict[str, int] = field(default_factory=lambda: dict.fromkeys(NEURON_CLASSES, 0))
+    # actions per class whose output got past the activation threshold, so that the agent tried to move
+    fires: dict[str, int] = field(default_factory=lambda: dict.fromkeys(ACTION_CLASSES, 0))
+    move_retries: int = 0  # attempts after the first in BaseMoveCommand.execute
+
+    def row(self) -> dict[str, float]:
+        """The profile flattened into one CSV row"""
+
+        return {
+            "generation": self.generation,
+            "population": self.population,
+            **{f"wall_{phase}": seconds for phase, seconds in self.wall.items()},
+            **{f"cpu_{phase}": seconds for phase, seconds in self.cpu.items()},
+            **{f"executions_{neuron}": count for neuron, count in self.executions.items()},
+            **{f"fires_{action}": count for action, count in self.fires.items()},
+            "move_retries": self.move_retries,
+        }
+
+
+class Profiler:
+    """
+    Times the phases of every generation a World simulates and counts what its neurons do.
+    A profile is written to out after every generation, as a JSON line or, with format="csv", a CSV row.
+    Attach it with World(profiler=...), a world without one doesn't pay for it.
+    """
+
+    profiles: list[GenerationProfile]
+    current: Optional[GenerationProfile]
+    # Incremented by BaseMoveCommand.execute and the vectorized engine
+    fires: Counter
+    move_retries: int
+
+    def __init__(self, out: Optional[TextIO] = None, format: str = "json"):
+        if format not in ("json", "csv"):
+            raise ValueError(f"Unknown profile format {format}, must be json or csv")
+
+        self.out = out
+        self.format = format
+        self.profiles = []
+        self.current = None
+        self.fires = Counter()
+        self.move_retries = 0
+        self._csv = None
+        self._plan_executions = {}
+
+    def start(self, generation: int, population: int):
+        self.current = GenerationProfile(generation, population)
+        self.fires = Counter()
+        self.move_retries = 0
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.current.wall[name] += time.perf_counter() - wall
+            self.current.cpu[name] += time.process_time() - cpu
+
+    def count_executions(self, agents: list["Agent"], steps: int):
+        """Every neuron of a plan is executed once per step, so the calls follow from the plans"""
+
+        executions = Counter()
+        for agent in agents:
+            plan = agent.genome.plan
+            counts = self._plan_executions.get(id(plan))
+            if counts is None:
+                counts = self._plan_executions[id(plan)] = Counter(type(neuron).__name__ for neuron in plan.neurons)
+            executions.update(counts)
+
+        for neuron, count in executions.items():
+            self.current.executions[neuron] += count * steps
+
+    def finish(self) -> GenerationProfile:
+        profile = self.current
+        profile.fires.update(self.fires)
+        profile.move_retries = self.move_retries
+        self.profiles.append(profile)
+        self.current = None
+        # Plans of genomes that died out can be collected now and their ids reused
+        self._plan_executions.clear()
+
+        if self.out is not None:
+            if self.format == "csv":
+                if self._csv is None:
+                    self._csv = csv.DictWriter(self.out, fieldnames=list(profile.row()))
+                    self._csv.writeheader()
+                self._csv.writerow(profile.row())
+            else:
+                self.out.write(json.dumps(asdict(profile)) + "\n")
+            self.out.flush()
+
+        return profile
@@ -0,0 +1,32 @@
+import time
+from typing import Callable
+
+from evosim.constants import MAX_STEPS
+
+ProgressFn = Callable[[int, int], None]  # called with the generation and the step just taken
+
+
+class Throttled:
+    """Forwards progress to a callback at most every interval seconds, and always at the last step of a generation"""
+
+    callback: ProgressFn
+    interval: float
+    last: float  # time of the last call forwarded
+
+    def __init__(self, callback: ProgressFn, interval: float = 1.0):
+        self.callback = callback
+        self.interval = interval
+        self.last = float("-inf")
+
+    def __call__(self, generation: int, step: int):
+        now = time.monotonic()
+        if now - self.last >= self.interval or step == MAX_STEPS - 1:
+            self.last = now
+            self.callback(generation, step)
+
+
+def print_progress(generation: int, step: int):
+    """A progress line that is overwritten in place"""
+
+    end = "\n" if step == MAX_STEPS - 1 else ""
+    print(f"\rGeneration {generation}: step {step + 1}/{MAX_STEPS}", end=end, flush=True)
@@ -0,0 +1,141 @@
+from typing import Union
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from evosim.constants import MAX_STEPS
+from evosim.kill_fn import KILL_ZONE_ALPHA, LIVE_ZONE_ALPHA, compile_kill_fn
+from evosim.log_store import StepFrame
+from evosim.palette import Palette
+from evosim.types import KillFn, Log
+from evosim.utils import create_dir
+
+Frame = Union[Log, StepFrame]
+
+BACKGROUND = (255, 255, 255)
+TEXT_COLOR = (0, 0, 0)
+DIED_COLOR = (255, 0, 0)
+REPRODUCED_COLOR = (0, 0, 255)
+
+
+def composite(background: np.ndarray, rgba: np.ndarray) -> np.ndarray:
+    """Blend RGBA colors in [0, 1] over uint8 RGB pixels"""
+
+    alpha = rgba[..., 3:]
+    return np.rint(background * (1 - alpha) + rgba[..., :3] * 255 * alpha).astype(np.uint8)
+
+
+class RasterRenderer:
+    """
+    Draws frames straight from the log arrays into uint8 image buffers, without matplotlib.
+    Every cell of the world is a square of cell_size pixels, y grows upwards as in the figures,
+    and a panel on the right holds the generation, step and agent count.
+    """
+
+    world_len: int
+    cell_size: int
+    kill_mask: np.ndarray
+    backgrounds: dict[bool, np.ndarray]  # (world_len, world_len, 3) cells top row first, with the kill zone when True
+
+    line_height = 14
+
+    def __init__(self, world_len: int, kill_fn: KillFn, cell_size: int = 6, panel_width: int = 200):
+        self.world_len = world_len
+        self.cell_size = cell_size
+        self.panel_width = panel_width
+
+        kill_zone = compile_kill_fn(kill_fn, world_len)
+        self.kill_mask = kill_zone.mask
+        plain = np.full((world_len, world_len, 3), BACKGROUND, dtype=np.uint8)
+        self.backgrounds = {
+            False: plain,
+            True: np.flipud(composite(plain, kill_zone.layer(KILL_ZONE_ALPHA, LIVE_ZONE_ALPHA))),
+        }
+
+        self.font = ImageFont.load_default()
+        self.lines: dict[str, Image.Image] = {}  # rendered text lines, most repeat from frame to frame
+        self.palette = Palette()  # for the hex colors of Log frames
+
+        side = world_len * cell_size
+        self.blank = np.full((side, side + panel_width, 3), BACKGROUND, dtype=np.uint8)
+
+    @property
+    def size(self) -> tuple[int, int]:
+        """Width and height of the rendered images"""
+
+        height, width, _ = self.blank.shape
+        return width, height
+
+    def agent_arrays(self, log: "Frame") -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """x coordinates, y coordinates and RGBA colors in [0, 1] of the agents in a frame"""
+
+        if isinstance(log, StepFrame):
+            return np.asarray(log.xs), np.asarray(log.ys), log.rgba
+
+        color_ids = [self.palette.id_of(agent.color) for agent in log.agents]
+        xs = np.array([agent.coord.x for agent in log.agents], dtype=int)
+        ys = np.array([agent.coord.y for agent in log.agents], dtype=int)
+        return xs, ys, self.palette.rgba()[color_ids]
+
+    def line(self, text: str) -> Image.Image:
+        """A line of text as a mask, rendered once"""
+
+        mask = self.lines.get(text)
+        if mask is None:
+            left, top, right, bottom = self.font.getbbox(text)
+            mask = Image.new("L", (right, self.line_height), 0)
+            ImageDraw.Draw(mask).text((0, 0), text, fill=255, font=self.font)
+            self.lines[text] = mask
+        return mask
+
+    def write(self, image: Image.Image, top: int, lines: list[str], color: tuple[int, int, int]):
+        left = self.world_len * self.cell_size + 10
+        for i, text in enumerate(lines):
+            image.paste(color, (left, top + i * self.line_height), self.line(text))
+
+    def draw(self, log: "Frame", end_of_gen: bool = False) -> Image.Image:
+        """Render a frame to an RGB image"""
+
+        xs, ys, rgba = self.agent_arrays(log)
+        cells = self.backgrounds[end_of_gen].copy()
+        if len(xs):
+            rows = self.world_len - 1 - ys
+            cells[rows, xs] = composite(cells[rows, xs], rgba)
+        world = np.repeat(np.repeat(cells, self.cell_size, axis=0), self.cell_size, axis=1)
+
+        pixels = self.blank.copy()
+        pixels[:, : world.shape[1]] = world
+        image = Image.fromarray(pixels)
+
+        step = MAX_STEPS if end_of_gen else log.step
+        self.write(
+            image,
+            10,
+            [f"Generation: {log.generation}", f"Step: {step} / {MAX_STEPS}", f"Agent count: {len(xs)}"],
+            TEXT_COLOR,
+        )
+        if end_of_gen:
+            agents_dead_num = int(self.kill_mask[ys, xs].sum())
+            agents_reproducing_num = len(xs) - agents_dead_num
+            self.write(image, 70, [f"Agents died: {agents_dead_num}"], DIED_COLOR)
+            self.write(
+                image,
+                90,
+                [f"Agents reproduced: {agents_reproducing_num}", f"Agents next generation: {agents_reproducing_num*2}"],
+                REPRODUCED_COLOR,
+            )
+        return image
+
+    def render(self, log: "Frame", end_of_gen: bool = False) -> str:
+        """Render a frame to ./steps/ like the matplotlib renderers, returns the path"""
+
+        create_dir("./steps")
+        create_dir(f"./steps/{log.generation}")
+
+        if end_of_gen:
+            path = f"./steps/{log.generation}/END.png"
+        else:
+            path = f"./steps/{log.generation}/{log.generation}-{log.step}.png"
+        # Low compression, frames are written far more often than they are read
+        self.draw(log, end_of_gen).save(path, compress_level=1)
+        return path
@@ -0,0 +1,87 @@
+from typing import MutableSequence, Optional, Sequence, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
+
+
+class RNG:
+    """
+    Seeded random numbers for a world. Values are drawn from a NumPy Generator a block at a time
+    and handed out one by one, the same seed always gives the same run.
+    The vectorized engine draws its arrays from the generator directly.
+    """
+
+    seed: int
+    block_size: int
+    generator: np.random.Generator
+    floats: list[float]  # pre-drawn values in [0, 1), used from the end
+    words: list[int]  # pre-drawn 32 bit values, used from the end
+
+    def __init__(self, seed: Optional[int] = None, block_size: int = 1024):
+        # Without a seed one is drawn, so the run can still be repeated from self.seed
+        self.seed = seed if seed is not None else int(np.random.SeedSequence().generate_state(1)[0])
+        self.block_size = block_size
+        self.generator = np.random.default_rng(self.seed)
+        self.floats = []
+        self.words = []
+
+    def random(self) -> float:
+        """A float in [0, 1)"""
+
+        if not self.floats:
+            self.floats = self.generator.random(self.block_size).tolist()
+        return self.floats.pop()
+
+    def getrandbits32(self) -> int:
+        if not self.words:
+            self.words = self.generator.integers(0, 2**32, self.block_size, dtype=np.uint32).tolist()
+        return self.words.pop()
+
+    def below(self, n: int) -> int:
+        """An int in [0, n)"""
+
+        return int(self.random() * n)
+
+    def randint(self, a: int, b: int) -> int:
+        """An int in [a, b], like random.randint"""
+
+        return a + self.below(b - a + 1)
+
+    def choice(self, items: Sequence[T]) -> T:
+        return items[self.below(len(items))]
+
+    def shuffle(self, items: MutableSequence):
+        """Shuffle in place, Fisher-Yates"""
+
+        for i in range(len(items) - 1, 0, -1):
+            j = self.below(i + 1)
+            items[i], items[j] = items[j], items[i]
+
+    def sample(self, items: Sequence[T], k: int) -> list[T]:
+        """k distinct items"""
+
+        if not 0 <= k <= len(items):
+            raise ValueError(f"Sample of {k} is larger than the population of {len(items)}")
+
+        pool = list(items)
+        for i in range(k):
+            j = i + self.below(len(pool) - i)
+            pool[i], pool[j] = pool[j], pool[i]
+        return pool[:k]
+
+    def distinct(self, n: int, k: int) -> list[int]:
+        """k distinct ints in [0, n), drawn in one go"""
+
+        return self.generator.choice(n, size=k, replace=False).tolist()
+
+    def getstate(self) -> tuple[dict, list[float], list[int]]:
+        """The generator state and the values drawn but not handed out yet"""
+
+        return self.generator.bit_generator.state, list(self.floats), list(self.words)
+
+    def setstate(self, state: tuple[dict, list[float], list[int]]):
+        generator_state, floats, words = state
+        self.generator.bit_generator.state = generator_state
+        self.floats = list(floats)
+        self.words = list(words)
@@ -0,0 +1,169 @@
+import math
+from collections import defaultdict
+from typing import TYPE_CHECKING, Optional
+
+from evosim.types import Coord
+
+if TYPE_CHECKING:
+    from evosim.agent import Agent
+    from evosim.world import World
+
+
+class SpatialHash:
+    """
+    Agents bucketed by square cells of cell_size x cell_size world cells.
+    Radius queries with a radius up to cell_size only have to look at the 3x3 neighbouring buckets.
+    """
+
+    cell_size: int
+    buckets_per_side: int
+    buckets: list[set["Agent"]]
+
+    def __init__(self, world_len: int, cell_size: int):
+        self.cell_size = cell_size
+        self.buckets_per_side = (world_len + cell_size - 1) // cell_size
+        self.buckets = [set() for _ in range(self.buckets_per_side**2)]
+
+    def bucket_index(self, coord: Coord) -> int:
+        return (coord.y // self.cell_size) * self.buckets_per_side + coord.x // self.cell_size
+
+    def rebuild(self, agents: list["Agent"]):
+        for bucket in self.buckets:
+            bucket.clear()
+        for agent in agents:
+            self.buckets[self.bucket_index(agent.coord)].add(agent)
+
+    def move(self, agent: "Agent", old: Coord, new: Coord):
+        old_bucket = self.bucket_index(old)
+        new_bucket = self.bucket_index(new)
+        if old_bucket != new_bucket:
+            self.buckets[old_bucket].discard(agent)
+            self.buckets[new_bucket].add(agent)
+
+    def count_within(self, agent: "Agent", radius: int) -> int:
+        """Number of other agents at a distance of at most radius from the agent"""
+
+        x, y = agent.coord.x, agent.coord.y
+        radius_squared = radius * radius
+        last_bucket = self.buckets_per_side - 1
+
+        min_bx = max((x - radius) // self.cell_size, 0)
+        max_bx = min((x + radius) // self.cell_size, last_bucket)
+        min_by = max((y - radius) // self.cell_size, 0)
+        max_by = min((y + radius) // self.cell_size, last_bucket)
+
+        count = 0
+        for by in range(min_by, max_by + 1):
+            for bx in range(min_bx, max_bx + 1):
+                for other_agent in self.buckets[by * self.buckets_per_side + bx]:
+                    if other_agent is not agent:
+                        dx = other_agent.coord.x - x
+                        dy = other_agent.coord.y - y
+                        if dx * dx + dy * dy <= radius_squared:
+                            count += 1
+        return count
+
+
+class NearestNeighbours:
+    """
+    Closest other agent of each agent, found with a ring search in the world's occupancy grid.
+    Results are kept until a move could change them, so retries within a step reuse them.
+    Ties go to the agent with the lowest id, like a linear scan over world.agents.
+    """
+
+    world: "World"
+    entries: dict[int, tuple[int, float]]  # agent id -> (closest agent id or -1, squared distance)
+    dependents: defaultdict[int, set[int]]  # agent id -> ids of the agents it is the closest agent of
+    max_distance: float  # upper bound of the squared distances in entries
+
+    def __init__(self, world: "World"):
+        self.world = world
+        self.rings = [[(0, 0)]]
+        self.clear()
+
+    def clear(self):
+        self.entries = {}
+        self.dependents = defaultdict(set)
+        self.max_distance = 0
+
+    def ring(self, radius: int) -> list[tuple[int, int]]:
+        """Offsets of the cells at a chessboard distance of radius"""
+
+        while len(self.rings) <= radius:
+            r = len(self.rings)
+            self.rings.append(
+                [(ox, oy) for ox in range(-r, r + 1) for oy in range(-r, r + 1) if max(abs(ox), abs(oy)) == r]
+            )
+        return self.rings[radius]
+
+    def search(self, coord: Coord, agent_id: int) -> tuple[int, float]:
+        world_len = self.world.len
+        occupancy = self.world.occupancy
+        x, y = coord.x, coord.y
+        closest, closest_distance = -1, math.inf
+
+        for radius in range(world_len):
+            # Every cell in this ring is at least radius away
+            if radius * radius > closest_distance:
+                break
+            for ox, oy in self.ring(radius):
+                cx, cy = x + ox, y + oy
+                if 0 <= cx < world_len and 0 <= cy < world_len:
+                    other = occupancy[cy * world_len + cx]
+                    if other != -1 and other != agent_id:
+                        distance = ox * ox + oy * oy
+                        if distance < closest_distance or (distance == closest_distance and other < closest):
+                            closest, closest_distance = other, distance
+
+        return closest, closest_distance
+
+    def closest(self, agent: "Agent") -> Optional["Agent"]:
+        if agent.id < 0:
+            # Not placed in the world, nothing to cache it under
+            closest, _ = self.search(agent.coord, agent.id)
+        elif agent.id in self.entries:
+            closest, _ = self.entries[agent.id]
+        else:
+            closest, distance = self.search(agent.coord, agent.id)
+            self.entries[agent.id] = (closest, distance)
+            self.dependents[closest].add(agent.id)
+            self.max_distance = max(self.max_distance, distance)
+
+        return self.world.agents[closest] if closest != -1 else None
+
+    def forget(self, agent_id: int):
+        entry = self.entries.pop(agent_id, None)
+        if entry is not None:
+            self.dependents[entry[0]].discard(agent_id)
+
+    def moved(self, agent: "Agent", new: Coord):
+        """Drop the entries the move could change: the mover's, the ones pointing at it, and the ones it got closer to"""
+
+        self.forget(agent.id)
+        for dependent in self.dependents.pop(agent.id, ()):
+            self.entries.pop(dependent, None)
+
+        if not self.entries:
+            return
+
+        agents = self.world.agents
+        radius = math.isqrt(int(self.max_distance)) + 1 if self.max_distance != math.inf else math.inf
+
+        if len(self.entries) <= (2 * radius + 1) ** 2:
+            candidates = list(self.entries)
+        else:
+            # Cheaper to look at the cells around the new position
+            world_len = self.world.len
+            occupancy = self.world.occupancy
+            candidates = [
+                occupancy[cy * world_len + cx]
+                for cy in range(max(new.y - radius, 0), min(new.y + radius + 1, world_len))
+                for cx in range(max(new.x - radius, 0), min(new.x + radius + 1, world_len))
+                if occupancy[cy * world_len + cx] in self.entries
+            ]
+
+        for agent_id in candidates:
+            other = agents[agent_id].coord
+            distance = (other.x - new.x) ** 2 + (other.y - new.y) ** 2
+            if distance <= self.entries[agent_id][1]:
+                self.forget(agent_id)
@@ -0,0 +1,60 @@
+import threading
+from queue import Queue
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+_DONE = object()  # queued by close() after the last item
+
+
+class BackgroundConsumer(Generic[T]):
+    """
+    Hands items to a function on a background thread, so a producer such as World.iter_steps
+    keeps simulating while the items are rendered or written.
+    The queue is bounded, put() blocks while it is full so memory stays bounded when the consumer falls behind.
+    """
+
+    queue: Queue
+    error: Optional[BaseException]  # first error raised by handle, raised again in the producer
+
+    def __init__(self, handle: Callable[[T], None], max_queued: int = 64):
+        self.handle = handle
+        self.queue = Queue(maxsize=max_queued)
+        self.error = None
+
+        self.thread = threading.Thread(target=self.consume, daemon=True)
+        self.thread.start()
+
+    def put(self, item: T):
+        """Queue an item, blocks while the queue is full"""
+
+        if self.error is not None:
+            raise self.error
+        self.queue.put(item)
+
+    def consume(self):
+        while True:
+            item = self.queue.get()
+            if item is _DONE:
+                break
+            if self.error is not None:
+                continue  # keep draining so the producer is never blocked
+
+            try:
+                self.handle(item)
+            except BaseException as error:
+                self.error = error
+
+    def close(self):
+        """Wait for the queued items to be handled"""
+
+        self.queue.put(_DONE)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self) -> "BackgroundConsumer[T]":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,236 @@
+"""
+Run a grid of configurations over many seeds in parallel processes and collect per-generation summaries.
+
+    python -m evosim.sweep --seeds 8 --kill-fn middle outside_circle --mutation-rate 0.01 0.1 --out sweep.csv
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import itertools
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from typing import Iterable, Optional
+
+from evosim.constants import GENOME_CONNECTIONS, INITIAL_POPULATION, MAX_STEPS, MUTATION_RATE, WORLD_LEN
+from evosim.kill_fn import center_circle_kill_fn, middle_kill_fn, outside_circle_kill_fn
+from evosim.memory import MemoryProfiler
+from evosim.reproduce_fn import clone_reproduce, mutate_reproduce
+from evosim.types import KillFn, ReproductionFn
+from evosim.world import LOG_NONE, World
+
+# Functions are looked up by name so configurations stay small and readable in the results
+KILL_FNS: dict[str, KillFn] = {
+    "middle": middle_kill_fn,
+    "center_circle": center_circle_kill_fn,
+    "outside_circle": outside_circle_kill_fn,
+}
+REPRODUCTION_FNS: dict[str, ReproductionFn] = {
+    "clone": clone_reproduce,
+    "mutate": mutate_reproduce,
+}
+
+
+@dataclass(frozen=True)
+class RunConfig:
+    """A single independent run"""
+
+    seed: int
+    kill_fn: str = "outside_circle"
+    reproduction_fn: str = "mutate"
+    mutation_rate: float = MUTATION_RATE
+    genome_connections: int = GENOME_CONNECTIONS
+    world_len: int = WORLD_LEN
+    initial_population: int = INITIAL_POPULATION
+    generations: int = 5
+    engine: str = "object"
+    memory: bool = False  # account for the memory of every generation, tracing is much slower
+
+
+@dataclass
+class GenerationSummary:
+    """One row of the results table"""
+
+    run: int
+    seed: int
+    kill_fn: str
+    reproduction_fn: str
+    mutation_rate: float
+    genome_connections: int
+    generation: int
+    population: int  # agents that lived through the steps
+    survivors: int  # agents outside the kill zone at the end
+    distinct_genomes: int  # in the next generation
+    distinct_genes: int
+    top_gene: str
+    top_gene_frequency: float  # share of the next generation carrying the most common gene
+    seconds: float
+    peak_memory: int = 0  # bytes traced at the peak of the generation, when memory is accounted for
+    retained_memory: int = 0  # bytes still traced at its end
+
+
+def grid(
+    seeds: Iterable[int],
+    kill_fns: Iterable[str] = ("outside_circle",),
+    reproduction_fns: Iterable[str] = ("mutate",),
+    mutation_rates: Iterable[float] = (MUTATION_RATE,),
+    genome_connections: Iterable[int] = (GENOME_CONNECTIONS,),
+    **options,
+) -> list[RunConfig]:
+    """Every combination of the parameters, options are passed on to every RunConfig"""
+
+    return [
+        RunConfig(
+            seed=seed,
+            kill_fn=kill_fn,
+            reproduction_fn=reproduction_fn,
+            mutation_rate=mutation_rate,
+            genome_connections=connections,
+            **options,
+        )
+        for kill_fn, reproduction_fn, mutation_rate, connections, seed in itertools.product(
+            kill_fns, reproduction_fns, mutation_rates, genome_connections, seeds
+        )
+    ]
+
+
+def gene_stats(world: World) -> tuple[int, int, str, float]:
+    """Distinct genomes and genes of the population, and the most common gene with its frequency"""
+
+    genes = Counter()
+    for agent in world.agents:
+        genes.update(set(agent.genome.genes))
+    distinct_genomes = len({agent.genome.genes for agent in world.agents})
+
+    if not genes:
+        return distinct_genomes, 0, "", 0.0
+    top_gene, top_count = genes.most_common(1)[0]
+    return distinct_genomes, len(genes), repr(top_gene), top_count / len(world.agents)
+
+
+def make_world(config: RunConfig) -> World:
+    return World(
+        len=config.world_len,
+        initial_population=config.initial_population,
+        genome_connections=config.genome_connections,
+        kill_fn=KILL_FNS[config.kill_fn],
+        reproduction_fn=REPRODUCTION_FNS[config.reproduction_fn],
+        engine=config.engine,
+        mutation_rate=config.mutation_rate,
+        seed=config.seed,
+        memory=MemoryProfiler() if config.memory else None,
+        # Only the summaries are kept, the steps are neither logged nor shown
+        log_every=LOG_NONE,
+        headless=True,
+    )
+
+
+def simulate_generation(world: World, run: int, config: RunConfig, gen: int) -> GenerationSummary:
+    """Simulate a generation without keeping its steps, and summarize it"""
+
+    start = time.perf_counter()
+    population = len(world.agents)
+    for _ in world.iter_generation(gen):
+        ...
+    seconds = time.perf_counter() - start
+    memory = world.memory.profiles[-1] if world.memory is not None else None
+
+    return GenerationSummary(
+        run,
+        config.seed,
+        config.kill_fn,
+        config.reproduction_fn,
+        config.mutation_rate,
+        config.genome_connections,
+        gen,
+        population,
+        len(world.selected),
+        *gene_stats(world),
+        seconds,
+        memory.peak if memory is not None else 0,
+        memory.retained if memory is not None else 0,
+    )
+
+
+def run_config(run: int, config: RunConfig) -> list[GenerationSummary]:
+    """Simulate a configuration in this process, seeded so the run can be repeated"""
+
+    world = make_world(config)
+
+    # Many runs share a terminal, keep the per-generation output of the world quiet
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        try:
+            return [simulate_generation(world, run, config, gen) for gen in range(config.generations)]
+        finally:
+            world.finish()
+
+
+def sweep(configs: list[RunConfig], workers: Optional[int] = None) -> list[GenerationSummary]:
+    """Fan the runs out over a process pool, the rows are ordered by run and generation"""
+
+    start = time.perf_counter()
+    results: dict[int, list[GenerationSummary]] = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_config, run, config): run for run, config in enumerate(configs)}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            print(f"Run {len(results)}/{len(configs)} done")
+
+    rows = [row for run in sorted(results) for row in results[run]]
+    elapsed = time.perf_counter() - start
+    agent_steps = sum(row.population for row in rows) * MAX_STEPS
+    print(
+        f"{len(configs)} runs, {len(rows)} generations in {elapsed:.1f}s: "
+        f"{len(rows) / elapsed:.1f} generations/s, {agent_steps / elapsed:,.0f} agent steps/s"
+    )
+    return rows
+
+
+def write_csv(rows: list[GenerationSummary], path: str):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(GenerationSummary.__dataclass_fields__))
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(asdict(row))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m evosim.sweep", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seeds", type=int, default=4, help="number of seeds per configuration")
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--kill-fn", nargs="+", choices=KILL_FNS, default=["outside_circle"])
+    parser.add_argument("--reproduction-fn", nargs="+", choices=REPRODUCTION_FNS, default=["mutate"])
+    parser.add_argument("--mutation-rate", nargs="+", type=float, default=[MUTATION_RATE])
+    parser.add_argument("--genome-connections", nargs="+", type=int, default=[GENOME_CONNECTIONS])
+    parser.add_argument("--generations", type=int, default=5)
+    parser.add_argument("--world-len", type=int, default=WORLD_LEN)
+    parser.add_argument("--population", type=int, default=INITIAL_POPULATION)
+    parser.add_argument("--engine", choices=("object", "numpy"), default="object")
+    parser.add_argument("--memory", action="store_true", help="record peak and retained memory, much slower")
+    parser.add_argument("--workers", type=int, default=None, help=f"processes, defaults to the {os.cpu_count()} cores")
+    parser.add_argument("--out", default="sweep.csv", help="results table")
+    args = parser.parse_args(argv)
+
+    configs = grid(
+        range(args.first_seed, args.first_seed + args.seeds),
+        args.kill_fn,
+        args.reproduction_fn,
+        args.mutation_rate,
+        args.genome_connections,
+        generations=args.generations,
+        world_len=args.world_len,
+        initial_population=args.population,
+        engine=args.engine,
+        memory=args.memory,
+    )
+    rows = sweep(configs, args.workers)
+    write_csv(rows, args.out)
+    print(f"Wrote {len(rows)} rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
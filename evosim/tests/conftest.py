@@ -0,0 +1,32 @@
+from typing import Callable
+
+import pytest
+
+from evosim.reproduce_fn import mutate_reproduce
+from evosim.types import Coord
+from evosim.world import World
+
+
+def west_kill_fn(world_len: int, coord: Coord) -> bool:
+    """The west half of the world"""
+
+    return coord.x < world_len // 2
+
+
+@pytest.fixture
+def make_world() -> Callable[..., World]:
+    """Small seeded worlds for the tests, the options override the defaults and are passed on to World"""
+
+    def make(**options) -> World:
+        settings = dict(
+            len=16,
+            initial_population=20,
+            genome_connections=3,
+            kill_fn=west_kill_fn,
+            reproduction_fn=mutate_reproduce,
+            seed=0,
+        )
+        settings.update(options)
+        return World(**settings)
+
+    return make
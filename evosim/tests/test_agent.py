@@ -1,10 +1,18 @@
-from evosim.world import World, Agent
+from evosim.constants import CROWD_DISTANCE
+from evosim.neuron.actions import MoveToClosestAgentCommand
+from evosim.reproduce_fn import clone_reproduce, mutate_reproduce
+from evosim.world import LOG_NONE, World, Agent
 from evosim.types import Coord, Direction
 
 
 def test_moving():
     w = World(
-        len=50, initial_population=10, genome_connections=2, kill_fn=lambda x, y: False
+        len=50,
+        initial_population=10,
+        genome_connections=2,
+        kill_fn=lambda x, y: False,
+        reproduction_fn=mutate_reproduce,
+        seed=0,  # keeps the other agents away from the corner
     )
     a = Agent(
         world=w,
@@ -36,7 +44,11 @@ def test_moving():
 
 def test_moving_directions():
     w = World(
-        len=50, initial_population=2, genome_connections=2, kill_fn=lambda x, y: False
+        len=50,
+        initial_population=2,
+        genome_connections=2,
+        kill_fn=lambda x, y: False,
+        reproduction_fn=mutate_reproduce,
     )
     a, b = w.agents[0], w.agents[1]
 
@@ -50,3 +62,116 @@ def test_moving_directions():
     a.move(Direction.E)
 
     assert a.coord == Coord(x=1, y=0)
+
+
+def test_occupancy_tracks_agents():
+    w = World(
+        len=10,
+        initial_population=20,
+        genome_connections=2,
+        kill_fn=lambda world_len, coord: coord.x < 5,
+        reproduction_fn=mutate_reproduce,
+    )
+
+    def occupied():
+        return {(i % w.len, i // w.len): agent_id for i, agent_id in enumerate(w.occupancy) if agent_id != -1}
+
+    assert occupied() == {(agent.coord.x, agent.coord.y): agent.id for agent in w.agents}
+
+    a = w.agents[0]
+    a.coord = Coord(x=0, y=0) if w.is_coord_free(Coord(x=0, y=0)) else a.coord
+    for direction in Direction:
+        a.move(direction)
+    assert occupied() == {(agent.coord.x, agent.coord.y): agent.id for agent in w.agents}
+
+    w.selectively_kill()
+    assert all(agent.coord.x >= 5 for agent in w.agents)
+    assert occupied() == {(agent.coord.x, agent.coord.y): agent.id for agent in w.agents}
+    assert [agent.id for agent in w.agents] == list(range(len(w.agents)))
+
+
+def test_population_is_capped_by_the_world():
+    for engine in ("object", "numpy"):
+        w = World(
+            len=8,
+            initial_population=40,
+            genome_connections=2,
+            kill_fn=lambda world_len, coord: False,
+            reproduction_fn=clone_reproduce,
+            engine=engine,
+            log_every=LOG_NONE,
+            headless=True,
+            seed=0,
+        )
+        # Clones outnumber the cells from the first generation on, and keep their age so they outlive it
+        for gen in range(2):
+            w.simulate_generation(gen)
+            assert len(w.agents) == 64
+            assert len({(agent.coord.x, agent.coord.y) for agent in w.agents}) == 64
+            assert sorted(w.occupancy) == list(range(64))
+
+
+def test_crowd_matches_linear_scan():
+    w = World(
+        len=40,
+        initial_population=400,
+        genome_connections=2,
+        kill_fn=lambda world_len, coord: False,
+        reproduction_fn=mutate_reproduce,
+    )
+    for agent in w.agents[:100]:
+        agent.move(Direction.random(w.rng))
+
+    def linear_count(agent):
+        return sum(
+            1
+            for other in w.agents
+            if other is not agent
+            and ((other.coord.x - agent.coord.x) ** 2 + (other.coord.y - agent.coord.y) ** 2) ** 0.5 <= CROWD_DISTANCE
+        )
+
+    for agent in w.agents:
+        assert w.crowd_hash.count_within(agent, CROWD_DISTANCE) == linear_count(agent)
+
+
+def test_closest_agent_matches_linear_scan():
+    w = World(
+        len=30,
+        initial_population=60,
+        genome_connections=2,
+        kill_fn=lambda world_len, coord: False,
+        reproduction_fn=mutate_reproduce,
+    )
+    command = MoveToClosestAgentCommand()
+
+    def linear_closest(agent):
+        others = [other for other in w.agents if other is not agent]
+        return min(others, key=lambda other: MoveToClosestAgentCommand.calculate_distance(agent.coord, other.coord))
+
+    for _ in range(5):
+        for agent in w.agents:
+            assert command.find_closest_agent(agent) is linear_closest(agent)
+            agent.move(Direction.random(w.rng))
+
+
+def test_reproduction_shares_world_and_genomes():
+    w = World(
+        len=20,
+        initial_population=10,
+        genome_connections=3,
+        kill_fn=lambda world_len, coord: False,
+        reproduction_fn=mutate_reproduce,
+    )
+    parents = list(w.agents)
+    for parent in parents:
+        parent.age = 1
+
+    children = clone_reproduce(parents)
+    assert children[: len(parents)] == parents
+    for parent, clone in zip(parents, children[len(parents) :]):
+        assert clone is not parent
+        assert clone.world is w and clone.genome is parent.genome and clone.age == 1
+
+    children = mutate_reproduce(parents)
+    assert children[: len(parents)] == parents
+    assert all(child.world is w and child.age == 0 for child in children[len(parents) :])
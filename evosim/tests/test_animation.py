@@ -0,0 +1,46 @@
+import pytest
+from PIL import Image
+
+from evosim.animation import AnimationWriter
+from evosim.kill_fn import outside_circle_kill_fn
+from evosim.types import AgentVisInfo, Coord, Log
+
+
+def test_animation_writer_streams_gif(tmp_path):
+    world_len = 10
+    generations = [
+        [Log(world_len, generation, step, [AgentVisInfo(Coord(step, generation), "#ff0000ff")]) for step in range(4)]
+        for generation in range(2)
+    ]
+
+    path = str(tmp_path / "sim.gif")
+    with AnimationWriter(path, outside_circle_kill_fn, max_queued=2) as writer:
+        for generation in generations:
+            writer.put_generation(generation)
+    assert writer.frames == 10
+
+    with Image.open(path) as animation:
+        assert animation.n_frames == 10
+        animation.seek(3)
+        top, left = (world_len - 1) * 6, 3 * 6
+        assert animation.convert("RGB").getpixel((left + 1, top + 1)) == (255, 0, 0)
+
+
+def test_animation_writer_reports_errors(tmp_path):
+    writer = AnimationWriter(str(tmp_path / "sim.gif"), outside_circle_kill_fn)
+    writer.put(Log(10, 0, 0, []))
+    writer.put(Log(20, 0, 1, []))
+    with pytest.raises(ValueError):
+        writer.close()
+
+
+def test_animation_writer_opens_gif_up_front(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        AnimationWriter(str(tmp_path / "missing" / "sim.gif"), outside_circle_kill_fn)
+
+    # Without frames no file is left behind
+    path = tmp_path / "sim.gif"
+    writer = AnimationWriter(str(path), outside_circle_kill_fn)
+    assert path.exists()
+    assert writer.close() == 0
+    assert not path.exists()
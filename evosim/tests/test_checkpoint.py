@@ -0,0 +1,49 @@
+from evosim.checkpoint import CheckpointWriter, load_checkpoint, read_checkpoints
+from evosim.constants import NUM_GENERATIONS
+from evosim.world import World
+
+
+def state(world: World) -> list:
+    return [(agent.coord, agent.age, agent.genome.to_array()) for agent in world.agents]
+
+
+def test_resume_is_deterministic(tmp_path, make_world):
+    for engine in ("object", "numpy"):
+        path = str(tmp_path / f"{engine}.ckpt")
+
+        with CheckpointWriter(path, fsync_every=2) as checkpoints:
+            world = make_world(engine=engine, checkpoints=checkpoints, seed=11)
+            log = world.simulate()
+        assert [checkpoint.generation for checkpoint in read_checkpoints(path)] == list(range(1, NUM_GENERATIONS + 1))
+
+        resumed = make_world(engine=engine, seed=99)  # the checkpoint brings back the state of the RNG
+        load_checkpoint(path, generation=2).restore(resumed)
+        resumed_log = resumed.simulate()
+
+        assert resumed_log == [log_state for log_state in log if log_state.generation >= 2]
+        assert state(resumed) == state(world)
+
+
+def test_torn_checkpoint_is_dropped(tmp_path, make_world):
+    path = str(tmp_path / "run.ckpt")
+    world = make_world(seed=1)
+    with CheckpointWriter(path) as checkpoints:
+        checkpoints.write(world)
+        world.generation = 1
+        checkpoints.write(world)
+
+    with open(path, "r+b") as f:
+        f.truncate(f.seek(0, 2) - 3)
+    assert load_checkpoint(path).generation == 0
+
+    # Appending carries on after the last complete checkpoint
+    with CheckpointWriter(path, append=True) as checkpoints:
+        world.generation = 2
+        checkpoints.write(world)
+    assert [checkpoint.generation for checkpoint in read_checkpoints(path)] == [0, 2]
+
+    # A new run doesn't mix its checkpoints into the old ones
+    with CheckpointWriter(path) as checkpoints:
+        world.generation = 5
+        checkpoints.write(world)
+    assert [checkpoint.generation for checkpoint in read_checkpoints(path)] == [5]
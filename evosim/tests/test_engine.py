@@ -0,0 +1,175 @@
+import numpy as np
+
+from evosim.agent import Agent
+from evosim.constants import MAX_WEIGHT
+from evosim.engine import EAST, NORTH
+from evosim.genome import Gene, Genome, GenomeGraph
+from evosim.neuron.actions import (
+    MoveEastWestCommand,
+    MoveNorthSouthCommand,
+    MoveRandomCommand,
+    MoveToCenterCommand,
+    MoveToClosestAgentCommand,
+)
+from evosim.neuron.internal import internal_commands
+from evosim.neuron.senses import (
+    CrowdSensoryCommand,
+    PredictorSensoryCommand,
+    RandomSensoryCommand,
+    XWallSensoryCommand,
+    YWallSensoryCommand,
+)
+from evosim.rng import RNG
+from evosim.reproduce_fn import mutate_reproduce
+from evosim.types import Coord
+from evosim.world import World
+
+
+def deterministic_world(engine: str) -> World:
+    world = World(
+        len=32,
+        initial_population=0,
+        genome_connections=0,
+        kill_fn=lambda world_len, coord: False,
+        reproduction_fn=mutate_reproduce,
+        engine=engine,
+    )
+    genomes = [
+        Genome([Gene(XWallSensoryCommand(), MoveEastWestCommand(), MAX_WEIGHT)]),
+        Genome([Gene(YWallSensoryCommand(), MoveNorthSouthCommand(), -MAX_WEIGHT)]),
+        Genome(
+            [
+                Gene(XWallSensoryCommand(), internal_commands[0], MAX_WEIGHT),
+                Gene(internal_commands[0], internal_commands[1], MAX_WEIGHT),
+                Gene(internal_commands[1], MoveToCenterCommand(), MAX_WEIGHT),
+            ]
+        ),
+    ]
+    agents = []
+    for genome, coord in zip(genomes, [Coord(20, 3), Coord(3, 20), Coord(28, 28)]):
+        agent = Agent(world=world, genome_connections=0, coord=coord)
+        agent.set_genome(genome)
+        agents.append(agent)
+    world.agents = agents
+    world.index_agents()
+    return world
+
+
+def test_vectorized_engine_matches_object_model():
+    reference = deterministic_world("object")
+    vectorized = deterministic_world("numpy")
+    vectorized.engine.load()
+
+    for _ in range(10):
+        for agent in reference.agents:
+            agent.act()
+        vectorized.engine.step()
+
+    vectorized.engine.store()
+    assert [agent.coord for agent in vectorized.agents] == [agent.coord for agent in reference.agents]
+    assert vectorized.occupancy == reference.occupancy
+
+
+def test_vectorized_moves_are_resolved_together():
+    world = deterministic_world("numpy")
+    world.agents[0].coord, world.agents[1].coord, world.agents[2].coord = Coord(6, 2), Coord(5, 2), Coord(7, 3)
+    world.engine.load()
+
+    # 0 leaves the cell 1 wants, and 0 and 2 want the same cell
+    moved = world.engine.move(np.arange(3), np.array([EAST, EAST, NORTH]))
+    world.engine.store()
+
+    # One after another, 1 would have followed 0 into (6, 2)
+    assert moved.tolist() == [True, False, False]
+    assert [agent.coord for agent in world.agents] == [Coord(7, 2), Coord(5, 2), Coord(7, 3)]
+
+
+# The engines draw random numbers differently, genomes compared between them go without these
+RANDOM_NEURONS = (RandomSensoryCommand, PredictorSensoryCommand, MoveRandomCommand)
+
+
+def deterministic_genome(rng: RNG, connections: int, genes: tuple[Gene, ...] = ()) -> Genome:
+    graph = GenomeGraph(genes)
+    while len(graph.genes) < connections:
+        gene = Gene.random(rng)
+        if not isinstance(gene.source, RANDOM_NEURONS) and not isinstance(gene.target, RANDOM_NEURONS):
+            if graph.can_add(gene):
+                graph.add(gene)
+    return Genome(graph.genes)
+
+
+def run_engines(make_world, genomes: list[Genome], coords: list[Coord], steps: int = 10) -> list[list[Coord]]:
+    """Positions of agents with the given genomes after both engines stepped them from the same coords"""
+
+    positions = []
+    for engine in ("object", "numpy"):
+        world = make_world(len=32, initial_population=0, engine=engine)
+        world.agents = [Agent(world, 0, coord=coord, genome=genome) for genome, coord in zip(genomes, coords)]
+        world.index_agents()
+
+        if engine == "numpy":
+            world.engine.load()
+        for world.step in range(steps):
+            if engine == "numpy":
+                world.engine.step()
+            else:
+                for agent in world.agents:
+                    agent.act()
+        if engine == "numpy":
+            world.engine.store()
+        positions.append([agent.coord for agent in world.agents])
+    return positions
+
+
+def random_coords(rng: RNG, count: int, world_len: int = 32) -> list[Coord]:
+    return [Coord(cell % world_len, cell // world_len) for cell in rng.distinct(world_len * world_len, count)]
+
+
+def test_actions_run_in_plan_order(make_world):
+    # Both actions fire every step, CENTER picks its direction from where X has or hasn't moved the agent yet
+    genome = Genome(
+        [
+            Gene(XWallSensoryCommand(), MoveToCenterCommand(), MAX_WEIGHT),
+            Gene(XWallSensoryCommand(), MoveEastWestCommand(), -MAX_WEIGHT),
+        ]
+    )
+    object_positions, vectorized_positions = run_engines(make_world, [genome], [Coord(7, 22)])
+    assert object_positions == [Coord(25, 24)]
+    assert vectorized_positions == object_positions
+
+
+def test_single_agents_move_alike(make_world):
+    rng = RNG(0)
+    for _ in range(50):
+        genome = deterministic_genome(rng, 12)
+        object_positions, vectorized_positions = run_engines(make_world, [genome], random_coords(rng, 1))
+        assert vectorized_positions == object_positions
+
+
+def test_close_and_crowd_match_around_still_agents(make_world):
+    # Agents without genes don't move, so the one agent that does senses the same world on both engines
+    rng = RNG(1)
+    for _ in range(40):
+        required = (
+            Gene(CrowdSensoryCommand(), MoveToClosestAgentCommand(), rng.randint(-MAX_WEIGHT, MAX_WEIGHT)),
+            Gene(XWallSensoryCommand(), MoveToClosestAgentCommand(), rng.randint(-MAX_WEIGHT, MAX_WEIGHT)),
+            Gene(CrowdSensoryCommand(), internal_commands[0], rng.randint(-MAX_WEIGHT, MAX_WEIGHT)),
+        )
+        genomes = [deterministic_genome(rng, 8, required)] + [Genome([]) for _ in range(15)]
+        object_positions, vectorized_positions = run_engines(make_world, genomes, random_coords(rng, len(genomes)))
+        assert vectorized_positions == object_positions
+
+
+def test_closest_agents_match_linear_scan(make_world):
+    # Crowded enough for a ring search, and so few agents that they are compared with all others right away
+    for world_len, population in [(48, 600), (64, 5), (64, 2), (64, 1)]:
+        world = make_world(len=world_len, initial_population=population, engine="numpy")
+        world.engine.load()
+        xs, ys = world.engine.xs.tolist(), world.engine.ys.tolist()
+
+        def linear_closest(i):
+            others = [j for j in range(population) if j != i]
+            return min(others, key=lambda j: (xs[j] - xs[i]) ** 2 + (ys[j] - ys[i]) ** 2, default=-1)
+
+        closest = world.engine.closest_agents(np.arange(population))
+        assert closest.tolist() == [linear_closest(i) for i in range(population)]
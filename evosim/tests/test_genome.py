@@ -1,14 +1,232 @@
-from evosim.genome import Gene, Genome
-from evosim.neuron.senses import AgeSensoryCommand, RandomSensoryCommand
-from evosim.neuron.actions import MoveEastWestCommand, MoveRandomCommand
+from array import array
+from collections import defaultdict
+
+import numpy as np
+
+from evosim.agent import Agent
+from evosim.compiler import topological_sort
+from evosim.constants import INTERNAL_TYPE, NEURON_ID_BIT_LENGTH
+from evosim.genome import (
+    MAX_CONNECTIONS,
+    TARGET_ID_SHIFT,
+    Gene,
+    Genome,
+    GenomeGraph,
+    pack_genomes,
+    unpack_genomes,
+)
+from evosim.neuron.internal import InternalCommand, internal_commands
+from evosim.neuron.senses import AgeSensoryCommand, RandomSensoryCommand, SensoryCommand, XWallSensoryCommand
+from evosim.neuron.actions import ActionCommand, MoveEastWestCommand, MoveNorthSouthCommand, MoveRandomCommand
+from evosim.rng import RNG
 
 
 def test_genome_str():
     ag_mr = Gene(AgeSensoryCommand(), MoveRandomCommand(), 1)
-    assert str(ag_mr) == "AG->MR 1"
+    assert str(ag_mr) == "AGE->RAND 1"
 
     rn_mx = Gene(RandomSensoryCommand(), MoveEastWestCommand(), 21)
-    assert str(rn_mx) == "RN->MX 21"
+    assert str(rn_mx) == "RAND->X 21"
 
     g = Genome([ag_mr, rn_mx])
-    assert str(g) == "[AG->MR 1, RN->MX 21]"
+    assert str(g) == "[AGE->RAND 1, RAND->X 21]"
+
+
+def reference_act(agent: Agent):
+    """Agent.act before genomes were compiled, evaluating the topological order directly"""
+
+    pending_inputs = defaultdict(list)
+    for neuron, genes in topological_sort(agent.genome):
+        value = neuron.execute(agent, pending_inputs[neuron], agent.activation_threshold)
+        for gene in genes:
+            pending_inputs[gene.target].append((value, gene.scale_weight()))
+
+
+def test_plan_acts_like_the_topological_order(make_world):
+    for seed in range(3):
+        # Same seed, same genomes, positions and draws, as long as both evaluate the neurons in the same order
+        compiled = make_world(initial_population=40, genome_connections=8, seed=seed)
+        reference = make_world(initial_population=40, genome_connections=8, seed=seed)
+
+        for step in range(20):
+            compiled.step = reference.step = step
+            for agent in compiled.agents:
+                agent.act()
+            for agent in reference.agents:
+                reference_act(agent)
+            assert [agent.coord for agent in compiled.agents] == [agent.coord for agent in reference.agents]
+
+    genome = compiled.agents[0].genome
+    assert genome.plan is genome.plan
+
+
+def string_bits(gene: Gene) -> str:
+    """The bit string layout genes used before they were packed in an int"""
+
+    two_comp = lambda n: format(n & ((1 << 16) - 1), "016b")
+    source_type = 1 if gene.source.type == INTERNAL_TYPE else 0
+    target_type = 0 if gene.target.type == INTERNAL_TYPE else 1
+    return (
+        f"{source_type:01b}{gene.source.id:0{NEURON_ID_BIT_LENGTH}b}"
+        f"{target_type:01b}{gene.target.id:0{NEURON_ID_BIT_LENGTH}b}{two_comp(gene.weight)}"
+    )
+
+
+def string_hex(gene: Gene) -> str:
+    """Gene colour computed from the bit string, like genes did before they were packed in an int"""
+
+    bits = string_bits(gene)
+    weight_bits = bits[16:]
+    int_val = int(weight_bits, 2) - (2**16 if weight_bits[0] == "1" else 0)
+    abs_bits = bin(abs(int_val))[2:].zfill(16)
+    if abs_bits[0] == "1":
+        abs_bits = "0" + "1" * 15
+    weight_sign = 255 // 2 if weight_bits[0] == "1" else 0
+    return f"#{int(bits[:8], 2):02x}{int(bits[8:16], 2):02x}{weight_sign:02x}{int(abs_bits[1:8], 2):02x}"
+
+
+def test_gene_bits_match_string_layout():
+    rng = RNG(0)
+    for bits in [0, 2**32 - 1, 0x80008000, 0x00FF7FFF, *(rng.getrandbits32() for _ in range(2000))]:
+        gene = Gene.from_int(bits)
+        assert gene.bits_str() == string_bits(gene)
+        assert gene.bits == int(string_bits(gene), 2)
+        assert Gene.str_to_gene(gene.bits_str()).bits == gene.bits
+        assert gene.to_hex() == string_hex(gene)
+        assert (gene.source_id, gene.target_id) == (gene.source.id, gene.target.id)
+
+        # Mutation flips the same bit the string version flipped
+        state = rng.getstate()
+        index = rng.randint(0, 31)
+        rng.setstate(state)
+        bit_list = list(string_bits(gene))
+        bit_list[index] = "1" if bit_list[index] == "0" else "0"
+        assert gene.to_mutated(rng).bits == Gene.str_to_gene("".join(bit_list)).bits
+
+
+def test_genome_buffer_round_trip():
+    genome = Genome.random(8, RNG(0))
+    buffer = genome.to_array()
+
+    assert isinstance(buffer, array) and buffer.itemsize == 4
+    assert [Gene.from_int(bits).bits for bits in buffer] == [gene.bits for gene in genome]
+    assert [gene.bits for gene in Genome.from_array(buffer)] == list(buffer)
+    assert [gene.bits for gene in Genome.from_array(np.frombuffer(buffer, dtype=np.uint32))] == list(buffer)
+
+
+def test_pack_genomes_round_trip():
+    rng = RNG(0)
+    genomes = [Genome.random(3, rng), Genome.random(1, rng), Genome([])]
+    unpacked = unpack_genomes(pack_genomes(genomes))
+    assert [genome.to_array() for genome in unpacked] == [genome.to_array() for genome in genomes]
+
+
+def reaches(genes: list[Gene], start, target) -> bool:
+    """Depth first search over the neurons, told apart by type and id"""
+
+    node = lambda neuron: (neuron.type, neuron.id)
+    stack, seen = [node(start)], set()
+    while stack:
+        current = stack.pop()
+        if current == node(target):
+            return True
+        seen.add(current)
+        stack.extend(node(gene.target) for gene in genes if node(gene.source) == current)
+        stack = [neuron for neuron in stack if neuron not in seen]
+    return False
+
+
+def test_genome_graph_matches_search():
+    rng = RNG(3)
+    for _ in range(20):
+        genes = []
+        graph = GenomeGraph()
+        for _ in range(60):
+            gene = Gene.random(rng)
+            duplicate = any(gene.bits >> TARGET_ID_SHIFT == other.bits >> TARGET_ID_SHIFT for other in genes)
+            cycle = reaches(genes, gene.target, gene.source)
+            assert graph.has_connection(gene) == duplicate
+            assert graph.closes_cycle(gene) == cycle
+            if not duplicate and not cycle:
+                graph.add(gene)
+                genes.append(gene)
+
+
+def test_genome_graph_tells_neuron_types_apart():
+    graph = GenomeGraph([Gene(AgeSensoryCommand(), MoveRandomCommand(), 1)])
+    # Sense 2 and action 2 share an id but connecting them is no cycle
+    assert graph.can_add(Gene(XWallSensoryCommand(), MoveNorthSouthCommand(), 1))
+    assert not graph.can_add(Gene(AgeSensoryCommand(), MoveRandomCommand(), -5))
+
+    first, second, third = internal_commands[:3]
+    graph.add(Gene(first, second, 1))
+    graph.add(Gene(second, third, 1))
+    assert not graph.can_add(Gene(third, first, 1))
+    assert not graph.can_add(Gene(second, second, 1))
+    assert graph.can_add(Gene(first, third, 1))
+
+
+def test_random_genomes_are_distinct_and_acyclic():
+    rng = RNG(1)
+    genome = Genome.random(MAX_CONNECTIONS, rng)
+    assert len({gene.bits >> TARGET_ID_SHIFT for gene in genome}) == MAX_CONNECTIONS
+    # Every neuron is placed after its inputs
+    assert sum(len(genes) for _, genes in topological_sort(genome)) == MAX_CONNECTIONS
+
+    for _ in range(200):
+        genome = genome.to_mutated(rng, mutation_rate=0)
+        assert len({gene.bits >> TARGET_ID_SHIFT for gene in genome}) == len(genome.genes)
+        assert sum(len(genes) for _, genes in topological_sort(genome)) == len(genome.genes)
+
+
+def test_can_replace_matches_a_new_graph():
+    rng = RNG(4)
+    for _ in range(50):
+        genome = Genome.random(20, rng)
+        for old in genome.genes:
+            new = old.to_mutated(rng)
+            others = GenomeGraph(gene for gene in genome.genes if gene is not old)
+            assert genome.graph.can_replace(old, new) == others.can_add(new)
+
+
+def test_neurons_are_shared_and_looked_up_by_id():
+    assert SensoryCommand.get(XWallSensoryCommand.id) is SensoryCommand.get(XWallSensoryCommand.id)
+    assert SensoryCommand.get_class(XWallSensoryCommand.id) is XWallSensoryCommand
+    assert ActionCommand.get(MoveRandomCommand.id + 5) is ActionCommand.get(MoveRandomCommand.id)
+    assert InternalCommand.get(1) is internal_commands[1]
+    for command in (SensoryCommand, InternalCommand, ActionCommand):
+        assert command.random(RNG(2)) is command.random(RNG(2))
+
+    # Neurons built apart are equal to the shared ones, and a sense is never equal to the action with its id
+    assert XWallSensoryCommand() == SensoryCommand.get(XWallSensoryCommand.id)
+    assert len({AgeSensoryCommand(), AgeSensoryCommand(), MoveRandomCommand(), internal_commands[0]}) == 3
+
+    rng = RNG(5)
+    for _ in range(100):
+        gene = Gene.random(rng)
+        decoded = Gene.from_int(gene.bits)
+        assert decoded.source is gene.source and decoded.target is gene.target
+
+
+def test_genes_hash_by_value():
+    gene = Gene(AgeSensoryCommand(), MoveRandomCommand(), 7)
+    assert gene == Gene.from_int(gene.bits)
+    assert len({gene, Gene.from_int(gene.bits), Gene(AgeSensoryCommand(), MoveRandomCommand(), 8)}) == 2
+    assert gene.same_gene(Gene(AgeSensoryCommand(), MoveRandomCommand(), -3))
+    assert not gene.same_gene(Gene(AgeSensoryCommand(), MoveEastWestCommand(), 7))
+
+
+def test_shared_sense_is_evaluated_once():
+    genome = Genome(
+        [
+            Gene(AgeSensoryCommand(), MoveRandomCommand(), 1),
+            Gene(AgeSensoryCommand(), MoveEastWestCommand(), 2),
+            Gene(AgeSensoryCommand(), internal_commands[0], 3),
+            Gene(internal_commands[0], MoveEastWestCommand(), 4),
+        ]
+    )
+    plan = genome.plan
+    assert len(plan) == 4
+    assert plan.neurons.count(SensoryCommand.get(AgeSensoryCommand.id)) == 1
+    # The action fed by two genes reads both of them
+    assert len(plan.inputs[plan.neurons.index(ActionCommand.get(MoveEastWestCommand.id))]) == 2
@@ -0,0 +1,44 @@
+from evosim.constants import MAX_STEPS
+from evosim.world import LOG_END, LOG_NONE
+
+
+def test_log_granularity(make_world):
+    steps = {}
+    for log_every in (1, 10, LOG_END, LOG_NONE):
+        world = make_world(log_every=log_every, headless=True)
+        world.simulate_generation(0)
+        steps[log_every] = [log.step for log in world.log]
+
+    assert steps[1] == list(range(MAX_STEPS))
+    assert steps[10] == list(range(9, MAX_STEPS, 10))
+    assert steps[LOG_END] == [MAX_STEPS - 1]
+    assert steps[LOG_NONE] == []
+
+
+def test_logging_does_not_change_the_run(make_world):
+    default, fast = make_world(), make_world(log_every=LOG_NONE, headless=True, engine="object")
+    for gen in range(2):
+        default.simulate_generation(gen)
+        fast.simulate_generation(gen)
+
+    assert [(agent.coord, agent.genome.to_array()) for agent in default.agents] == [
+        (agent.coord, agent.genome.to_array()) for agent in fast.agents
+    ]
+
+
+def test_headless_progress(capsys, make_world):
+    calls = []
+    world = make_world(headless=True, log_every=LOG_NONE, progress=lambda *args: calls.append(args))
+    world.simulate_generation(0)
+    assert capsys.readouterr().out == ""
+    # Throttled to the first step and the last one within the second
+    assert calls[0] == (0, 0) and calls[-1] == (0, MAX_STEPS - 1) and len(calls) < MAX_STEPS
+
+    calls.clear()
+    world = make_world(headless=True, progress=lambda *args: calls.append(args), progress_interval=0)
+    world.simulate_generation(0)
+    assert len(calls) == MAX_STEPS
+
+    world.print_genomes("Genomes:")
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[1].startswith(f"{len(world.agents)} genomes") and len(lines) <= 5
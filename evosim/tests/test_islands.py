@@ -0,0 +1,36 @@
+from dataclasses import replace
+
+from evosim.genome import Genome
+from evosim.islands import run_islands, settle
+from evosim.rng import RNG
+from evosim.sweep import RunConfig
+
+
+def test_islands_migrate():
+    config = RunConfig(seed=5, kill_fn="middle", world_len=16, initial_population=20, generations=3)
+    rows, reports = run_islands(config, islands=2, interval=1, migration=0.5)
+
+    assert [(row.run, row.generation) for row in rows] == [(island, gen) for island in range(2) for gen in range(3)]
+    assert [report.generations for report in reports] == [3, 3]
+    # The islands trade in a ring, what one sends the other settles
+    assert reports[0].emigrants == reports[1].immigrants > 0
+    assert reports[1].emigrants == reports[0].immigrants > 0
+
+    again, _ = run_islands(config, islands=2, interval=1, migration=0.5)
+    strip = lambda rows: [replace(row, seconds=0) for row in rows]
+    assert strip(again) == strip(rows)
+
+
+def test_settling_keeps_the_population(make_world):
+    rng = RNG(0)
+    genomes = [Genome.random(3, rng) for _ in range(30)]
+
+    world = make_world(initial_population=5)
+    settle(world, genomes)
+    assert len(world.agents) == 5
+    assert all(agent.genome in genomes for agent in world.agents)
+
+    # Immigrants resettle an island that died out, as many as fit
+    world = make_world(len=4, initial_population=0)
+    settle(world, genomes)
+    assert len(world.agents) == 16
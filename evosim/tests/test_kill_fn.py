@@ -0,0 +1,48 @@
+import subprocess
+import sys
+
+import numpy as np
+
+from evosim.kill_fn import KillZone, compile_kill_fn, middle_kill_fn, outside_circle_kill_fn
+from evosim.types import Coord
+
+
+def test_kill_zone_matches_kill_fn():
+    world_len = 20
+    kill_zone = compile_kill_fn(outside_circle_kill_fn, world_len)
+
+    assert isinstance(kill_zone, KillZone)
+    assert compile_kill_fn(outside_circle_kill_fn, world_len) is kill_zone
+    assert compile_kill_fn(kill_zone, world_len) is kill_zone
+
+    xs, ys = np.meshgrid(np.arange(world_len), np.arange(world_len))
+    selected = kill_zone.select(xs.ravel(), ys.ravel())
+    for x, y, killed in zip(xs.ravel(), ys.ravel(), selected):
+        coord = Coord(int(x), int(y))
+        assert kill_zone(world_len, coord) == killed == outside_circle_kill_fn(world_len, coord)
+
+    # Other world sizes fall back to the function
+    assert compile_kill_fn(kill_zone, 30)(30, Coord(0, 0)) == outside_circle_kill_fn(30, Coord(0, 0))
+    assert kill_zone(30, Coord(25, 25)) == outside_circle_kill_fn(30, Coord(25, 25))
+    assert compile_kill_fn(middle_kill_fn, world_len).mask.sum() == sum(
+        middle_kill_fn(world_len, Coord(x, y)) for x in range(world_len) for y in range(world_len)
+    )
+
+
+def test_kill_zone_layer():
+    world_len = 20
+    kill_zone = compile_kill_fn(outside_circle_kill_fn, world_len)
+    layer = kill_zone.layer(0.05, 0.1)
+
+    assert layer.shape == (world_len, world_len, 4)
+    assert kill_zone.layer(0.05, 0.1) is layer
+    assert np.array_equal(layer[..., 3] == 0.05, kill_zone.mask)
+    assert np.allclose(layer[kill_zone.mask][:, :3], (1, 0, 0))
+    assert np.allclose(layer[~kill_zone.mask][:, :3], (0, 0.5, 0), atol=0.01)
+
+
+def test_worlds_do_not_load_matplotlib():
+    # A fresh interpreter, this one has matplotlib loaded by the other tests
+    code = "import sys, evosim.world; print(any(name.startswith('matplotlib') for name in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
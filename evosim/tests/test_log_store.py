@@ -0,0 +1,35 @@
+from evosim.log_store import ColumnarLogReader, ColumnarLogWriter
+from evosim.palette import Palette
+
+
+def test_columnar_log_matches_log(tmp_path, make_world):
+    def run(engine: str, log_writer=None):
+        world = make_world(engine=engine, log_writer=log_writer, seed=7)
+        for gen in range(2):
+            world.simulate_generation(gen)
+        return world
+
+    for engine in ("object", "numpy"):
+        expected = run(engine).log
+
+        path = tmp_path / engine
+        with ColumnarLogWriter(str(path)) as writer:
+            assert run(engine, writer).log == []
+
+        reader = ColumnarLogReader(str(path))
+        assert len(reader) == len(expected)
+        assert reader.generations == [0, 1]
+
+        frames = [frame for generation in reader.iter_generations() for frame in generation]
+        for frame, log in zip(frames, expected):
+            assert (frame.world_len, frame.generation, frame.step) == (log.world_len, log.generation, log.step)
+            assert frame.agents == log.agents
+
+
+def test_palette_ids():
+    palette = Palette()
+    assert palette.id_of("#ff000080") == 0
+    assert palette.id_of("#00ff00ff") == 1
+    assert palette.id_of("#ff000080") == 0
+    assert palette[1] == "#00ff00ff" and len(palette) == 2
+    assert palette.rgba()[[1, 0]].tolist() == [[0, 1, 0, 1], [1, 0, 0, 128 / 255]]
@@ -0,0 +1,59 @@
+import io
+import json
+import tracemalloc
+
+from evosim.constants import NUM_GENERATIONS
+from evosim.memory import MemoryProfiler, measure_memory
+from evosim.sweep import RunConfig, run_config
+
+
+def test_memory_per_generation(make_world):
+    out = io.StringIO()
+    memory = MemoryProfiler(out, top=5)
+    world = make_world(memory=memory, seed=2)
+    try:
+        for gen in range(2):
+            world.simulate_generation(gen)
+    finally:
+        memory.stop()
+
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [record["generation"] for record in records] == [0, 1]
+
+    first = records[0]
+    assert first["peak"] >= first["retained"] > 0
+    # The generation's steps are kept in world.log
+    assert first["growth"] > 0
+    assert 0 < len(first["sites"]) <= 5
+    assert records[-1]["counts"]["Agent"] >= len(world.agents)
+    assert first["counts"]["Log"] >= 100 and first["sizes"]["Log"] > 0
+
+
+def test_measure_memory():
+    kept = []
+    peak, retained = measure_memory(lambda: kept.append(bytearray(1_000_000)))
+    assert peak >= retained >= 1_000_000
+
+
+def test_tracing_stops_with_the_run(make_world):
+    world = make_world(memory=MemoryProfiler())
+    for _ in world.iter_generations():
+        ...
+    assert not tracemalloc.is_tracing()
+    assert len(world.memory.profiles) == NUM_GENERATIONS
+
+    rows = run_config(0, RunConfig(seed=0, world_len=16, initial_population=20, generations=2, memory=True))
+    assert not tracemalloc.is_tracing()
+    assert all(row.peak_memory > 0 for row in rows)
+
+
+def test_tracing_started_elsewhere_is_left_running(make_world):
+    tracemalloc.start()
+    try:
+        world = make_world(memory=MemoryProfiler())
+        world.simulate_generation(0)
+        world.finish()
+        assert tracemalloc.is_tracing()
+        assert world.memory.profiles[0].peak > 0
+    finally:
+        tracemalloc.stop()
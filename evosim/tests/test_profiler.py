@@ -0,0 +1,66 @@
+import csv
+import io
+import json
+
+from evosim.agent import Agent
+from evosim.constants import MAX_STEPS, MAX_WEIGHT
+from evosim.genome import Gene, Genome
+from evosim.neuron.actions import MoveEastWestCommand
+from evosim.neuron.senses import XWallSensoryCommand
+from evosim.profiler import ACTION_CLASSES, PHASES, Profiler
+from evosim.types import Coord
+
+
+def test_profiles_every_generation(make_world):
+    for engine in ("object", "numpy"):
+        out = io.StringIO()
+        world = make_world(engine=engine, profiler=Profiler(out), seed=1)
+        plans = [len(agent.genome.plan) for agent in world.agents]
+        for gen in range(2):
+            world.simulate_generation(gen)
+
+        profiles = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert [profile["generation"] for profile in profiles] == [0, 1]
+
+        first = profiles[0]
+        assert first["population"] == 20
+        assert set(first["wall"]) == set(PHASES)
+        assert first["wall"]["act"] > 0 and first["cpu"]["act"] > 0
+        assert first["wall"]["checkpoint"] == 0
+        # Every neuron of every agent's plan is executed once a step
+        assert sum(first["executions"].values()) == sum(plans) * MAX_STEPS
+        assert all(first["fires"][action] <= first["executions"][action] for action in ACTION_CLASSES)
+        assert first["move_retries"] >= 0
+
+
+def test_profile_csv(make_world):
+    out = io.StringIO()
+    world = make_world(profiler=Profiler(out, format="csv"), seed=1)
+    world.simulate_generation(0)
+
+    rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert len(rows) == 1
+    assert float(rows[0]["wall_act"]) > 0
+    assert "executions_InternalCommand" in rows[0] and "fires_MoveRandomCommand" in rows[0]
+    assert "move_retries" in rows[0]
+
+
+def test_fires_are_counted_where_actions_trigger(make_world):
+    for engine in ("object", "numpy"):
+        world = make_world(initial_population=0, engine=engine, profiler=Profiler())
+        # Far from the west wall the first agent's output is past the threshold every step,
+        # the weight of the second keeps its output next to the sigmoid's middle
+        genomes = [
+            Genome([Gene(XWallSensoryCommand(), MoveEastWestCommand(), MAX_WEIGHT)]),
+            Genome([Gene(XWallSensoryCommand(), MoveEastWestCommand(), 1)]),
+        ]
+        for genome, coord in zip(genomes, [Coord(14, 2), Coord(14, 8)]):
+            agent = Agent(world=world, genome_connections=0, coord=coord, genome=genome)
+            world.agents.append(agent)
+        world.index_agents()
+        world.simulate_generation(0)
+
+        profile = world.profiler.profiles[0]
+        assert profile.executions["MoveEastWestCommand"] == 2 * MAX_STEPS
+        assert profile.fires["MoveEastWestCommand"] == MAX_STEPS
+        assert sum(profile.fires.values()) == MAX_STEPS
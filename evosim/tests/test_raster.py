@@ -0,0 +1,44 @@
+import numpy as np
+
+from evosim.kill_fn import compile_kill_fn, outside_circle_kill_fn
+from evosim.log_store import StepFrame
+from evosim.palette import Palette
+from evosim.raster import RasterRenderer
+from evosim.types import AgentVisInfo, Coord, Log
+
+
+def test_raster_frame():
+    world_len, cell_size = 10, 4
+    renderer = RasterRenderer(world_len, outside_circle_kill_fn, cell_size=cell_size)
+    palette = Palette(["#ff0000ff", "#0000ff80"])
+    frame = StepFrame(
+        world_len=world_len,
+        generation=0,
+        step=1,
+        xs=np.array([0, 3]),
+        ys=np.array([0, 7]),
+        color_ids=np.array([0, 1]),
+        palette=palette,
+    )
+    log = Log(world_len, 0, 1, [AgentVisInfo(Coord(0, 0), "#ff0000ff"), AgentVisInfo(Coord(3, 7), "#0000ff80")])
+
+    image = np.asarray(renderer.draw(frame))
+    assert image.shape == (world_len * cell_size, world_len * cell_size + renderer.panel_width, 3)
+    assert np.array_equal(image, np.asarray(renderer.draw(log)))
+
+    def cell(image, x, y):
+        # y grows upwards, like the figures
+        top, left = (world_len - 1 - y) * cell_size, x * cell_size
+        block = image[top : top + cell_size, left : left + cell_size]
+        assert (block == block[0, 0]).all()
+        return tuple(block[0, 0])
+
+    assert cell(image, 0, 0) == (255, 0, 0)
+    assert cell(image, 3, 7) == (127, 127, 255)
+    assert cell(image, 5, 5) == (255, 255, 255)
+
+    end = np.asarray(renderer.draw(frame, end_of_gen=True))
+    kill_zone = compile_kill_fn(outside_circle_kill_fn, world_len)
+    assert kill_zone(world_len, Coord(9, 9)) and not kill_zone(world_len, Coord(5, 5))
+    assert cell(end, 9, 9) != cell(end, 5, 5)
+    assert cell(end, 9, 9) == cell(end, 0, 9) == cell(end, 9, 0)
@@ -0,0 +1,59 @@
+import threading
+import time
+
+import pytest
+
+from evosim.constants import MAX_STEPS
+from evosim.streaming import BackgroundConsumer
+
+
+def test_iter_generation_matches_simulate_generation(make_world):
+    for engine in ("object", "numpy"):
+        world = make_world(engine=engine, seed=3)
+        for gen in range(2):
+            world.simulate_generation(gen)
+
+        streamed = make_world(engine=engine, seed=3)
+        frames = [frame for gen in range(2) for frame in streamed.iter_generation(gen)]
+        assert len(frames) == len(world.log) == 2 * MAX_STEPS
+        for frame, log in zip(frames, world.log):
+            assert (frame.generation, frame.step) == (log.generation, log.step)
+            assert frame.agents == log.agents
+
+
+def test_iter_generations_groups_steps(make_world):
+    generations = list(make_world(seed=3).iter_generations())
+    assert all(len(generation) == MAX_STEPS for generation in generations)
+    assert [generation[0].generation for generation in generations] == list(range(len(generations)))
+
+
+def test_background_consumer_is_bounded():
+    release = threading.Event()
+    handled = []
+
+    def handle(item):
+        release.wait()
+        handled.append(item)
+
+    consumer = BackgroundConsumer(handle, max_queued=2)
+    consumer.put(0)
+    while not consumer.queue.empty():
+        time.sleep(0.01)  # wait for the consumer to pick it up
+    consumer.put(1)
+    consumer.put(2)
+    assert consumer.queue.full()
+
+    release.set()
+    consumer.put(3)
+    consumer.close()
+    assert handled == [0, 1, 2, 3]
+
+
+def test_background_consumer_raises_errors():
+    def handle(item):
+        raise ValueError(item)
+
+    consumer = BackgroundConsumer(handle)
+    consumer.put(1)
+    with pytest.raises(ValueError):
+        consumer.close()
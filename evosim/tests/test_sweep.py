@@ -0,0 +1,26 @@
+from dataclasses import replace
+
+from evosim.sweep import grid, run_config, sweep
+
+
+def test_grid_and_sweep():
+    configs = grid([0, 1], kill_fns=["middle", "outside_circle"], world_len=16, initial_population=10, generations=2)
+    assert len(configs) == 4
+    assert {(config.kill_fn, config.seed) for config in configs} == {
+        ("middle", 0),
+        ("middle", 1),
+        ("outside_circle", 0),
+        ("outside_circle", 1),
+    }
+
+    rows = sweep(configs, workers=2)
+    assert [(row.run, row.generation) for row in rows] == [(run, gen) for run in range(4) for gen in range(2)]
+    for row in rows:
+        assert row.survivors <= row.population
+        assert 0 <= row.top_gene_frequency <= 1
+
+    # Runs are seeded, the same configuration gives the same summaries in any process
+    again = run_config(3, configs[3])
+    strip = lambda rows: [replace(row, seconds=0) for row in rows]
+    assert strip(again) == strip(rows[6:])
+    assert strip(run_config(3, replace(configs[3], seed=2))) != strip(again)
@@ -1,10 +1,10 @@
-import random
 from dataclasses import dataclass
 from enum import Enum
 from typing import TYPE_CHECKING, Callable
 
 if TYPE_CHECKING:
     from evosim.agent import Agent
+    from evosim.rng import RNG
 
 
 @dataclass
@@ -20,11 +20,14 @@ class Direction(Enum):
     W = 4
 
     @classmethod
-    def random(cls):
-        return random.choice(list(Direction))
+    def random(cls, rng: "RNG") -> "Direction":
+        return rng.choice(DIRECTIONS)
 
 
-def opposite_direction( direction: "Direction") -> "Direction":
+DIRECTIONS = tuple(Direction)
+
+
+def opposite_direction(direction: "Direction") -> "Direction":
     if direction == Direction.N:
         return Direction.S
     if direction == Direction.E:
@@ -1,21 +1,24 @@
 import os
-import random
+from typing import TYPE_CHECKING
 
 from evosim.types import Coord, Direction
 
+if TYPE_CHECKING:
+    from evosim.rng import RNG
 
-def random_position(size) -> Coord:
+
+def random_position(size, rng: "RNG") -> Coord:
     """Generate a random position in the world"""
 
-    x = random.randint(0, size - 1)
-    y = random.randint(0, size - 1)
+    x = rng.randint(0, size - 1)
+    y = rng.randint(0, size - 1)
     return Coord(x, y)
 
 
-def random_index(list: list) -> int:
+def random_index(list: list, rng: "RNG") -> int:
     """Get a random index in the list"""
 
-    return random.randint(0, len(list) - 1)
+    return rng.randint(0, len(list) - 1)
 
 
 def is_index_in_list(items: list, index: int) -> bool:
@@ -77,8 +80,9 @@ def average_hex(hex_colors: list[str]) -> str:
 
 def create_dir(path: str):
     """Create dir if not exists"""
-    
+
     if not os.path.exists(path):
         try:
             os.mkdir(path)
-        except: print(f"{path} exists")
+        except:
+            print(f"{path} exists")
@@ -1,45 +1,171 @@
 import os
 import shutil
-from concurrent.futures import ThreadPoolExecutor
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Iterable, Optional, Union
 
 import matplotlib
-from matplotlib import patches
+import numpy as np
 
 from evosim.constants import MAX_STEPS, NUM_GENERATIONS
 
 matplotlib.use("Agg")
 
 from matplotlib import pyplot as plt
+from matplotlib.figure import Figure
 from matplotlib.gridspec import GridSpec
 
-from evosim.types import Coord, KillFn, Log
+from evosim.kill_fn import KILL_ZONE_ALPHA, LIVE_ZONE_ALPHA, compile_kill_fn, show_zone_layer
+from evosim.log_store import ColumnarLogReader, StepFrame
+from evosim.raster import RasterRenderer
+from evosim.types import KillFn, Log
 from evosim.utils import create_dir
 
+Frame = Union[Log, StepFrame]
+
+
+BACKENDS = ("process", "thread", "raster")
+
+
+def kill_zone_arrays(kill_fn: KillFn, world_len: int) -> tuple[np.ndarray, np.ndarray]:
+    """The kill zone mask and its RGBA layer, both cached with the compiled kill function"""
+
+    kill_zone = compile_kill_fn(kill_fn, world_len)
+    return kill_zone.mask, kill_zone.layer(KILL_ZONE_ALPHA, LIVE_ZONE_ALPHA)
+
+
+def visualize(
+    logs_by_gen: Union[Iterable[list["Frame"]], ColumnarLogReader],
+    kill_fn: KillFn,
+    backend: str = "process",
+    workers: Optional[int] = None,
+) -> float:
+    """
+    Render the logs grouped by generation, or every generation of a columnar log, into ./steps/
+    The process backend renders generations in parallel processes, reusing one figure per generation.
+    The thread backend builds a figure for every frame.
+    The raster backend skips matplotlib and draws the frames with numpy and Pillow, it is the fastest.
+    Returns the frames per second.
+    """
 
-def visualize(logs_by_gen: list[list["Log"]], kill_fn: KillFn):
     try:
         shutil.rmtree("./steps/")
     except:
         ...
 
-    with ThreadPoolExecutor(max_workers=8) as executor:
-        futures = [executor.submit(visualize_generation, generation, kill_fn) for generation in logs_by_gen]
-        for future in futures:
-            future.result()
+    start = time.perf_counter()
+
+    if backend == "process":
+        frames = visualize_processes(logs_by_gen, kill_fn, workers)
+    elif backend == "thread":
+        frames = visualize_threads(logs_by_gen, kill_fn)
+    elif backend == "raster":
+        frames = visualize_raster(logs_by_gen, kill_fn)
+    else:
+        raise ValueError(f"Unknown backend {backend}, must be one of {BACKENDS}")
+
+    elapsed = time.perf_counter() - start
+    fps = frames / elapsed
+    print(f"Rendered {frames} frames in {elapsed:.1f}s ({fps:.1f} frames/s)")
+    return fps
 
 
-def visualize_generation(generation: list["Log"], kill_fn: KillFn):
+def is_visualized(generation: int) -> bool:
     # Only visualize first 3, last 3
-    if not generation[0].generation in [
+    return generation in [
         0,
         1,
         2,
         NUM_GENERATIONS - 3,
         NUM_GENERATIONS - 2,
         NUM_GENERATIONS - 1,
-        NUM_GENERATIONS ,
-    ]:
-        return
+        NUM_GENERATIONS,
+    ]
+
+
+def visualize_threads(logs_by_gen: Union[Iterable[list["Frame"]], ColumnarLogReader], kill_fn: KillFn) -> int:
+    if isinstance(logs_by_gen, ColumnarLogReader):
+        logs_by_gen = logs_by_gen.iter_generations()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(visualize_generation, generation, kill_fn) for generation in logs_by_gen]
+        return sum(future.result() for future in futures)
+
+
+def visualize_raster(logs_by_gen: Union[Iterable[list["Frame"]], ColumnarLogReader], kill_fn: KillFn) -> int:
+    if isinstance(logs_by_gen, ColumnarLogReader):
+        logs_by_gen = (logs_by_gen.generation(g) for g in logs_by_gen.generations if is_visualized(g))
+
+    # One renderer per world size, they hold the kill zone backgrounds
+    renderers: dict[int, RasterRenderer] = {}
+    frames = 0
+    for generation in logs_by_gen:
+        if not generation or not is_visualized(generation[0].generation):
+            continue
+
+        world_len = generation[0].world_len
+        if world_len not in renderers:
+            renderers[world_len] = RasterRenderer(world_len, kill_fn)
+        renderer = renderers[world_len]
+
+        for log_state in generation:
+            renderer.render(log_state)
+        renderer.render(generation[-1], end_of_gen=True)
+        frames += len(generation) + 1
+    return frames
+
+
+def visualize_processes(
+    logs_by_gen: Union[Iterable[list["Frame"]], ColumnarLogReader],
+    kill_fn: KillFn,
+    workers: Optional[int],
+) -> int:
+    # Generations are submitted as they arrive, which overlaps rendering with a streaming simulation.
+    # At most two per worker are in flight so a fast producer doesn't queue up the whole run.
+    max_pending = 2 * (workers or os.cpu_count() or 1)
+    frames = 0
+
+    # Workers get the kill zone mask and layer, kill functions are often lambdas which can't be pickled
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+
+        def submit(fn, *args):
+            nonlocal frames, pending
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                frames += sum(future.result() for future in done)
+            pending.add(executor.submit(fn, *args))
+
+        if isinstance(logs_by_gen, ColumnarLogReader):
+            # Workers map the log themselves instead of receiving copies of the frames
+            for generation in logs_by_gen.generations:
+                if is_visualized(generation):
+                    world_len = logs_by_gen.generation(generation)[0].world_len
+                    kill_zone = kill_zone_arrays(kill_fn, world_len)
+                    submit(render_columnar_generation, logs_by_gen.path, generation, *kill_zone)
+        else:
+            for generation in logs_by_gen:
+                if generation and is_visualized(generation[0].generation):
+                    submit(render_generation, generation, *kill_zone_arrays(kill_fn, generation[0].world_len))
+
+        return frames + sum(future.result() for future in pending)
+
+
+def frame_agents(log: "Frame") -> tuple[list[int], list[int], Union[list[str], np.ndarray]]:
+    """x coordinates, y coordinates and colors of the agents in a frame"""
+
+    if isinstance(log, StepFrame):
+        return log.xs.tolist(), log.ys.tolist(), log.rgba
+
+    agent_xs = [agent.coord.x for agent in log.agents]
+    agent_ys = [agent.coord.y for agent in log.agents]
+    agent_colors = [agent.color for agent in log.agents]
+    return agent_xs, agent_ys, agent_colors
+
+
+def visualize_generation(generation: list["Frame"], kill_fn: KillFn) -> int:
+    if not is_visualized(generation[0].generation):
+        return 0
 
     # for log_state in generation:
     #     visualize_log(log_state, kill_fn)
@@ -50,15 +176,13 @@ def visualize_generation(generation: list["Log"], kill_fn: KillFn):
             future.result()
 
     visualize_log(generation[-1], kill_fn, end_of_gen=True)
+    return len(generation) + 1
 
 
-def visualize_log(log: Log, kill_fn: KillFn, end_of_gen: bool = False):
-    agents = log.agents
+def visualize_log(log: "Frame", kill_fn: KillFn, end_of_gen: bool = False):
+    kill_fn = compile_kill_fn(kill_fn, log.world_len)
 
-    agent_colors = [agent.color for agent in agents]
-    agent_coords = [agent.coord for agent in agents]
-    agent_xs = [coord.x for coord in agent_coords]
-    agent_ys = [coord.y for coord in agent_coords]
+    agent_xs, agent_ys, agent_colors = frame_agents(log)
 
     # fig = plt.figure(figsize=(16, 10))
     fig = plt.figure(figsize=(8, 5))
@@ -74,33 +198,7 @@ def visualize_log(log: Log, kill_fn: KillFn, end_of_gen: bool = False):
 
     # Highlight kill and live zone
     if end_of_gen:
-        all_coords = [Coord(x, y) for x in range(log.world_len) for y in range(log.world_len)]
-        for coord in all_coords:
-            if kill_fn(log.world_len, coord):
-                scatter_chart.add_patch(
-                    patches.Rectangle(
-                        (coord.x, coord.y),
-                        1,
-                        1,
-                        linewidth=0,
-                        edgecolor="r",
-                        facecolor="red",
-                        alpha=0.05,
-                    )
-                )
-
-            else:
-                scatter_chart.add_patch(
-                    patches.Rectangle(
-                        (coord.x, coord.y),
-                        1,
-                        1,
-                        linewidth=0,
-                        edgecolor="r",
-                        facecolor="green",
-                        alpha=0.1,
-                    )
-                )
+        show_zone_layer(scatter_chart, kill_fn.layer(KILL_ZONE_ALPHA, LIVE_ZONE_ALPHA), log.world_len)
 
     # Text
     fontsize = 24
@@ -112,7 +210,7 @@ def visualize_log(log: Log, kill_fn: KillFn, end_of_gen: bool = False):
     step_num = f"Step: {log.step} / {MAX_STEPS}"
     if end_of_gen:
         step_num = f"Step: {MAX_STEPS} / {MAX_STEPS}"
-    agent_num = f"Agent count: {len(agents)}"
+    agent_num = f"Agent count: {len(agent_xs)}"
     top_text = f"{generation_num}\n{step_num}\n{agent_num}"
 
     text_chart.text(
@@ -127,8 +225,8 @@ def visualize_log(log: Log, kill_fn: KillFn, end_of_gen: bool = False):
 
     if end_of_gen:
         # Get agent death count
-        agents_dead_num = len(list(filter(None, [kill_fn(log.world_len, agent.coord) for agent in agents])))
-        agents_reproducing_num = len(agents) - agents_dead_num
+        agents_dead_num = int(kill_fn.select(agent_xs, agent_ys).sum())
+        agents_reproducing_num = len(agent_xs) - agents_dead_num
 
         text_chart_y_pos -= line_height * top_text.count("\n") + 0.1
 
@@ -175,3 +273,93 @@ def visualize_log(log: Log, kill_fn: KillFn, end_of_gen: bool = False):
     else:
         fig.savefig(f"./steps/{log.generation}/{log.generation}-{log.step}.png")
     fig.clf()
+
+
+class GenerationRenderer:
+    """Draws the frames of a generation on a single figure, updating its artists in place"""
+
+    fontsize = 24
+
+    def __init__(self, world_len: int, kill_mask: np.ndarray, kill_layer: np.ndarray):
+        self.world_len = world_len
+        self.kill_mask = kill_mask
+
+        # A bare Figure keeps pyplot's global state out of the workers
+        self.figure = Figure(figsize=(8, 5))
+        gs = GridSpec(2, 3, figure=self.figure)
+
+        self.scatter_chart = self.figure.add_subplot(gs[:, :2])
+        text_chart = self.figure.add_subplot(gs[:, 2])
+
+        self.scatter_chart.set_title(f"World ({world_len}x{world_len})", fontsize=20)
+        self.scatter = self.scatter_chart.scatter([], [], label="Agents")
+        self.scatter_chart.set_ylim(0, world_len)
+        self.scatter_chart.set_xlim(0, world_len)
+
+        text_options = dict(
+            horizontalalignment="left",
+            verticalalignment="top",
+            fontsize=self.fontsize,
+            transform=text_chart.transAxes,
+        )
+        self.top_text = text_chart.text(0, 1, "", **text_options)
+        self.died_text = text_chart.text(0, 0.8, "", color="red", **text_options)
+        self.reproduced_text = text_chart.text(0, 0.7, "", color="blue", **text_options)
+        text_chart.axis("off")  # hide axis
+
+        self.kill_zone = show_zone_layer(self.scatter_chart, kill_layer, world_len)
+        self.kill_zone.set_visible(False)
+
+    def show_kill_zone(self, visible: bool):
+        """Highlight kill and live zone"""
+
+        self.kill_zone.set_visible(visible)
+
+    def render(self, log: "Frame", end_of_gen: bool = False) -> str:
+        agent_xs, agent_ys, agent_colors = frame_agents(log)
+
+        self.scatter.set_offsets(np.column_stack([agent_xs, agent_ys]) if len(agent_xs) else np.empty((0, 2)))
+        self.scatter.set_facecolors(agent_colors)
+
+        step = MAX_STEPS if end_of_gen else log.step
+        generation_num = f"Generation: {log.generation}"
+        step_num = f"Step: {step} / {MAX_STEPS}"
+        agent_num = f"Agent count: {len(agent_xs)}"
+        self.top_text.set_text(f"{generation_num}\n{step_num}\n{agent_num}")
+
+        self.show_kill_zone(end_of_gen)
+        if end_of_gen:
+            agents_dead_num = int(self.kill_mask[agent_ys, agent_xs].sum())
+            agents_reproducing_num = len(agent_xs) - agents_dead_num
+            self.died_text.set_text(f"Agents died: {agents_dead_num}")
+            self.reproduced_text.set_text(
+                f"Agents reproduced: {agents_reproducing_num}\nAgents next generation: {agents_reproducing_num*2}"
+            )
+        else:
+            self.died_text.set_text("")
+            self.reproduced_text.set_text("")
+
+        # Create folder if doesn't exist
+        create_dir("./steps")
+        create_dir(f"./steps/{log.generation}")
+
+        if end_of_gen:
+            path = f"./steps/{log.generation}/END.png"
+        else:
+            path = f"./steps/{log.generation}/{log.generation}-{log.step}.png"
+        self.figure.savefig(path)
+        return path
+
+
+def render_generation(generation: list["Frame"], kill_mask: np.ndarray, kill_layer: np.ndarray) -> int:
+    """Render every step of a generation and its end, returns the number of frames"""
+
+    renderer = GenerationRenderer(generation[0].world_len, kill_mask, kill_layer)
+    for log_state in generation:
+        renderer.render(log_state)
+    renderer.render(generation[-1], end_of_gen=True)
+    return len(generation) + 1
+
+
+def render_columnar_generation(path: str, generation: int, kill_mask: np.ndarray, kill_layer: np.ndarray) -> int:
+    return render_generation(ColumnarLogReader(path).generation(generation), kill_mask, kill_layer)
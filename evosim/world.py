@@ -1,23 +1,66 @@
-import copy
-from typing import TYPE_CHECKING, Callable, Optional
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
 
 from tqdm import tqdm
 
 from evosim.agent import Agent
-from evosim.constants import LIFESPAN, MAX_STEPS, NUM_GENERATIONS
-from evosim.types import AgentVisInfo, Coord, KillFn, Log, ReproductionFn
-from evosim.utils import random_position
+from evosim.checkpoint import CheckpointWriter
+from evosim.constants import CROWD_DISTANCE, LIFESPAN, MAX_STEPS, MUTATION_RATE, NUM_GENERATIONS
+from evosim.engine import VectorizedEngine
+from evosim.genome import summarize_genomes
+from evosim.kill_fn import KillZone, compile_kill_fn
+from evosim.log_store import ColumnarLogWriter, StepFrame
+from evosim.memory import MemoryProfiler
+from evosim.palette import Palette
+from evosim.profiler import NO_PHASE, Profiler
+from evosim.progress import ProgressFn, Throttled
+from evosim.rng import RNG
+from evosim.spatial import NearestNeighbours, SpatialHash
+from evosim.types import Coord, KillFn, Log, ReproductionFn
+
+ENGINES = ("object", "numpy")
+
+LOG_ALL = 1
+LOG_END = MAX_STEPS  # only the last step of every generation
+LOG_NONE = 0
 
 
 class World:
     len: int
     agents: list[Agent]
+    occupancy: list[int]  # agent id per cell (row-major), -1 when the cell is empty
+    crowd_hash: SpatialHash  # agents bucketed by CROWD_DISTANCE for the crowd sense
+    nearest: NearestNeighbours  # closest agent of each agent, for the CLOSE action
 
-    generation: int
+    generation: int  # next generation to simulate
     step: int
 
-    kill_fn: KillFn
+    rng: RNG  # every random draw of the simulation, seeded so a run can be repeated
+
+    kill_fn: KillZone
     reproduction_fn: ReproductionFn
+    mutation_rate: float  # read by mutate_reproduce
+    selected: list[Agent]  # agents left by the last selectively_kill, before they reproduce
+
+    # Vectorized engine running the steps, None when the agents act one by one
+    engine: Optional[VectorizedEngine]
+
+    log: list[Log]
+    # Steps counted back from the last one of a generation that are logged and yielded, LOG_NONE for none
+    log_every: int
+    # Steps are streamed here instead of being kept in self.log when set
+    log_writer: Optional[ColumnarLogWriter]
+    palette: Palette  # color ids of the population, shared with the log writer
+    # A checkpoint is appended here after every generation when set
+    checkpoints: Optional[CheckpointWriter]
+    # Times the phases of every generation when set
+    profiler: Optional[Profiler]
+    # Accounts for the memory of every generation when set, tracing makes the simulation much slower
+    memory: Optional[MemoryProfiler]
+    # No tqdm bars or per-generation output, and genomes are summarized instead of printed one by one
+    headless: bool
+    progress: Optional[Throttled]
 
     def __init__(
         self,
@@ -26,8 +69,25 @@ class World:
         genome_connections: int,
         kill_fn: KillFn,
         reproduction_fn: ReproductionFn,
+        engine: str = "object",
+        log_writer: Optional[ColumnarLogWriter] = None,
+        mutation_rate: float = MUTATION_RATE,
+        checkpoints: Optional[CheckpointWriter] = None,
+        seed: Optional[int] = None,
+        profiler: Optional[Profiler] = None,
+        memory: Optional[MemoryProfiler] = None,
+        log_every: int = LOG_ALL,
+        headless: bool = False,
+        progress: Optional[ProgressFn] = None,
+        progress_interval: float = 1.0,
     ):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine}, must be one of {ENGINES}")
+        if log_every < 0:
+            raise ValueError(f"log_every must be positive or LOG_NONE, not {log_every}")
+
         self.len = len
+        self.rng = RNG(seed)
         self.agents = [
             Agent(
                 world=self,
@@ -39,33 +99,88 @@ class World:
         self.step = 0
         self.generation = 0
 
-        self.kill_fn = kill_fn
+        self.kill_fn = compile_kill_fn(kill_fn, len)
         self.reproduction_fn = reproduction_fn
+        self.mutation_rate = mutation_rate
+        self.selected = []
+
+        self.engine = VectorizedEngine(self) if engine == "numpy" else None
+        self.log = []
+        self.log_writer = log_writer
+        self.palette = log_writer.palette if log_writer is not None else Palette()
+        self.checkpoints = checkpoints
+        self.profiler = profiler
+        self.memory = memory
+        self.log_every = log_every
+        self.headless = headless
+        self.progress = Throttled(progress, progress_interval) if progress is not None else None
+        self.crowd_hash = SpatialHash(len, CROWD_DISTANCE)
+        self.nearest = NearestNeighbours(self)
 
-        # TODO make sure there are no 2 agents in same coord ?
         self.randomize_agent_coords()
 
     def provide_agents(self, agents: list["Agent"]):
         self.agents = agents
         self.randomize_agent_coords()
 
+    def cell_index(self, coord: Coord) -> int:
+        """Index of the coord in the occupancy grid"""
+
+        return coord.y * self.len + coord.x
+
+    def is_in_bounds(self, coord: Coord) -> bool:
+        return 0 <= coord.x < self.len and 0 <= coord.y < self.len
+
     def is_coord_free(self, coord: Coord):
-        for agent in self.agents:
-            if agent.coord == coord:
-                return False
-        return True
+        # Nothing lives outside the world, bounds are checked by the caller
+        if not self.is_in_bounds(coord):
+            return True
+        return self.occupancy[self.cell_index(coord)] == -1
+
+    def place_agent(self, agent: "Agent", coord: Coord):
+        """Move an agent that lives in this world to coord, keeping the occupancy grid in sync"""
+
+        if not self.is_in_bounds(coord):
+            raise ValueError(f"{coord} is outside the world ({self.len}x{self.len})")
+
+        old_cell = self.cell_index(agent.coord)
+        if self.occupancy[old_cell] == agent.id:
+            self.occupancy[old_cell] = -1
+
+        self.occupancy[self.cell_index(coord)] = agent.id
+        self.crowd_hash.move(agent, agent.coord, coord)
+        agent._coord = coord
+        self.nearest.moved(agent, coord)
+
+    def index_agents(self):
+        """Assign agent ids and rebuild the occupancy grid from the agents' coords"""
+
+        self.occupancy = [-1] * (self.len * self.len)
+        for i, agent in enumerate(self.agents):
+            agent.world = self
+            agent.id = i
+            self.occupancy[self.cell_index(agent.coord)] = i
+        self.crowd_hash.rebuild(self.agents)
+        self.nearest.clear()
 
     def randomize_agent_coords(self):
-        """Scatter the agents"""
+        """Scatter the agents, at most one per cell"""
 
-        coords = []
+        if len(self.agents) > self.len * self.len:
+            raise ValueError(f"{len(self.agents)} agents do not fit in a {self.len}x{self.len} world")
 
-        for agent in self.agents:
-            while True:
-                coord = random_position(self.len)
-                if coord not in coords:
-                    agent.coord = coord
-                    break
+        self.occupancy = [-1] * (self.len * self.len)
+
+        # Distinct cells drawn at once, however full the grid is
+        cells = self.rng.distinct(self.len * self.len, len(self.agents))
+        for i, (agent, cell) in enumerate(zip(self.agents, cells)):
+            agent.world = self
+            agent.id = i
+            agent._coord = Coord(cell % self.len, cell // self.len)
+            self.occupancy[cell] = i
+
+        self.crowd_hash.rebuild(self.agents)
+        self.nearest.clear()
 
     def selectively_kill(self):
         """Only agents a certain distance from the right/left walls will survive"""
@@ -81,6 +196,8 @@ class World:
                 surviving_agents.append(agent)
 
         self.agents = surviving_agents
+        self.selected = surviving_agents
+        self.index_agents()
 
     def kill_old_age(self):
         """Kill agents of old age"""
@@ -97,59 +214,192 @@ class World:
         # print(f"{len(self.agents)-len(surviving_agents)} died of old age lmao")
 
         self.agents = surviving_agents
+        self.index_agents()
 
     def reproduce_agents(self):
-        """Have all the agents reproduce"""
+        """Have all the agents reproduce, agents that don't fit in the world are culled at random"""
+
+        agents = self.reproduction_fn(self.agents)
+        if len(agents) > self.len * self.len:
+            agents = self.rng.sample(agents, self.len * self.len)
+        self.agents = agents
+
+    def phase(self, name: str):
+        """Context that times a phase of the generation, it does nothing without a profiler"""
 
-        self.agents = self.reproduction_fn(self.agents)
+        return self.profiler.phase(name) if self.profiler is not None else NO_PHASE
 
     def simulate_generation(self, gen: int):
+        for frame in self.iter_generation(gen):
+            self.record(frame)
+
+    def record(self, frame: StepFrame):
+        """Keep a step in self.log, or stream it to the log writer, timed as part of the snapshot phase"""
+
+        with self.phase("snapshot"):
+            if self.log_writer is None:
+                self.log.append(
+                    Log(world_len=frame.world_len, generation=frame.generation, step=frame.step, agents=frame.agents)
+                )
+                return
+
+            self.log_writer.write_frame(frame)
+            if frame.step == MAX_STEPS - 1:
+                # Make the generation readable
+                self.log_writer.flush()
+
+    def is_logged(self, step: int) -> bool:
+        return self.log_every != LOG_NONE and (MAX_STEPS - 1 - step) % self.log_every == 0
+
+    def steps(self) -> Iterable[int]:
+        return range(MAX_STEPS) if self.headless else tqdm(range(MAX_STEPS))
+
+    def iter_generation(self, gen: int) -> Iterator[StepFrame]:
+        """
+        Simulate a generation, yielding a snapshot of every logged step as it is taken.
+        Selection and reproduction run once the last step has been consumed.
+        """
+
         self.step = 0
 
-        print(f"\nGeneration {gen}")
-        print(f"Population: {len(self.agents)}")
+        if not self.headless:
+            print(f"\nGeneration {gen}")
+            print(f"Population: {len(self.agents)}")
 
-        for i in tqdm(range(MAX_STEPS)):
-            for agent in self.agents:
-                agent.act()
+        if self.memory is not None:
+            self.memory.start(gen)
+        if self.profiler is not None:
+            self.profiler.start(gen, len(self.agents))
+
+        if self.engine is not None:
+            yield from self.iter_steps_vectorized(gen)
+        else:
+            yield from self.iter_steps_object(gen)
 
-            # Save to log
+        if self.profiler is not None:
+            self.profiler.count_executions(self.agents, MAX_STEPS)
 
-            self.log.append(
-                Log(
+        with self.phase("selectively_kill"):
+            self.selectively_kill()
+        with self.phase("reproduce_agents"):
+            self.reproduce_agents()
+        with self.phase("celebrate_birthday"):
+            for agent in self.agents:
+                agent.celebrate_birthday()
+        with self.phase("randomize_agent_coords"):
+            self.randomize_agent_coords()
+        with self.phase("kill_old_age"):
+            self.kill_old_age()
+
+        self.generation = gen + 1
+        if self.checkpoints is not None:
+            with self.phase("checkpoint"):
+                self.checkpoints.write(self)
+
+        if self.profiler is not None:
+            self.profiler.finish()
+        if self.memory is not None:
+            self.memory.finish(gen)
+
+        if not self.headless:
+            print(f"Generation {gen} complete.")
+
+    def iter_steps_object(self, gen: int) -> Iterator[StepFrame]:
+        # The agents don't change within a generation
+        color_ids = np.array([agent.get_color_id() for agent in self.agents], dtype=np.uint32)
+
+        for i in self.steps():
+            with self.phase("act"):
+                for agent in self.agents:
+                    agent.act()
+            if self.progress is not None:
+                self.progress(gen, i)
+            if not self.is_logged(i):
+                continue
+
+            # Timed apart from the consumer of the frame, which runs at the yield
+            with self.phase("snapshot"):
+                frame = StepFrame(
                     world_len=self.len,
                     generation=gen,
                     step=i,
-                    agents=[
-                        AgentVisInfo(coord=copy.deepcopy(agent.coord), color=agent.get_color()) for agent in self.agents
-                    ],
+                    xs=np.array([agent.coord.x for agent in self.agents], dtype=np.int16),
+                    ys=np.array([agent.coord.y for agent in self.agents], dtype=np.int16),
+                    color_ids=color_ids,
+                    palette=self.palette,
                 )
-            )
+            yield frame
+
+    def iter_steps_vectorized(self, gen: int) -> Iterator[StepFrame]:
+        with self.phase("act"):
+            self.engine.load()
+
+        for i in self.steps():
+            with self.phase("act"):
+                self.engine.step()
+            if self.progress is not None:
+                self.progress(gen, i)
+            if not self.is_logged(i):
+                continue
+
+            with self.phase("snapshot"):
+                frame = self.engine.snapshot(gen, i)
+            yield frame
+
+        with self.phase("act"):
+            self.engine.store()
+
+    def iter_steps(self) -> Iterator[StepFrame]:
+        """
+        Run the simulation from self.generation, which is past 0 when restored from a checkpoint,
+        yielding every step as it happens instead of keeping them in self.log.
+        Memory stays bounded by what the consumer holds on to, however many generations are run.
+        """
 
-        self.selectively_kill()
-        self.reproduce_agents()
-        for agent in self.agents:
-            agent.celebrate_birthday()
-        self.randomize_agent_coords()
-        self.kill_old_age()
+        print("Starting simulation ...")
+        self.print_genomes("Initial genomes:")
+
+        try:
+            for i in range(self.generation, NUM_GENERATIONS):
+                yield from self.iter_generation(i)
+        finally:
+            self.finish()
+        print("Simulation complete")
 
-        print(f"Generation {gen} complete.")
+        self.print_genomes("Final genomes:")
 
-    def simulate(self) -> list[Log]:
-        print("Starting simulation ...")
-        print("Initial genomes:")
+    def iter_generations(self) -> Iterator[list[StepFrame]]:
+        """Run the simulation, yielding the steps of a generation at a time"""
+
+        generation: list[StepFrame] = []
+        for frame in self.iter_steps():
+            generation.append(frame)
+            if frame.step == MAX_STEPS - 1:
+                yield generation
+                generation = []
+
+    def print_genomes(self, title: str):
+        print(title)
+        if self.headless:
+            print(summarize_genomes([agent.genome for agent in self.agents]))
+            return
         for agent in self.agents:
             print(agent.genome)
 
+    def simulate(self) -> list[Log]:
         # Reset log
         self.log = []
 
-        for i in range(NUM_GENERATIONS):
-            self.simulate_generation(i)
-        print("Simulation complete")
-
-        print("Final genomes:")
-        for agent in self.agents:
-            print(agent.genome)
+        for frame in self.iter_steps():
+            self.record(frame)
 
         return self.log
+
+    def finish(self):
+        """
+        Tear down what outlives the generations once a run is over, iter_steps does it itself.
+        Memory tracing is stopped, the profiles are kept.
+        """
+
+        if self.memory is not None:
+            self.memory.stop()